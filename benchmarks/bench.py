@@ -0,0 +1,328 @@
+"""
+Measure how fast every built-in signal, and a few representative patches,
+render offline.
+
+Run with the package importable, e.g. `PYTHONPATH=src python benchmarks/bench.py`.
+"""
+import argparse
+import collections
+import datetime
+import json
+import pathlib
+import platform
+import sys
+import time
+import typing
+
+import attr
+import numpy as np
+
+from signals import (
+    SignalFlags,
+)
+from signals.chain import (
+    BlockCachingEmitter,
+    BlockLoc,
+    Emitter,
+    Receiver,
+    Shape,
+)
+from signals.chain.compiler import (
+    Program,
+)
+from signals.chain.cost import (
+    Cost,
+    CostModel,
+    default_path,
+)
+import signals.chain.discovery
+import signals.chain.fixed
+import signals.chain.noise
+import signals.map
+import signals.map.control
+
+# Ports that carry audio are fed noise, everything else a constant in a
+# range that suits frequencies and gains alike.
+audio_ports = {'input', 'left', 'right'}
+control_values = {'low': 200., 'high': 2000.}
+default_control_value = 440.
+rate = 44100
+
+# Patches in the format written by `save`. The signal at `1a` is rendered,
+# at whatever width the patch produces.
+topologies = {
+    'chain': [
+        '+ 4a signals.chain.fixed.Fixed value=[[220.0]]',
+        '+ 3a signals.chain.osc.Sawtooth',
+        '> 4a 3a.hertz',
+        '+ 4b signals.chain.fixed.Fixed value=[[1000.0]]',
+        '+ 2a signals.chain.fx.LowPass',
+        '> 3a 2a.input',
+        '> 4b 2a.cutoff',
+        '+ 4c signals.chain.fixed.Fixed value=[[0.5]]',
+        '+ 1a signals.chain.fx.Gain',
+        '> 2a 1a.left',
+        '> 4c 1a.right',
+    ],
+    'fan': [
+        '+ 5a signals.chain.fixed.Fixed value=[[220.0]]',
+        '+ 4a signals.chain.osc.Sine',
+        '> 5a 4a.hertz',
+        *(
+            line
+            for i, col in enumerate('abcd')
+            for line in (
+                f'+ 6{col} signals.chain.fixed.Fixed value=[[{0.1 * (i + 1)}]]',
+                f'+ 3{col} signals.chain.fx.Gain',
+                f'> 4a 3{col}.left',
+                f'> 6{col} 3{col}.right',
+            )
+        ),
+        '+ 2a signals.chain.fx.RingMod',
+        '> 3a 2a.left',
+        '> 3b 2a.right',
+        '+ 2b signals.chain.fx.RingMod',
+        '> 3c 2b.left',
+        '> 3d 2b.right',
+        '+ 1a signals.chain.fx.RingMod',
+        '> 2a 1a.left',
+        '> 2b 1a.right',
+    ],
+    'deep': [
+        '+ 18a signals.chain.fixed.Fixed value=[[220.0]]',
+        '+ 17a signals.chain.osc.Sine',
+        '> 18a 17a.hertz',
+        '+ 18b signals.chain.fixed.Fixed value=[[0.99]]',
+        *(
+            line
+            for row in range(16, 0, -1)
+            for line in (
+                f'+ {row}a signals.chain.fx.Gain',
+                f'> {row + 1}a {row}a.left',
+                f'> 18b {row}a.right',
+            )
+        ),
+    ],
+    'poly': [
+        '+ 5a signals.chain.poly.VoiceHertz bank=bench voices=16',
+        '+ 5b signals.chain.poly.VoiceGate bank=bench voices=16',
+        '+ 4a signals.chain.osc.Sawtooth',
+        '> 5a 4a.hertz',
+        '+ 4b signals.chain.fixed.Fixed value=[[2000.0]]',
+        '+ 3a signals.chain.fx.LowPass',
+        '> 4a 3a.input',
+        '> 4b 3a.cutoff',
+        '+ 2a signals.chain.fx.RingMod',
+        '> 3a 2a.left',
+        '> 5b 2a.right',
+        '+ 1a signals.chain.shape.Flatten',
+        '> 2a 1a.input',
+        *(f'note bench {note}' for note in range(48, 64)),
+    ],
+}
+
+
+def _source(port: str, channels: int) -> Emitter:
+    if port in audio_ports:
+        sig = signals.chain.noise.White()
+        sig.set_state(sig.State(channels=channels, seed=0))
+    else:
+        sig = signals.chain.fixed.Fixed()
+        value = control_values.get(port, default_control_value)
+        sig.set_state(sig.State(value=np.full((1, channels), value)))
+    return sig
+
+
+def build_signal(cls_name: str, channels: int) -> Emitter:
+    sig = signals.chain.discovery.load_signal(cls_name)()
+    if 'channels' in sig.state_attrs():
+        sig.set_state(attr.evolve(sig.get_state(), channels=channels))
+    if 'voices' in sig.state_attrs():
+        sig.set_state(attr.evolve(sig.get_state(), voices=channels, bank=f'bench-{channels}'))
+    if isinstance(sig, Receiver):
+        for port in sig.port_names():
+            setattr(sig, port, _source(port, channels))
+    return sig
+
+
+def build_topology(name: str) -> Emitter:
+    controller = signals.map.control.Controller(interactive=False)
+    for line in topologies[name]:
+        controller.onecmd(line)
+    return controller.map._find(signals.map.Coordinates.parse('1a'))
+
+
+def _clear_caches(sig: Emitter) -> None:
+    for upstream in (sig.upstream() if isinstance(sig, Receiver) else (sig,)):
+        if isinstance(upstream, BlockCachingEmitter):
+            upstream.clear_block_cache()
+
+
+def measure(sig: Emitter,
+            *,
+            block_size: int,
+            warm: bool,
+            min_time: float,
+            compiled: bool = False
+            ) -> dict[str, float]:
+    """
+    Request blocks until `min_time` has passed, then report the throughput.
+    Cold runs request a new position every time, so that nothing is served
+    from a cache; warm runs request the same block over and over.
+    """
+    request = Program(sig) if compiled else Receiver.BoundPort(parent=None, name='bench', emitter=sig).request
+    shape = Shape(frames=block_size, channels=sig.channels)
+    if warm:
+        request(BlockLoc(position=0, rate=rate, shape=shape))
+    else:
+        _clear_caches(sig)
+    blocks = 0
+    position = 0
+    elapsed = 0.
+    start = time.perf_counter()
+    while elapsed < min_time:
+        request(BlockLoc(position=position, rate=rate, shape=shape))
+        blocks += 1
+        if not warm:
+            position += block_size
+        elapsed = time.perf_counter() - start
+    frames = blocks * block_size
+    return dict(blocks=blocks,
+                seconds=elapsed,
+                frames_per_second=frames / elapsed,
+                ns_per_frame=elapsed * 1e9 / frames)
+
+
+def iter_cases(args: argparse.Namespace) -> typing.Iterator[tuple[str, str, typing.Callable[[int], Emitter]]]:
+    library = signals.chain.discovery.Library(())
+    library.scan()
+    for cls_name in sorted(library.names):
+        if args.filter in cls_name:
+            sig_cls = signals.chain.discovery.load_signal(cls_name)
+            if sig_cls.flags() & SignalFlags.RECORDER:
+                # Rendering these writes files as a side effect
+                continue
+            yield 'signal', cls_name, lambda channels, cls_name=cls_name: build_signal(cls_name, channels)
+    for name in topologies:
+        if args.filter in name:
+            yield 'topology', name, lambda _, name=name: build_topology(name)
+
+
+def run(args: argparse.Namespace) -> dict:
+    results = []
+    for kind, name, build in iter_cases(args):
+        for channels in args.channels if kind == 'signal' else (None,):
+            try:
+                sig = build(channels)
+                channels = sig.channels
+            except Exception as e:
+                results.append(dict(kind=kind, name=name, channels=channels, error=repr(e)))
+                print(f'{name} [{channels}ch]: {e!r}', file=sys.stderr)
+                continue
+            for block_size in args.block_sizes:
+                for warm in (False, True):
+                    case = dict(kind=kind,
+                                name=name,
+                                channels=channels,
+                                block_size=block_size,
+                                cache='warm' if warm else 'cold')
+                    try:
+                        case.update(measure(sig,
+                                            block_size=block_size,
+                                            warm=warm,
+                                            min_time=args.min_time,
+                                            compiled=args.compiled))
+                    except Exception as e:
+                        case['error'] = repr(e)
+                    results.append(case)
+                    if not args.quiet:
+                        print(format_case(case), file=sys.stderr)
+            sig.destroy()
+    return dict(meta=dict(meta(), compiled=args.compiled), results=results)
+
+
+def calibrate(results: list[dict]) -> CostModel:
+    """
+    Fit the cost of each class of signal to its cold runs, less what the
+    signals built to feed it are predicted to cost.
+    """
+    cases = collections.defaultdict(list)
+    for case in results:
+        if case['kind'] == 'signal' and case.get('cache') == 'cold' and 'error' not in case:
+            cases[case['name']].append(case)
+    source_names = {
+        port: _source(port, 1).cls_name()
+        for cls_name in cases
+        for port in _port_names(cls_name)
+    }
+    costs = {}
+    # Signals without inputs first, since they feed the rest
+    for cls_name in sorted(cases, key=lambda cls_name: bool(_port_names(cls_name))):
+        samples = []
+        for case in cases[cls_name]:
+            frames, channels = case['block_size'], case['channels']
+            total = case['ns_per_frame'] * frames
+            ns = total - sum(
+                costs.get(source_names[port], Cost()).ns(frames, channels)
+                for port in _port_names(cls_name)
+            )
+            samples.append((frames * channels, ns, total))
+        costs[cls_name] = Cost.fit(samples)
+    return CostModel(costs)
+
+
+def _port_names(cls_name: str) -> list[str]:
+    sig_cls = signals.chain.discovery.load_signal(cls_name)
+    return sig_cls.port_names() if issubclass(sig_cls, Receiver) else []
+
+
+def meta() -> dict:
+    return dict(timestamp=datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                python=platform.python_version(),
+                numpy=np.__version__,
+                machine=platform.machine(),
+                processor=platform.processor(),
+                system=platform.platform())
+
+
+def case_key(case: dict) -> tuple:
+    return case['kind'], case['name'], case['channels'], case.get('block_size'), case.get('cache')
+
+
+def format_case(case: dict) -> str:
+    label = f"{case['name']} [{case['channels']}ch x {case['block_size']} {case['cache']}]"
+    if 'error' in case:
+        return f'{label}: {case["error"]}'
+    else:
+        return f"{label}: {case['ns_per_frame']:.1f} ns/frame, {case['frames_per_second']:.3g} frames/s"
+
+
+def parse_args(argv: typing.Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--output', type=pathlib.Path, help='Write results as JSON to this path')
+    parser.add_argument('--block-sizes', type=int, nargs='+', default=[32, 128, 512, 2048, 8192, 65536])
+    parser.add_argument('--channels', type=int, nargs='+', default=[1, 2, 8, 16])
+    parser.add_argument('--min-time', type=float, default=0.05, help='Seconds to spend on each case')
+    parser.add_argument('--filter', default='', help='Only run cases whose name contains this')
+    parser.add_argument('--compiled', action='store_true', help='Evaluate through a compiled program')
+    parser.add_argument('--calibrate', type=pathlib.Path, nargs='?', const=default_path,
+                        help='Fit the cost model to the results, and write it to this path')
+    parser.add_argument('--quiet', action='store_true')
+    return parser.parse_args(argv)
+
+
+def main(argv: typing.Sequence[str] | None = None) -> None:
+    args = parse_args(argv)
+    report = run(args)
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=1)
+    else:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+    if args.calibrate is not None:
+        calibrate(report['results']).save(args.calibrate)
+
+
+if __name__ == '__main__':
+    main()
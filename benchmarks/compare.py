@@ -0,0 +1,57 @@
+"""
+Compare two result files written by `bench.py`, and fail if any case got
+slower by more than the threshold.
+"""
+import argparse
+import json
+import pathlib
+import sys
+import typing
+
+from bench import (
+    case_key,
+    format_case,
+)
+
+
+def load(path: pathlib.Path) -> dict[tuple, dict]:
+    with open(path) as f:
+        report = json.load(f)
+    return {
+        case_key(case): case
+        for case in report['results']
+        if 'error' not in case
+    }
+
+
+def main(argv: typing.Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('baseline', type=pathlib.Path)
+    parser.add_argument('candidate', type=pathlib.Path)
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Largest tolerated relative slowdown, e.g. 0.1 for 10%%')
+    args = parser.parse_args(argv)
+
+    baseline = load(args.baseline)
+    candidate = load(args.candidate)
+    regressions = 0
+    for key in sorted(baseline.keys() & candidate.keys(), key=str):
+        old = baseline[key]['ns_per_frame']
+        new = candidate[key]['ns_per_frame']
+        change = new / old - 1
+        if change > args.threshold:
+            regressions += 1
+            marker = 'SLOWER'
+        elif change < -args.threshold:
+            marker = 'faster'
+        else:
+            continue
+        print(f'{marker} {change:+.0%} {format_case(candidate[key])}')
+    missing = len(baseline.keys() - candidate.keys())
+    print(f'{regressions} regressions in {len(baseline.keys() & candidate.keys())} cases, '
+          f'{missing} baseline cases not in candidate')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
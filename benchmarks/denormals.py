@@ -0,0 +1,82 @@
+"""
+Measure how recursive signals cope with input that has decayed into
+subnormal floats, as it does once a sound stops, under each denormal policy.
+
+Run with the package importable, e.g.
+`PYTHONPATH=src python benchmarks/denormals.py`.
+"""
+import argparse
+import sys
+import typing
+
+import numpy as np
+
+from signals.chain import (
+    Denormals,
+    Emitter,
+    Recursive,
+)
+import signals.chain.fixed
+import signals.chain.fx
+import signals.chain.noise
+
+from bench import (
+    measure,
+)
+
+# Noise scaled into the subnormal range stands for the tail of a sound, and
+# noise scaled to nothing for silence to compare it with
+inputs = {
+    'silent': 0.,
+    'subnormal': 1e-310,
+}
+filters = [signals.chain.fx.LowPass, signals.chain.fx.HighPass]
+
+
+def _fixed(value: float, channels: int) -> Emitter:
+    sig = signals.chain.fixed.Fixed()
+    sig.set_state(sig.State(value=np.full((1, channels), value)))
+    return sig
+
+
+def build(filter_cls: type[signals.chain.fx.SingleCritFilter], value: float, channels: int) -> Emitter:
+    noise = signals.chain.noise.White()
+    noise.set_state(noise.State(channels=channels, seed=0))
+    tail = signals.chain.fx.Gain()
+    tail.left = noise
+    tail.right = _fixed(value, channels)
+    sig = filter_cls()
+    sig.input = tail
+    sig.cutoff = _fixed(1000., channels)
+    return sig
+
+
+def main(argv: typing.Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    # Large enough that the recursion itself, not the overhead of each block,
+    # dominates
+    parser.add_argument('--block-size', type=int, default=16384)
+    parser.add_argument('--channels', type=int, default=2)
+    parser.add_argument('--min-time', type=float, default=0.2, help='Seconds to spend on each case')
+    args = parser.parse_args(argv)
+
+    for filter_cls in filters:
+        for policy in Denormals:
+            Recursive.denormals = policy
+            ns_per_frame = {}
+            for name, value in inputs.items():
+                sig = build(filter_cls, value, args.channels)
+                ns_per_frame[name] = measure(sig,
+                                             block_size=args.block_size,
+                                             warm=False,
+                                             min_time=args.min_time)['ns_per_frame']
+                sig.destroy()
+            slowdown = ns_per_frame['subnormal'] / ns_per_frame['silent']
+            print(f'{filter_cls.__name__} {policy.name.lower()}: '
+                  + ', '.join(f'{name} {ns:.1f} ns/frame' for name, ns in ns_per_frame.items())
+                  + f', subnormal input {slowdown:.1f}x slower')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+Render reference patches offline and check each result against its stored
+golden array, against renders in other block sizes and from later starts,
+and each render's time and peak memory against its budget.
+
+Run with the package importable, e.g.
+`PYTHONPATH=src python benchmarks/golden/golden.py`, and pass `--update` to
+rewrite the golden arrays after an intended change in output.
+"""
+import argparse
+import json
+import pathlib
+import sys
+import time
+import tracemalloc
+import typing
+
+import attr
+import numpy as np
+
+import signals.chain.render
+import signals.map
+import signals.map.control
+
+root = pathlib.Path(__file__).parent
+# Output must not depend on how rendering is split into blocks
+block_sizes = (256, 512, 1024)
+# nor on where it began
+starts = (1, 300, 4096)
+
+
+@attr.s(auto_attribs=True, kw_only=True, frozen=True)
+class Budget:
+    target: str
+    frames: int
+    rate: int = 44100
+    block_size: int = 1024
+    seconds: float
+    peak_bytes: int
+    rtol: float = 1e-7
+    atol: float = 1e-9
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> dict[str, typing.Self]:
+        with open(path) as f:
+            return {name: cls(**budget) for name, budget in json.load(f).items()}
+
+
+@attr.s(auto_attribs=True, kw_only=True, frozen=True)
+class Outcome:
+    name: str
+    seconds: float
+    peak_bytes: int
+    max_error: float | None
+    failures: tuple[str, ...]
+
+    def __str__(self) -> str:
+        status = 'FAIL' if self.failures else 'ok'
+        error = 'no golden' if self.max_error is None else f'max error {self.max_error:.3g}'
+        details = ''.join(f'\n    {failure}' for failure in self.failures)
+        return f'{status} {self.name}: {self.seconds * 1e3:.1f} ms, {self.peak_bytes / 1e6:.2f} MB, {error}{details}'
+
+
+def load_patch(name: str) -> signals.map.Map:
+    controller = signals.map.control.Controller(interactive=False)
+    controller.onecmd(f'load {root / "patches" / name}.sigs')
+    return controller.map
+
+
+def prepare(name: str,
+            budget: Budget,
+            *,
+            compiled: bool,
+            block_size: int | None = None
+            ) -> signals.chain.render.Bounce:
+    sig_map = load_patch(name)
+    return signals.chain.render.Bounce(sig_map._find(signals.map.Coordinates.parse(budget.target)),
+                                       rate=budget.rate,
+                                       block_size=budget.block_size if block_size is None else block_size,
+                                       compiled=compiled)
+
+
+def check_splits(name: str, budget: Budget, result: np.ndarray, *, compiled: bool) -> list[str]:
+    """
+    Compare `result` with renders of separately loaded patches in each of
+    `block_sizes`, and from each of `starts` on.
+    """
+    failures = []
+    renders = {
+        f'in blocks of {block_size}': (0, prepare(name, budget, compiled=compiled, block_size=block_size))
+        for block_size in block_sizes
+        if block_size != budget.block_size
+    }
+    renders.update({
+        f'from {start}': (start, prepare(name, budget, compiled=compiled))
+        for start in starts
+        if start < budget.frames
+    })
+    for description, (start, bounce) in renders.items():
+        split = bounce.render(budget.frames - start, start=start)
+        if not np.allclose(split, result[start:], rtol=budget.rtol, atol=budget.atol):
+            error = float(np.max(np.abs(split - result[start:]), initial=0))
+            failures.append(f'output rendered {description} differs by up to {error:.3g}')
+    return failures
+
+
+def check(name: str, budget: Budget, *, update: bool, compiled: bool) -> Outcome:
+    # Timing and memory are measured in separate renders of separately
+    # loaded patches, since tracing allocations slows everything down.
+    bounce = prepare(name, budget, compiled=compiled)
+    start = time.perf_counter()
+    result = bounce.render(budget.frames)
+    seconds = time.perf_counter() - start
+    bounce = prepare(name, budget, compiled=compiled)
+    tracemalloc.start()
+    try:
+        bounce.render(budget.frames)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    failures = []
+    golden_path = root / 'goldens' / f'{name}.npy'
+    if update:
+        golden_path.parent.mkdir(exist_ok=True)
+        np.save(golden_path, result)
+    max_error = None
+    if golden_path.exists():
+        golden = np.load(golden_path)
+        if golden.shape != result.shape:
+            failures.append(f'shape {result.shape} differs from golden {golden.shape}')
+        else:
+            max_error = float(np.max(np.abs(result - golden), initial=0))
+            if not np.allclose(result, golden, rtol=budget.rtol, atol=budget.atol):
+                failures.append(f'output differs from golden by up to {max_error:.3g}')
+    else:
+        failures.append(f'no golden at {golden_path}')
+    failures.extend(check_splits(name, budget, result, compiled=compiled))
+    if not signals.chain.Emitter.check_blocks:
+        if seconds > budget.seconds:
+            failures.append(f'took {seconds:.3f}s, budget is {budget.seconds:.3f}s')
+        if peak_bytes > budget.peak_bytes:
+            failures.append(f'peaked at {peak_bytes} bytes, budget is {budget.peak_bytes}')
+    return Outcome(name=name,
+                   seconds=seconds,
+                   peak_bytes=peak_bytes,
+                   max_error=max_error,
+                   failures=tuple(failures))
+
+
+def main(argv: typing.Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--update', action='store_true', help='Rewrite the golden arrays from this run')
+    parser.add_argument('--filter', default='', help='Only check patches whose name contains this')
+    parser.add_argument('--budgets', type=pathlib.Path, default=root / 'budgets.json')
+    parser.add_argument('--check-blocks', action='store_true',
+                        help='Fail if any signal modifies a block it was handed; slow, so budgets are not enforced')
+    parser.add_argument('--compiled', action='store_true', help='Render through compiled programs')
+    args = parser.parse_args(argv)
+    signals.chain.Emitter.check_blocks = args.check_blocks
+
+    outcomes = [
+        check(name, budget, update=args.update, compiled=args.compiled)
+        for name, budget in Budget.load(args.budgets).items()
+        if args.filter in name
+    ]
+    for outcome in outcomes:
+        print(outcome)
+    failed = sum(bool(outcome.failures) for outcome in outcomes)
+    print(f'{failed} of {len(outcomes)} patches failed')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
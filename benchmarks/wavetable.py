@@ -0,0 +1,75 @@
+"""
+Compare the band-limited wavetable oscillators with the direct `_osc`
+functions of the oscillators they replace: how long each takes per frame,
+and how much of its output at a high pitch is aliasing.
+
+Run with the package importable, e.g.
+`PYTHONPATH=src python benchmarks/wavetable.py`.
+"""
+import argparse
+import sys
+import time
+import typing
+
+import numpy as np
+
+import signals.chain.osc
+
+pairs = [
+    (signals.chain.osc.Square, signals.chain.osc.TableSquare),
+    (signals.chain.osc.Sawtooth, signals.chain.osc.TableSawtooth),
+    (signals.chain.osc.Triangle, signals.chain.osc.TableTriangle),
+]
+rate = 44100
+
+
+def cycles(hertz: float, frames: int, channels: int) -> np.ndarray:
+    return np.arange(frames)[:, np.newaxis] / rate * np.full((1, channels), hertz)
+
+
+def ns_per_frame(wave: typing.Callable[[np.ndarray], np.ndarray], t: np.ndarray, min_time: float) -> float:
+    calls = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < min_time:
+        wave(t)
+        calls += 1
+    return elapsed * 1e9 / (calls * len(t))
+
+
+def alias_db(wave: typing.Callable[[np.ndarray], np.ndarray], hertz: int) -> float:
+    """
+    How loud everything but the harmonics of `hertz` is, relative to the
+    whole, over one second.
+    """
+    spectrum = np.abs(np.fft.rfft(wave(cycles(hertz, rate, 1))[:, 0])) ** 2
+    harmonics = np.zeros(len(spectrum), dtype=bool)
+    harmonics[::hertz] = True
+    return 10 * np.log10(spectrum[~harmonics].sum() / spectrum.sum())
+
+
+def main(argv: typing.Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--block-size', type=int, default=1024)
+    parser.add_argument('--channels', type=int, default=2)
+    # High enough that a naive waveform's harmonics fold over many times
+    parser.add_argument('--hertz', type=int, default=3001)
+    parser.add_argument('--min-time', type=float, default=0.2, help='Seconds to spend on each case')
+    args = parser.parse_args(argv)
+
+    t = cycles(args.hertz, args.block_size, args.channels)
+    for naive_cls, table_cls in pairs:
+        naive = naive_cls()
+        cases = {'direct': naive._osc}
+        for interpolation in ('linear', 'cubic'):
+            table = table_cls()
+            table.set_state(table.State(interpolation=interpolation))
+            cases[interpolation] = lambda t, table=table: table._wave(t, np.full((1, t.shape[1]), args.hertz / rate))
+        print(f'{naive_cls.__name__} at {args.hertz} Hz: ' + ', '.join(
+            f'{name} {ns_per_frame(wave, t, args.min_time):.1f} ns/frame, aliasing {alias_db(wave, args.hertz):.1f} dB'
+            for name, wave in cases.items()
+        ))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
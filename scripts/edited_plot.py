@@ -26,7 +26,9 @@ def setup_audio() -> signals.chain.vis.Vis:
     sound.hertz = hertz
     vis = signals.chain.vis.Wave()
     vis.input = sound
-    sink = signals.chain.dev.SinkDevice(rack.get_sink('default'))
+    transport = signals.chain.dev.Transport()
+    sink = signals.chain.dev.SinkDevice(rack.get_sink('default'), transport)
+    transport.attach(sink)
     sink.input = vis
     sink._stream.start()
     return vis
@@ -16,7 +16,9 @@ def main():
         print(sink)
 
     choice = input('Enter device name: ')
-    sink = signals.chain.dev.SinkDevice(rack.get_sink(choice))
+    transport = signals.chain.dev.Transport()
+    sink = signals.chain.dev.SinkDevice(rack.get_sink(choice), transport)
+    transport.attach(sink)
 
     sine = signals.chain.osc.Sine()
     sink.input = sine
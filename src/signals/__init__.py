@@ -86,6 +86,10 @@ env = _Env()
 @attr.s(auto_attribs=True, frozen=False, kw_only=True)
 class Config:
     theme_: str
+    # Size limit of the on-disk render cache. Zero disables it.
+    render_cache_bytes: int = 0
+    # Evaluate signals in a separate process, away from the GUI.
+    engine_process: bool = False
 
     @property
     def theme(self) -> signals.ui.theme.Theme:
@@ -113,6 +117,10 @@ class Project:
     def config(self) -> Config:
         return Config.load(self.path / 'config.json')
 
+    @property
+    def render_cache_path(self) -> pathlib.Path:
+        return self.path / 'cache'
+
     @classmethod
     def default(cls) -> typing.Self:
         return cls(path=env.project_root / 'templates' / 'default')
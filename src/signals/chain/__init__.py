@@ -3,7 +3,12 @@ from abc import ABC
 import collections
 import enum
 import functools
+import hashlib
+import itertools
+import json
+import os
 import typing
+import zlib
 
 import attr
 import attrs.validators
@@ -91,6 +96,13 @@ class BadShape(ChainLayerError):
                          f'Block with shape {shape} incompatible with requested shape {constraint}')
 
 
+class MutatedBlock(ChainLayerError):
+
+    def __init__(self, source: 'Signal', loc: 'BlockLoc'):
+        super().__init__(f'Block from {source.cls_name()!r} at position {loc.position} '
+                         f'was modified after it was handed out')
+
+
 class BadStateSchema(ChainLayerError):
 
     def __init__(self, sig: 'Signal', state: 'Signal.State'):
@@ -109,6 +121,9 @@ class BlockLoc:
     position: int
     rate: int
     shape: Shape
+    # Which of the emitter's channels are read, in ascending order, if not
+    # all of them; the shape then counts only those
+    mask: tuple[int, ...] | None = None
 
     @property
     def end_position(self) -> int:
@@ -132,18 +147,67 @@ class BlockLoc:
                                                  channels=self.shape.channels))
 
     def reslice(self, new_channels: int) -> typing.Self:
-        if new_channels == self.shape.channels:
+        if new_channels == self.shape.channels and self.mask is None:
+            return self
+        else:
+            return attr.evolve(self,
+                               shape=Shape(frames=self.shape.frames,
+                                           channels=new_channels),
+                               mask=None)
+
+    def masked(self, mask: tuple[int, ...]) -> typing.Self:
+        return attr.evolve(self,
+                           shape=Shape(frames=self.shape.frames,
+                                       channels=len(mask)),
+                           mask=mask)
+
+    def fit_mask(self, channels: int) -> typing.Self:
+        """
+        Drop the mask if an emitter of `channels` channels has no use for it,
+        because it selects all of them, or there is only one to share.
+
+        >>> loc = BlockLoc(position=0, rate=1, shape=Shape(frames=1, channels=1))
+        >>> loc.masked((1,)).fit_mask(4).mask
+        (1,)
+        >>> loc.masked((0, 1)).fit_mask(2).mask is None
+        True
+        """
+        if self.mask is None or not (channels == 1 or self.mask == tuple(range(channels))):
             return self
         else:
-            return attr.evolve(self, shape=Shape(frames=self.shape.frames,
-                                                 channels=new_channels))
+            return attr.evolve(self, mask=None)
+
+    @property
+    def channel_indices(self) -> typing.Sequence[int]:
+        return range(self.shape.channels) if self.mask is None else self.mask
+
+    def columns_in(self, other: 'BlockLoc') -> slice | list[int] | None:
+        """
+        Where the channels read at this location are in a block read at
+        `other`, or `None` if any are missing from it.
+
+        >>> loc = BlockLoc(position=0, rate=1, shape=Shape(frames=1, channels=4))
+        >>> loc.reslice(2).columns_in(loc)
+        slice(None, 2, None)
+        >>> loc.masked((1, 3)).columns_in(loc.masked((0, 1, 3)))
+        [1, 2]
+        >>> loc.masked((2,)).columns_in(loc.masked((0, 1))) is None
+        True
+        """
+        if self.mask is None and other.mask is None:
+            return slice(None, self.shape.channels) if self.shape.channels <= other.shape.channels else None
+        theirs = other.channel_indices
+        try:
+            return [theirs.index(channel) for channel in self.channel_indices]
+        except ValueError:
+            return None
 
     def __le__(self, other: 'BlockLoc') -> bool:
         return (
             self.rate == other.rate and
             self.position >= other.position and
             self.end_position <= other.end_position and
-            self.shape.channels <= other.shape.channels
+            self.columns_in(other) is not None
         )
 
     def before(self, frames: int) -> typing.Self:
@@ -177,9 +241,35 @@ class RequestRate(enum.Enum):
     UNUSED_FRAME = enum.auto()
 
 
+class Shedding(enum.IntEnum):
+    """
+    How much work live playback is skipping to keep up. Each level also
+    sheds everything below it.
+    """
+    NONE = 0
+    # Skip visualization side effects
+    VIS = 1
+    # Use cheaper filter designs
+    FILTERS = 2
+    # Evaluate block-rate inputs less often
+    CONTROL_RATE = 3
+
+
 state = attr.s(auto_attribs=True, frozen=False, kw_only=True)
 
 
+# Versions are never reused, so the newest version anywhere upstream of a
+# signal identifies everything its output depends on
+_versions = itertools.count()
+
+
+def _dump_state_value(v: typing.Any) -> typing.Any:
+    if isinstance(v, np.ndarray):
+        return v.tolist()
+    else:
+        raise TypeError(v)
+
+
 class Signal(abc.ABC, signals.discovery.Named):
     @state
     class State(signals.discovery.Named):
@@ -187,6 +277,7 @@ class Signal(abc.ABC, signals.discovery.Named):
 
     def __init__(self):
         self._state = self.State()
+        self._version = next(_versions)
 
     @classmethod
     @abc.abstractmethod
@@ -204,6 +295,49 @@ class Signal(abc.ABC, signals.discovery.Named):
         if not isinstance(new_state, self.State):
             raise BadStateSchema(self, new_state)
         self._state = new_state
+        self._changed()
+
+    def is_deterministic(self) -> bool:
+        """
+        Whether this signal's output is fully determined by its class, its
+        state, and its inputs.
+        """
+        return not (self.flags() & SignalFlags.SOURCE_DEVICE)
+
+    @functools.cached_property
+    def digest(self) -> str | None:
+        """
+        A hash of everything that determines this signal's output, or `None`
+        if the output depends on something outside the graph.
+        """
+        h = hashlib.sha3_256()
+        return h.hexdigest() if self._update_digest(h) else None
+
+    def _update_digest(self, h: 'hashlib._Hash') -> bool:
+        h.update(self.cls_name().encode())
+        h.update(self._state_key().encode())
+        return self.is_deterministic()
+
+    def _state_key(self) -> str:
+        """
+        The state that affects this signal's output, serialized.
+        """
+        # Some state, like how much to cache, doesn't affect the output
+        state = attr.asdict(self._state, filter=lambda a, _: a.metadata.get('digest', True))
+        return json.dumps(state, sort_keys=True, default=_dump_state_value)
+
+    @functools.cached_property
+    def version(self) -> int:
+        """
+        Changes whenever the state or inputs of this signal, or of anything
+        upstream of it, do.
+        """
+        return self._version
+
+    def _changed(self) -> None:
+        self._version = next(_versions)
+        self.__dict__.pop('digest', None)
+        self.__dict__.pop('version', None)
 
     def destroy(self) -> None:
         pass
@@ -219,6 +353,8 @@ class Emitter(Signal, abc.ABC):
         super().__init__()
         self._outputs: set[tuple[PortName, Receiver]] = set()
         self._last_request: typing.Optional[Request] = None
+        self._frozen: typing.Optional[Frozen] = None
+        self._handed_out: typing.Optional[tuple[BlockLoc, np.ndarray, int]] = None
 
     @property
     def outputs_with_ports(self) -> typing.AbstractSet[tuple[PortName, 'Receiver']]:
@@ -246,19 +382,128 @@ class Emitter(Signal, abc.ABC):
     def _eval(self, request: Request) -> np.ndarray:
         raise NotImplementedError
 
+    # Blocks are shared without copying: whatever `respond` returns is
+    # read-only, and may also be cached or handed to other receivers.
+    # Enable this to also checksum every block handed out, and check that it
+    # is unchanged by the time the next request arrives. This is slow.
+    check_blocks: typing.ClassVar[bool] = False
+
+    # Signals that must be evaluated in small blocks, e.g. to apply events
+    # sample-accurately, set this and have larger requests split up for them.
+    max_block_frames: typing.ClassVar[int | None] = None
+
+    # Whether `_eval` honours a request's channel mask, computing only the
+    # channels read. Masked requests to other signals are evaluated for every
+    # channel, and the mask applied to the result.
+    masks_channels: typing.ClassVar[bool] = False
+
+    # Set by the transport's `LoadShedder` while live playback can't keep up
+    shedding: typing.ClassVar[Shedding] = Shedding.NONE
+    # While shedding control rate, block-rate inputs are evaluated this often
+    shed_control_frames: typing.ClassVar[int] = 4096
+
     @classmethod
     def empty_result(cls) -> np.ndarray:
         return np.zeros(Shape.unit())
 
+    def warmup_frames(self) -> int:
+        """
+        How many frames must be requested, in order, before this signal's
+        output at a given position is correct. Signals that carry state from
+        one block to the next, or whose output depends on their input some
+        time before, should override this with how long that is.
+        """
+        return 0
+
+    def prefetch(self, loc: BlockLoc) -> None:
+        """
+        Prepare to be requested at `loc` soon, e.g. after a seek, so that slow
+        work such as disk reads happens ahead of time rather than in an audio
+        callback. Called from a background thread.
+        """
+        pass
+
     def _get_result(self, request: Request) -> np.ndarray:
-        return self._eval(request) if self._state.enabled else self.empty_result()
+        if not self._state.enabled:
+            return self.empty_result()
+        elif self.max_block_frames is not None and request.loc.shape.frames > self.max_block_frames:
+            return self._eval_sub_blocks(request)
+        else:
+            return self._eval(request)
+
+    def _eval_sub_blocks(self, request: Request) -> np.ndarray:
+        loc = request.loc
+        blocks = [
+            (frames, self._eval(attr.evolve(request, loc=attr.evolve(loc, position=position).resize(frames))))
+            for position in range(loc.position, loc.end_position, self.max_block_frames)
+            for frames in (min(self.max_block_frames, loc.end_position - position),)
+        ]
+        channels = max(block.shape[1] for _, block in blocks)
+        return np.concatenate([np.broadcast_to(block, (frames, channels)) for frames, block in blocks])
+
+    @property
+    def is_frozen(self) -> bool:
+        return self._frozen is not None
+
+    def freeze(self, frozen: 'Frozen') -> None:
+        self.unfreeze()
+        self._frozen = frozen
+        self._changed()
+
+    def unfreeze(self) -> None:
+        if self._frozen is not None:
+            self._frozen.release()
+            self._frozen = None
+            self._changed()
 
     def respond(self, request: Request) -> np.ndarray:
+        if request.loc.mask is not None and not self.masks_channels:
+            return self._respond_unmasked(request)
         self._last_request = request
-        return self._get_result(request)
+        if self._frozen is not None:
+            try:
+                return self._hand_out(self._frozen.read(request.loc), request)
+            except NotCached:
+                pass
+        return self._hand_out(self._get_result(request), request)
+
+    def _respond_unmasked(self, request: Request) -> np.ndarray:
+        loc = request.loc
+        unmasked = loc.reslice(self.channels)
+        block = self.respond(attr.evolve(request, loc=unmasked))
+        if block.shape[1] > 1:
+            block = block[:, loc.columns_in(unmasked)]
+        return self._hand_out(block, request)
+
+    def _hand_out(self, block: np.ndarray, request: Request) -> np.ndarray:
+        # A read-only view, so that signals may still write to arrays they
+        # hand out, e.g. their state
+        block = block.view()
+        block.flags.writeable = False
+        if self.check_blocks:
+            self._check_handed_out()
+            self._handed_out = request.loc, block, checksum(block)
+        return block
+
+    def _check_handed_out(self) -> None:
+        if self._handed_out is not None:
+            loc, block, block_checksum = self._handed_out
+            if checksum(block) != block_checksum:
+                raise MutatedBlock(self, loc)
+
+    def _changed(self) -> None:
+        # A cached digest or version implies cached ones for everything
+        # upstream, so there is nothing more to invalidate downstream of
+        # uncached ones.
+        cached = 'digest' in self.__dict__ or 'version' in self.__dict__
+        super()._changed()
+        if cached:
+            for _, receiver in self._outputs:
+                receiver._changed()
 
     def destroy(self) -> None:
         super().destroy()
+        self.unfreeze()
         for port_name, receiver in tuple(self.outputs_with_ports):
             delattr(receiver, port_name)
 
@@ -270,16 +515,31 @@ class Receiver(Signal, abc.ABC):
             self.name = name
             self.parent = parent
             self.sig = emitter
+            # What is actually requested: `sig`, or an identical emitter whose
+            # output it shares
+            self.source = emitter
+            # The last block-rate value, with its position, channel mask and
+            # the version of `source` it was evaluated at, reused while shedding
+            self._control: tuple[int, tuple[int, ...] | None, int, np.ndarray] | None = None
+            # A block already evaluated by a compiled program, returned instead
+            # of requesting the same location again
+            self._fed: tuple[BlockLoc, np.ndarray] | None = None
 
         def expel(self) -> None:
             self.sig._outputs.remove((self.name, self.parent))
-            self.sig = None
+            self.sig = self.source = None
+            self._control = None
+            self._fed = None
+            self.parent._changed()
 
         def assign(self, input_: 'Signal') -> None:
             if self.sig is not None:
                 self.expel()
-            self.sig = input_
+            self.sig = self.source = input_
+            self._control = None
+            self._fed = None
             self.sig._outputs.add((self.name, self.parent))
+            self.parent._changed()
 
         def __bool__(self):
             return self.sig is not None
@@ -288,22 +548,39 @@ class Receiver(Signal, abc.ABC):
             return Request(requestor=self.parent, port=self.name, loc=loc)
 
         def _do_request(self, request: Request) -> np.ndarray:
-            block = self.sig.respond(request)
+            block = self.source.respond(request)
             if not (block.shape <= request.loc.shape):
                 raise BadShape(self.sig, block.shape, request.loc.shape)
             return block
 
         def request(self, loc: BlockLoc) -> np.ndarray:
-            if self.sig is None:
+            fed = self._fed
+            if fed is not None and (fed[0] is loc or fed[0] == loc):
+                return fed[1]
+            elif self.sig is None:
                 return Emitter.empty_result()
             else:
+                if loc.mask is not None:
+                    loc = loc.fit_mask(self.sig.channels)
                 return self._do_request(self._make_request(loc))
 
         def forward(self, request: Request) -> np.ndarray:
             return self.request(request.loc)
 
         def forward_at_block_rate(self, request: Request) -> np.ndarray:
-            return self.request(request.loc.resize(1))
+            position, mask = request.loc.position, request.loc.mask
+            if (
+                Emitter.shedding >= Shedding.CONTROL_RATE
+                and self._control is not None
+                and 0 <= position - self._control[0] < Emitter.shed_control_frames
+                and mask == self._control[1]
+                and self.source.version == self._control[2]
+            ):
+                return self._control[3]
+            block = self.request(request.loc.resize(1))
+            if self.source is not None:
+                self._control = position, mask, self.source.version, block
+            return block
 
         def forward_with_context(self, request: Request, context_frames: int) -> np.ndarray:
             blocks = []
@@ -344,14 +621,31 @@ class Receiver(Signal, abc.ABC):
             if port
         }
 
+    def _update_digest(self, h: 'hashlib._Hash') -> bool:
+        deterministic = super()._update_digest(h)
+        for port_name, input_ in sorted(self.inputs_by_port.items()):
+            input_digest = input_.digest
+            if input_digest is None:
+                return False
+            h.update(port_name.encode())
+            h.update(input_digest.encode())
+        return deterministic
+
+    @functools.cached_property
+    def version(self) -> int:
+        return max([self._version, *(input_.version for input_ in self.inputs_by_port.values())])
+
     def upstream(self) -> typing.Sequence['Emitter']:
         return self._upstream(set())
 
     def _upstream(self, visited: set['Emitter']) -> collections.deque['Emitter']:
         result = collections.deque()
         for input in self.inputs_by_port.values():
-            if input not in visited and isinstance(input, Receiver):
-                result.extend(input._upstream(visited))
+            if input not in visited:
+                if isinstance(input, Receiver):
+                    result.extend(input._upstream(visited))
+                else:
+                    result.append(input)
                 visited.update(result)
         assert self not in visited, 'Cycle detected'
         result.append(self)
@@ -394,6 +688,9 @@ class ExplicitChannelsEmitter(ExplicitChannels, Emitter, ABC):
 
 
 class ImplicitChannels(Receiver, Emitter, abc.ABC):
+    # Each channel out is computed from the same channel in, so a mask can
+    # be forwarded as it is
+    masks_channels = True
 
     @property
     def channels(self) -> int:
@@ -417,49 +714,374 @@ class PassThroughResult(ImplicitChannels, ABC):
         return super()._get_result(request) if self._state.enabled else self.input.forward(request)
 
 
+class Denormals(enum.Enum):
+    # Leave subnormal floats alone
+    ALLOW = enum.auto()
+    # Flush values too small to hear to zero, going in, coming out, and in
+    # the state carried from one block to the next
+    FLUSH = enum.auto()
+    # Add an inaudible offset going in, so that recursions settle on it
+    # instead of decaying, and flush coming out and in the state carried
+    OFFSET = enum.auto()
+
+
+class Recursive(Emitter, abc.ABC):
+    """
+    A signal whose output feeds back into itself, such as an IIR filter.
+    Once its input falls silent its state decays towards zero, through the
+    subnormal floats, which most CPUs handle many times slower than normal
+    ones. `denormals` picks how every recursive signal guards against this.
+    It is part of their digests, so set it before any are computed.
+    The guard applies between blocks: to what goes into a recursion, what
+    comes out of it, and the state it carries over. Within one run of the
+    recursion over a block, values can still pass through the subnormal range
+    on the way to being flushed.
+    """
+    denormals: typing.ClassVar[Denormals] = Denormals.FLUSH
+    # Far below anything audible, and far above the subnormal range
+    denormal_threshold: typing.ClassVar[float] = 1e-30
+    denormal_offset: typing.ClassVar[float] = 1e-25
+
+    def _update_digest(self, h: 'hashlib._Hash') -> bool:
+        deterministic = super()._update_digest(h)
+        # Not part of the state, but it does change the output
+        h.update(self.denormals.name.encode())
+        return deterministic
+
+    @classmethod
+    def _flush_denormals(cls, block: np.ndarray) -> np.ndarray:
+        tiny = (np.abs(block) < cls.denormal_threshold) & (block != 0)
+        return np.where(tiny, 0., block) if tiny.any() else block
+
+    @classmethod
+    def _protect_input(cls, block: np.ndarray) -> np.ndarray:
+        if cls.denormals is Denormals.FLUSH:
+            return cls._flush_denormals(block)
+        elif cls.denormals is Denormals.OFFSET:
+            return block + cls.denormal_offset
+        else:
+            return block
+
+    @classmethod
+    def _protect_output(cls, block: np.ndarray) -> np.ndarray:
+        if cls.denormals is Denormals.ALLOW:
+            return block
+        else:
+            return cls._flush_denormals(block)
+
+    @classmethod
+    def _protect_state(cls, state: np.ndarray) -> np.ndarray:
+        return cls._protect_output(state)
+
+
+def checksum(block: np.ndarray) -> int:
+    return zlib.crc32(np.ascontiguousarray(block))
+
+
 class NotCached(RuntimeError):
     pass
 
 
+@attr.s(auto_attribs=True, frozen=True, kw_only=True)
+class Frozen:
+    """
+    A finished render of an emitter's output, usually memory-mapped from disk.
+    Requests that fall inside the render are served by slicing it, without
+    copying; anything else is left to the live graph.
+    """
+    loc: BlockLoc
+    buffer: np.ndarray
+    path: typing.Optional[str] = None
+
+    def read(self, loc: BlockLoc) -> np.ndarray:
+        columns = slice(None) if self.loc.shape.channels == 1 else loc.columns_in(self.loc)
+        if not (
+            loc.rate == self.loc.rate
+            and self.loc.position <= loc.position
+            and loc.end_position <= self.loc.end_position
+            and columns is not None
+        ):
+            raise NotCached
+        start = loc.position - self.loc.position
+        return self.buffer[start:start + loc.shape.frames, columns]
+
+    def release(self) -> None:
+        if self.path is not None:
+            # The buffer may still be mapped, but unlinking is safe on POSIX;
+            # the file is reclaimed once the last view is dropped.
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+
+@attr.s(auto_attribs=True, frozen=True, kw_only=True)
+class CachePolicy:
+    """
+    How many recent blocks a signal keeps in memory, written in its state as
+    `off`, `blocks:N`, `bytes:N`, or `pin:START:STOP` to keep every block
+    between two times, in seconds, and nothing else.
+
+    >>> CachePolicy.parse('blocks:16')
+    CachePolicy(blocks=16, bytes=None, pin=None)
+    >>> CachePolicy.parse('pin:0:2.5')
+    CachePolicy(blocks=None, bytes=None, pin=(0.0, 2.5))
+    >>> str(CachePolicy.parse('bytes:1000000'))
+    'bytes:1000000'
+    >>> CachePolicy.parse('blocks:0')
+    Traceback (most recent call last):
+    ...
+    ValueError: blocks:0
+    """
+    blocks: int | None = None
+    bytes: int | None = None
+    pin: tuple[float, float] | None = None
+
+    @classmethod
+    @functools.lru_cache
+    def parse(cls, policy: str) -> typing.Self:
+        kind, _, arg = policy.partition(':')
+        if kind == 'off' and not arg:
+            return cls(blocks=0)
+        elif kind == 'blocks' and (blocks := int(arg)) >= 1:
+            # `off` is how no blocks at all are written
+            return cls(blocks=blocks)
+        elif kind == 'bytes' and (bytes_ := int(arg)) >= 0:
+            return cls(bytes=bytes_)
+        elif kind == 'pin':
+            start, stop = map(float, arg.split(':'))
+            return cls(pin=(start, stop))
+        else:
+            raise ValueError(policy)
+
+    def __str__(self) -> str:
+        if self.pin is not None:
+            return f'pin:{self.pin[0]:g}:{self.pin[1]:g}'
+        elif self.bytes is not None:
+            return f'bytes:{self.bytes}'
+        elif self.blocks:
+            return f'blocks:{self.blocks}'
+        else:
+            return 'off'
+
+    def admits(self, loc: BlockLoc) -> bool:
+        if self.pin is None:
+            return self.blocks != 0
+        else:
+            start, stop = self.pin
+            return loc.timestamp < stop and start < loc.end_position / loc.rate
+
+    def is_full(self, blocks: int, bytes_: int) -> bool:
+        if self.pin is not None:
+            return False
+        elif self.bytes is not None:
+            return bytes_ > self.bytes
+        else:
+            return blocks > self.blocks
+
+
+@attr.s(auto_attribs=True, frozen=True, kw_only=True)
+class CacheUsage:
+    blocks: int
+    bytes: int
+    policy: str
+
+
+def _validate_cache_policy(instance, attribute, new_value):
+    try:
+        CachePolicy.parse(new_value)
+    except (ValueError, AttributeError):
+        raise BadStateValue(instance, attribute.name, new_value, 'must be off, blocks:N, bytes:N or pin:START:STOP')
+
+
 class BlockCachingEmitter(Emitter, abc.ABC):
+    # Whether blocks are also kept in the disk cache, which only pays for
+    # signals that take longer to evaluate than a block takes to read back
+    disk_caching: typing.ClassVar[bool] = False
+
+    @state
+    class State(Emitter.State):
+        cache: str = attr.ib(default='blocks:16',
+                             validator=_validate_cache_policy,
+                             on_setattr=attr.setters.validate,
+                             metadata={'digest': False})
 
     def __init__(self):
         super().__init__()
         self._block_cache: dict[BlockLoc, np.ndarray] = {}
-        self._max_cached_blocks = 16
+        self._cached_bytes = 0
+        # The version every cached block was rendered at
+        self._cached_version: int | None = None
+        # The most work any cached block was rendered shedding
+        self._cached_shedding = Shedding.NONE
+        # Only kept when checking blocks
+        self._block_checksums: dict[BlockLoc, int] = {}
+        self.disk_cache: typing.Optional['signals.chain.cache.DiskCache'] = None
 
     def _read_block_cache(self, request: Request) -> np.ndarray:
         try:
-            return self._block_cache[request.loc]
+            block = self._block_cache[request.loc]
         except KeyError:
             for loc, block in self._block_cache.items():
                 if request.loc <= loc:
+                    self._check_cached(loc, block)
                     requested_shape = request.loc.shape
                     start = request.loc.position - loc.position
-                    result = block[start:start+request.loc.shape.frames, :request.loc.shape.channels]
+                    result = block[start:start+request.loc.shape.frames, request.loc.columns_in(loc)]
                     shape = Shape.of_array(result)
                     assert shape == requested_shape, (shape, requested_shape)
                     return result
             raise NotCached
+        else:
+            self._check_cached(request.loc, block)
+            return block
+
+    def _check_cached(self, loc: BlockLoc, block: np.ndarray) -> None:
+        if self.check_blocks and checksum(block) != self._block_checksums.get(loc):
+            raise MutatedBlock(self, loc)
+
+    @property
+    def cache_policy(self) -> CachePolicy:
+        return CachePolicy.parse(self._state.cache)
+
+    @property
+    def cache_usage(self) -> CacheUsage:
+        return CacheUsage(blocks=len(self._block_cache), bytes=self._cached_bytes, policy=self._state.cache)
+
+    def set_state(self, new_state: 'BlockCachingEmitter.State') -> None:
+        super().set_state(new_state)
+        self._evict_block_cache()
 
     def _write_block_cache(self, block: np.ndarray, request: Request) -> None:
-        loc = attr.evolve(request.loc, shape=Shape.of_array(block))
-        self._block_cache[loc] = block
-        if len(self._block_cache) > self._max_cached_blocks:
-            self._block_cache.pop(next(iter(self._block_cache)))
+        # Compiled programs write without reading first
+        self._discard_stale_blocks()
+        self._cached_shedding = max(self._cached_shedding, self.shedding)
+        loc, shape = request.loc, Shape.of_array(block)
+        if shape != loc.shape:
+            # A single channel shared by all the requested ones is just that
+            loc = attr.evolve(loc, shape=shape, mask=loc.mask if shape.channels == loc.shape.channels else None)
+        if self.cache_policy.admits(loc) and loc not in self._block_cache:
+            self._block_cache[loc] = block
+            self._cached_bytes += block.nbytes
+            if self.check_blocks:
+                self._block_checksums[loc] = checksum(block)
+            self._evict_block_cache()
+
+    def _evict_block_cache(self) -> None:
+        policy = self.cache_policy
+        for loc in list(self._block_cache):
+            if policy.admits(loc) and not policy.is_full(len(self._block_cache), self._cached_bytes):
+                continue
+            # Oldest first
+            self._cached_bytes -= self._block_cache.pop(loc).nbytes
+            self._block_checksums.pop(loc, None)
+
+    def _discard_stale_blocks(self) -> None:
+        version = self.version
+        # Blocks rendered while shedding are worse than, or skipped the side
+        # effects of, what requests expect once it eases. Until then they
+        # still serve every reader of a block.
+        if version != self._cached_version or self.shedding < self._cached_shedding:
+            self.clear_block_cache()
+            self._cached_version = version
+            self._cached_shedding = self.shedding
+
+    def clear_block_cache(self) -> None:
+        self._block_cache.clear()
+        self._block_checksums.clear()
+        self._cached_bytes = 0
+
+    def _read_disk_cache(self, request: Request) -> np.ndarray:
+        if not self.disk_caching or self.disk_cache is None or (digest := self.digest) is None:
+            raise NotCached
+        else:
+            return self.disk_cache.read(digest, request.loc)
+
+    def _write_disk_cache(self, block: np.ndarray, request: Request) -> None:
+        # Blocks rendered while shedding aren't what the digest describes
+        if self.shedding > Shedding.VIS:
+            return
+        if self.disk_caching and self.disk_cache is not None and (digest := self.digest) is not None:
+            self.disk_cache.write(digest, request.loc, block)
 
     def respond(self, request: Request) -> np.ndarray:
+        if self.is_frozen or (request.loc.mask is not None and not self.masks_channels):
+            return super().respond(request)
+        self._discard_stale_blocks()
         try:
             result = self._read_block_cache(request)
         except NotCached:
-            result = super().respond(request)
+            try:
+                result = self._read_disk_cache(request)
+            except NotCached:
+                result = super().respond(request)
+                self._write_disk_cache(result, request)
             self._write_block_cache(result, request)
         return result
 
 
-if False:
-    class Epoch(Signal, abc.ABC):
+class Epoch(Emitter, abc.ABC):
+    """
+    A signal of fixed, finite length, such as a one-shot sample or an
+    envelope. It is rendered once, in full, and every request is served by
+    slicing that render; positions past the end wrap around if `loop` is set,
+    and are silent otherwise. Any change of state discards the render.
+    """
+
+    @state
+    class State(Emitter.State):
+        loop: bool = attr.ib(default=False)
+
+    def __init__(self):
+        super().__init__()
+        # The rate rendered at, and the render
+        self._rendered: tuple[int, np.ndarray] | None = None
+
+    @classmethod
+    def flags(cls) -> SignalFlags:
+        return super().flags() | SignalFlags.EPOCH
+
+    @abc.abstractmethod
+    def length(self, rate: int) -> int:
+        """
+        How many frames long this signal is at `rate`.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _render(self, frames: int, rate: int) -> np.ndarray:
+        raise NotImplementedError
+
+    def _changed(self) -> None:
+        self._rendered = None
+        super()._changed()
 
-        @classmethod
-        def flags(cls) -> SignalFlags:
-            return super().flags() | SignalFlags.EPOCH
+    def prefetch(self, loc: BlockLoc) -> None:
+        self._get_rendered(loc.rate)
+
+    def _get_rendered(self, rate: int) -> np.ndarray:
+        rendered = self._rendered
+        if rendered is None or rendered[0] != rate:
+            block = self._render(self.length(rate), rate)
+            block.flags.writeable = False
+            rendered = self._rendered = rate, block
+        return rendered[1]
+
+    def _eval(self, request: Request) -> np.ndarray:
+        loc = request.loc
+        rendered = self._get_rendered(loc.rate)
+        length = len(rendered)
+        if not length:
+            return self.empty_result()
+        start = loc.position % length if self._state.loop else loc.position
+        stop = start + loc.shape.frames
+        if 0 <= start and stop <= length:
+            return rendered[start:stop]
+        elif self._state.loop:
+            return rendered[np.arange(start, stop) % length]
+        else:
+            result = np.zeros((loc.shape.frames, rendered.shape[1]))
+            first, last = max(start, 0), min(stop, length)
+            if first < last:
+                result[first - start:last - start] = rendered[first:last]
+            return result
@@ -0,0 +1,139 @@
+import collections
+import os
+import pathlib
+import queue
+import tempfile
+import threading
+import traceback
+
+import numpy as np
+
+from signals.chain import (
+    BlockLoc,
+    NotCached,
+)
+
+
+class DiskCache:
+    """
+    Content-addressed store of rendered blocks.
+    Blocks are keyed by the digest of the signal that produced them and the
+    location they were requested at, and are kept as `.npy` files so that hits
+    can be memory-mapped instead of read. The least recently used files are
+    evicted once the total size exceeds `max_bytes`.
+    Blocks are written by a background thread, so that `write` never waits on
+    the disk; `flush` waits for what was written so far.
+    """
+    suffix = '.npy'
+
+    def __init__(self, path: pathlib.Path, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._sizes: collections.OrderedDict[pathlib.Path, int] = collections.OrderedDict()
+        entries = sorted(
+            (entry.stat().st_mtime, pathlib.Path(entry.path), entry.stat().st_size)
+            for entry in os.scandir(self.path)
+            if entry.name.endswith(self.suffix)
+        )
+        for _, entry_path, size in entries:
+            self._sizes[entry_path] = size
+        self._bytes = sum(self._sizes.values())
+        self._evict()
+        # Guards `_sizes` and `_bytes` against the writer
+        self._lock = threading.Lock()
+        # Entries queued but not yet written
+        self._pending: set[pathlib.Path] = set()
+        self._queue = queue.Queue[tuple[pathlib.Path, np.ndarray]]()
+        self._thread = threading.Thread(target=self._run, name='signals-disk-cache', daemon=True)
+        self._thread.start()
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    def _entry_path(self, digest: str, loc: BlockLoc) -> pathlib.Path:
+        channels = loc.shape.channels if loc.mask is None else 'c' + '.'.join(map(str, loc.mask))
+        name = f'{digest}-{loc.rate}-{loc.position}-{loc.shape.frames}x{channels}{self.suffix}'
+        return self.path / name
+
+    def read(self, digest: str, loc: BlockLoc) -> np.ndarray:
+        path = self._entry_path(digest, loc)
+        with self._lock:
+            if path not in self._sizes:
+                raise NotCached
+            try:
+                block = np.load(path, mmap_mode='r')
+                # Persist recency so that eviction order survives a restart
+                os.utime(path)
+            except (FileNotFoundError, ValueError):
+                # Removed by something other than this cache
+                self._forget(path)
+                raise NotCached
+            self._sizes.move_to_end(path)
+        return block
+
+    def write(self, digest: str, loc: BlockLoc, block: np.ndarray) -> None:
+        """
+        Queue `block` to be written. Blocks handed out are never modified, so
+        it is not copied.
+        """
+        path = self._entry_path(digest, loc)
+        with self._lock:
+            if path in self._sizes or path in self._pending:
+                return
+            self._pending.add(path)
+        self._queue.put((path, block))
+
+    def flush(self) -> None:
+        """
+        Wait until every block queued so far is written.
+        """
+        self._queue.join()
+
+    def clear(self) -> None:
+        self.flush()
+        with self._lock:
+            for path in tuple(self._sizes):
+                self._remove(path)
+
+    def _run(self) -> None:
+        while True:
+            path, block = self._queue.get()
+            try:
+                self._store(path, block)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                with self._lock:
+                    self._pending.discard(path)
+                self._queue.task_done()
+
+    def _store(self, path: pathlib.Path, block: np.ndarray) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, block)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        size = path.stat().st_size
+        with self._lock:
+            self._sizes[path] = size
+            self._bytes += size
+            self._evict()
+
+    def _forget(self, path: pathlib.Path) -> None:
+        self._bytes -= self._sizes.pop(path)
+
+    def _remove(self, path: pathlib.Path) -> None:
+        self._forget(path)
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._sizes:
+            self._remove(next(iter(self._sizes)))
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import threading
+import typing
+
+import numpy as np
+
+from signals.chain import (
+    BlockCachingEmitter,
+    BlockLoc,
+    Emitter,
+    Receiver,
+    Request,
+    Shape,
+)
+
+Tick = typing.Callable[[BlockLoc], np.ndarray]
+Binder = typing.Callable[[list[Emitter], list[Receiver.BoundPort], dict[str, typing.Any]], Tick]
+# The channels requested of a signal, and its channel mask
+Channels = tuple[int, tuple[int, ...] | None]
+
+# How a program evaluates each signal in it
+GET = 'get'
+# Also filling the signal's block cache
+CACHE = 'cache'
+# Through `respond`, e.g. when frozen
+RESPOND = 'respond'
+# Not at all, leaving it to be pulled through its ports as usual
+PULL = 'pull'
+
+# Generated once for each structure, and bound to any number of graphs of it
+_binders: dict[str, Binder] = {}
+_binders_lock = threading.Lock()
+
+
+class Program:
+    """
+    The graph upstream of `root`, compiled into one generated function: for
+    each block, every signal in it is evaluated once, in order, and its
+    result fed straight to the ports that read it, with everything called
+    bound to locals beforehand. This skips most of the cost of pulling each
+    request through the graph, which dominates at small block sizes.
+
+    The first block after binding is pulled as usual, as a probe of which
+    channels each signal is asked for at the block's position. Signals only
+    ever asked for something else, such as context around the block or a
+    block-rate value, are left to be pulled as usual, as are any requests
+    that don't match what was evaluated for them. The disk cache is bypassed.
+
+    The function is rebound whenever anything upstream changes, and its
+    source is generated once per structure, keyed by a hash of it.
+    """
+
+    def __init__(self, root: Emitter):
+        self.root = root
+        self._version: int | None = None
+        self._channels: Channels | None = None
+        self._tick: Tick | None = None
+        # The ports the tick feeds, whose `_fed` blocks are stale once it is
+        # rebound
+        self._ports: list[Receiver.BoundPort] = []
+
+    def __call__(self, loc: BlockLoc) -> np.ndarray:
+        if self.root.version != self._version or (loc.shape.channels, loc.mask) != self._channels:
+            return self._probe(loc)
+        else:
+            return self._tick(loc)
+
+    def _probe(self, loc: BlockLoc) -> np.ndarray:
+        for port in self._ports:
+            port._fed = None
+        version = self.root.version
+        nodes = list(self.root.upstream()) if isinstance(self.root, Receiver) else [self.root]
+        requested: dict[Emitter, Channels] = {}
+
+        def record(node: Emitter) -> typing.Callable[[Request], np.ndarray]:
+            respond = node.respond
+
+            def recording(request: Request) -> np.ndarray:
+                at = request.loc
+                if at.position == loc.position and at.shape.frames == loc.shape.frames:
+                    requested.setdefault(node, (at.shape.channels, at.mask))
+                return respond(request)
+
+            return recording
+
+        for node in nodes[:-1]:
+            node.respond = record(node)
+        try:
+            block = self.root.respond(Request(requestor=None, port='compiled', loc=loc))
+        finally:
+            for node in nodes[:-1]:
+                del node.respond
+        requested[self.root] = loc.shape.channels, loc.mask
+        self._link(nodes, requested)
+        self._version = version
+        self._channels = requested[self.root]
+        return block
+
+    @staticmethod
+    def _mode(node: Emitter, channels: Channels | None) -> str:
+        if channels is None:
+            return PULL
+        elif node.is_frozen or (channels[1] is not None and not node.masks_channels):
+            return RESPOND
+        elif isinstance(node, BlockCachingEmitter):
+            return CACHE
+        else:
+            return GET
+
+    def _link(self, nodes: list[Emitter], requested: dict[Emitter, Channels]) -> None:
+        modes = [self._mode(node, requested.get(node)) for node in nodes]
+        # Each distinct set of channels gets one location per block, the
+        # root's being the location it is called with
+        groups = [requested[self.root]]
+        groups += dict.fromkeys(
+            requested[node]
+            for node, mode in zip(nodes, modes)
+            if mode != PULL and requested[node] != groups[0]
+        )
+        group = [None if mode == PULL else groups.index(requested[node]) for node, mode in zip(nodes, modes)]
+        index = {node: i for i, node in enumerate(nodes)}
+        ports = [[] for _ in nodes]
+        for node, mode in zip(nodes, modes):
+            if isinstance(node, Receiver):
+                for port in node._ports.values():
+                    if port:
+                        port._fed = None
+                        # The emitter requested may be shared from outside
+                        source = index.get(port.source)
+                        if mode != PULL and source is not None and modes[source] != PULL:
+                            ports[source].append(port)
+        fed = {i: len(node_ports) for i, node_ports in enumerate(ports) if node_ports}
+        key = hashlib.sha3_256(json.dumps([modes, group, groups, list(fed.items())]).encode()).hexdigest()
+        with _binders_lock:
+            try:
+                binder = _binders[key]
+            except KeyError:
+                binder = _binders[key] = _generate(modes, group, groups, fed)
+        self._ports = [port for node_ports in ports for port in node_ports]
+        self._tick = binder(nodes,
+                            self._ports,
+                            dict(BlockLoc=BlockLoc, Request=Request, Shape=Shape))
+
+
+def _generate(modes: list[str], group: list[int | None], groups: list[Channels], fed: dict[int, int]) -> Binder:
+    lines = [
+        'def bind(nodes, ports, names):',
+        '    BlockLoc, Request, Shape = names["BlockLoc"], names["Request"], names["Shape"]',
+        f'    {"".join(f"node_{i}, " for i in range(len(modes)))}= nodes',
+    ]
+    if fed:
+        lines.append(f'    {"".join(f"port_{i}_{j}, " for i, count in fed.items() for j in range(count))}= ports')
+    for i, mode in enumerate(modes):
+        if mode == RESPOND:
+            lines.append(f'    respond_{i} = node_{i}.respond')
+        elif mode != PULL:
+            lines.append(f'    get_{i} = node_{i}._get_result')
+            lines.append(f'    hand_out_{i} = node_{i}._hand_out')
+            if mode == CACHE:
+                lines.append(f'    write_{i} = node_{i}._write_block_cache')
+    lines += [
+        '    def tick(loc_0):',
+        "        request_0 = Request(requestor=None, port='compiled', loc=loc_0)",
+    ]
+    if len(groups) > 1:
+        lines.append('        position, rate, frames = loc_0.position, loc_0.rate, loc_0.shape.frames')
+    for g, (channels, mask) in enumerate(groups[1:], 1):
+        lines.append(f'        loc_{g} = BlockLoc(position=position, rate=rate, '
+                     f'shape=Shape(frames=frames, channels={channels}), mask={mask!r})')
+        lines.append(f"        request_{g} = Request(requestor=None, port='compiled', loc=loc_{g})")
+    for i, mode in enumerate(modes):
+        g = group[i]
+        if mode == RESPOND:
+            lines.append(f'        block = respond_{i}(request_{g})')
+        elif mode != PULL:
+            lines.append(f'        node_{i}._last_request = request_{g}')
+            lines.append(f'        block = hand_out_{i}(get_{i}(request_{g}), request_{g})')
+            if mode == CACHE:
+                lines.append(f'        write_{i}(block, request_{g})')
+        if i in fed:
+            lines.append(f'        {"".join(f"port_{i}_{j}._fed = " for j in range(fed[i]))}loc_{g}, block')
+    lines += [
+        '        return block',
+        '    return tick',
+    ]
+    namespace = {}
+    exec(compile('\n'.join(lines), '<signals program>', 'exec'), namespace)
+    return namespace['bind']
@@ -0,0 +1,120 @@
+import json
+import pathlib
+import typing
+
+import attr
+import numpy as np
+
+from signals import (
+    PortName,
+)
+from signals.chain import (
+    Emitter,
+    Receiver,
+    Signal,
+)
+import signals.chain.dev
+
+# Written by `benchmarks/bench.py --calibrate`
+default_path = pathlib.Path(__file__).with_name('costs.json')
+
+
+@attr.s(auto_attribs=True, kw_only=True, frozen=True)
+class Cost:
+    # Nanoseconds spent on each block, whatever its size
+    per_block: float = 0.
+    # Nanoseconds spent on each frame of each channel
+    per_sample: float = 0.
+
+    def ns(self, frames: int, channels: int) -> float:
+        return self.per_block + self.per_sample * frames * channels
+
+    @classmethod
+    def fit(cls, samples: typing.Iterable[tuple[int, float, float]]) -> typing.Self:
+        """
+        Fit to measurements of how many nanoseconds blocks of so many
+        samples, i.e. frames times channels, took, each with the total it
+        was measured as part of.
+        Errors are weighed relative to those totals, so that small blocks
+        count as much as large ones.
+        """
+        x, y, total = np.array(list(samples), dtype=float).T
+        if len(set(x)) < 2:
+            return cls(per_sample=max(float(np.mean(y / x)), 0.))
+        per_sample, per_block = np.polyfit(x, y, 1, w=1 / total)
+        return cls(per_block=max(float(per_block), 0.), per_sample=max(float(per_sample), 0.))
+
+
+class CostModel:
+    """
+    Predicts how long evaluating a graph takes, from how long each class of
+    signal takes per block and per sample. Classes that were never measured
+    are assumed to be as costly as the costliest that were.
+    """
+
+    def __init__(self, costs: dict[str, Cost]):
+        self.costs = costs
+        self.default = Cost(per_block=max((cost.per_block for cost in costs.values()), default=0.),
+                            per_sample=max((cost.per_sample for cost in costs.values()), default=0.))
+
+    @classmethod
+    def load(cls, path: pathlib.Path = default_path) -> typing.Self:
+        try:
+            with open(path) as f:
+                costs = json.load(f)
+        except FileNotFoundError:
+            costs = {}
+        return cls({cls_name: Cost(**cost) for cls_name, cost in costs.items()})
+
+    def save(self, path: pathlib.Path = default_path) -> None:
+        with open(path, 'w') as f:
+            json.dump({cls_name: attr.asdict(cost) for cls_name, cost in self.costs.items()},
+                      f,
+                      indent=1,
+                      sort_keys=True)
+            f.write('\n')
+
+    def of(self, sig: Signal) -> Cost:
+        return self.costs.get(sig.cls_name(), self.default)
+
+    def predict(self,
+                roots: typing.Iterable[Signal],
+                frames: int,
+                inputs: typing.Mapping[tuple[Receiver, PortName], Emitter | None] = {}
+                ) -> dict[Signal, float]:
+        """
+        Nanoseconds each of `roots`, and each signal evaluated for them, is
+        predicted to take for a block of `frames` frames, with the ports in
+        `inputs` reading those inputs instead.
+        Signals are evaluated once per block however many read them, and
+        nothing upstream of a frozen signal is evaluated at all. Devices
+        can't be measured offline, and count as costing nothing.
+        """
+        result = {}
+        pending = list(roots)
+        while pending:
+            sig = pending.pop()
+            if sig in result:
+                continue
+            elif isinstance(sig, Emitter) and sig.is_frozen:
+                result[sig] = 0.
+                continue
+            elif isinstance(sig, signals.chain.dev.Device):
+                result[sig] = 0.
+            else:
+                try:
+                    channels = sig.channels
+                except (ValueError, RuntimeError):
+                    # Its inputs disagree, it has none yet, or its file
+                    # can't be read
+                    channels = 1
+                result[sig] = self.of(sig).ns(frames, channels)
+            if isinstance(sig, Receiver):
+                for port_name in sig.port_names():
+                    try:
+                        input_ = inputs[sig, port_name]
+                    except KeyError:
+                        input_ = getattr(sig, port_name).source
+                    if input_ is not None:
+                        pending.append(input_)
+        return result
@@ -1,6 +1,8 @@
 import abc
 import queue
 import sys
+import threading
+import time
 import traceback
 import typing
 
@@ -20,10 +22,17 @@ from signals.chain import (
     Receiver,
     Request,
     Shape,
+    Shedding,
     Signal,
     port,
     state,
 )
+from signals.chain.compiler import (
+    Program,
+)
+from signals.chain.handoff import (
+    SideEffect,
+)
 
 
 class BadPlaybackState(ChainLayerError):
@@ -93,7 +102,7 @@ class SinkDevice(Device, Receiver, ExplicitChannels):
     #  (so it doesn't have to be written to during `respond`).
     input = port('input')
 
-    def __init__(self, info: DeviceInfo):
+    def __init__(self, info: DeviceInfo, transport: 'Transport | None' = None):
 
         @state
         class State(ExplicitChannels.State):
@@ -103,11 +112,17 @@ class SinkDevice(Device, Receiver, ExplicitChannels):
         self.State = State
 
         super().__init__(info=info)
-        self.frame_position = 0
         self._stream: sd.OutputStream | None = None
+        # Set while attached to `transport`, which is shared by every sink of
+        # a map, and only plays this one once it attaches it
+        self.fifo: BlockFifo | None = None
+        self.transport = transport
+        self._last_error: str | None = None
 
     def set_state(self, new_state: 'SinkDevice.State') -> None:
         super().set_state(new_state)
+        if self.fifo is not None and self.fifo.channels != new_state.channels:
+            self.transport.attach(self)
         if self.is_open and self._stream.channels != new_state.channels:
             active = self.is_active
             self.close()
@@ -121,6 +136,8 @@ class SinkDevice(Device, Receiver, ExplicitChannels):
         return super().flags() | SignalFlags.SINK_DEVICE
 
     def destroy(self) -> None:
+        if self.transport is not None:
+            self.transport.detach(self)
         if self.is_open:
             self.close()
         super().destroy()
@@ -133,12 +150,17 @@ class SinkDevice(Device, Receiver, ExplicitChannels):
     def is_active(self) -> bool:
         return self.is_open and self._stream.active
 
+    @property
+    def latency(self) -> float:
+        return self._stream.latency if self.is_open else self.info.default_low_output_latency
+
     def open(self) -> None:
         if self.is_open:
             raise BadPlaybackState('The output stream is already open')
         self._stream = sd.OutputStream(device=self.info.index,
                                        callback=self._callback,
-                                       channels=self._state.channels)
+                                       channels=self._state.channels,
+                                       samplerate=self.transport.rate)
 
     def close(self) -> None:
         if self.is_open:
@@ -158,25 +180,356 @@ class SinkDevice(Device, Receiver, ExplicitChannels):
         else:
             raise BadPlaybackState('The output stream is not active')
 
-    def seek(self, position: int):
-        self.frame_position = position * self._stream.blocksize
-
-    def tell(self) -> int:
-        return self.frame_position // self._stream.blocksize
-
     def _callback(self, outdata: np.ndarray, frames: int, time: typing.Any, status: sd.CallbackFlags) -> None:
         if status:
             self.log(status)
-        shape = Shape(channels=self._state.channels, frames=frames)
-        loc = BlockLoc(position=self.frame_position, shape=shape, rate=int(self._stream.samplerate))
         try:
-            block = self.input.request(loc)
+            self.transport.fill(self, frames)
         except Exception:
-            self.log(traceback.format_exc())
-            raise sd.CallbackStop
+            # Keep playing whatever is queued, rather than silencing the
+            # device, and don't log the same failure on every callback
+            error = traceback.format_exc()
+            if error != self._last_error:
+                self.log(error)
+                self._last_error = error
+        fifo = self.fifo
+        # Released while this callback ran
+        read = 0 if fifo is None else fifo.read(outdata)
+        # Underruns are silent rather than repeating stale frames
+        outdata[read:] = 0
+
+
+class BlockFifo:
+    """
+    Frames rendered ahead of a device, written by the transport and read by
+    the device's callback.
+    Only the writer advances `_written` and only the reader advances `_read`,
+    so neither side needs a lock.
+    """
+
+    def __init__(self, capacity: int, channels: int):
+        self._buffer = np.zeros((capacity, channels))
+        self._written = 0
+        self._read = 0
+        # Set by the writer to make the reader skip everything written so far
+        self._discarded = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buffer)
+
+    @property
+    def channels(self) -> int:
+        return self._buffer.shape[1]
+
+    @property
+    def available(self) -> int:
+        return self._written - max(self._read, self._discarded)
+
+    def write(self, block: np.ndarray) -> None:
+        frames = len(block)
+        if frames > self.capacity - self.available:
+            # A reader that has fallen behind loses its oldest frames
+            self._discarded = self._written + frames - self.capacity
+        start = self._written % self.capacity
+        head = min(frames, self.capacity - start)
+        self._buffer[start:start + head] = block[:head]
+        self._buffer[:frames - head] = block[head:]
+        self._written += frames
+
+    def read(self, out: np.ndarray) -> int:
+        self._read = max(self._read, self._discarded)
+        frames = min(len(out), self._written - self._read)
+        start = self._read % self.capacity
+        head = min(frames, self.capacity - start)
+        out[:head] = self._buffer[start:start + head]
+        out[head:frames] = self._buffer[:frames - head]
+        self._read += frames
+        return frames
+
+    def discard(self) -> None:
+        self._discarded = self._written
+
+    def resized(self, capacity: int) -> 'BlockFifo':
+        """
+        A queue of a new size holding whatever this one still holds. Neither
+        may be written or read while this runs.
+        """
+        result = BlockFifo(capacity, self.channels)
+        block = np.empty((min(self.available, capacity), self.channels))
+        self.read(block)
+        result.write(block)
+        return result
+
+
+class LoadShedder:
+    """
+    Compares how long each block takes to evaluate with how long it lasts,
+    and sheds work in `Shedding` order while that comes too close: one level
+    more every time a block exceeds `high` of its duration, and one level
+    less only after `recovery` blocks in a row have stayed under `low`.
+    """
+
+    def __init__(self, *, high: float = 0.8, low: float = 0.5, recovery: int = 32):
+        self.high = high
+        self.low = low
+        self.recovery = recovery
+        self.level = Shedding.NONE
+        self._calm = 0
+
+    def record(self, seconds: float, deadline: float) -> None:
+        load = seconds / deadline
+        if load > self.high:
+            self._calm = 0
+            self._set_level(min(self.level + 1, max(Shedding)))
+        elif load < self.low:
+            self._calm += 1
+            if self._calm >= self.recovery:
+                self._calm = 0
+                self._set_level(max(self.level - 1, Shedding.NONE))
         else:
-            outdata[:, :shape.channels] = block
-        self.frame_position += frames
+            self._calm = 0
+
+    def reset(self) -> None:
+        self._calm = 0
+        self._set_level(Shedding.NONE)
+
+    def _set_level(self, level: int) -> None:
+        self.level = Shedding(level)
+        Emitter.shedding = self.level
+
+
+class Transport:
+    """
+    Owns the play position shared by every attached sink.
+    Each block is evaluated once for all sinks, at the same position, and
+    queued for each of them; device callbacks then copy out of their own
+    queue, and only evaluate more when theirs runs dry.
+    Blocks are `block_size` frames, picked for throughput whatever size the
+    devices ask for; each sink's queue re-blocks between the two, and bounds
+    the latency this adds, as reported by `latency`.
+    While blocks take too long to evaluate, `shedder` degrades playback
+    rather than let it cut out.
+    Seeking warms up in the background: upstream signals are asked to
+    prefetch, and the queues are refilled at the new position, so callbacks
+    after a seek don't pay for cold caches or disk reads. Callbacks play
+    what the warm-up has queued so far, and silence beyond that, for at most
+    `max_warmup` seconds; after that they evaluate what they need themselves.
+    If `compiled` is set, each sink's upstream graph is evaluated by a
+    compiled `Program`, which costs much less per block at small sizes.
+    """
+
+    # Seconds after a seek during which callbacks leave evaluating to the
+    # warm-up, rather than wait for it
+    max_warmup = 0.05
+
+    def __init__(self,
+                 *,
+                 rate: int = 44100,
+                 block_size: int = 1024,
+                 buffer_blocks: int = 4,
+                 compiled: bool = False):
+        self.rate = rate
+        self.block_size = block_size
+        self.buffer_blocks = buffer_blocks
+        self.buffer_frames = block_size * buffer_blocks
+        self.position = 0
+        self.is_playing = False
+        self.sinks: list[SinkDevice] = []
+        self.shedder = LoadShedder()
+        self.compiled = compiled
+        self._programs: dict[SinkDevice, Program] = {}
+        self._lock = threading.RLock()
+        # Bumped by every seek, so that a stale warm-up gives up
+        self._generation = 0
+        self._warming = False
+        self._seeked_at = 0.
+
+    def attach(self, sink: SinkDevice) -> None:
+        """
+        Add `sink`, taking it from any other transport, or reset its queue if
+        it is already attached.
+        """
+        if sink.transport is not None and sink.transport is not self:
+            sink.transport.detach(sink)
+        with self._lock:
+            sink.transport = self
+            sink.fifo = BlockFifo(self.buffer_frames, sink.get_state().channels)
+            if sink not in self.sinks:
+                self.sinks.append(sink)
+                if self.is_playing:
+                    sink.start()
+            self.reserve()
+
+    def reserve(self) -> None:
+        """
+        Make room in the handoff of every side effect the sinks play for the
+        blocks they are played in, ahead of playback rather than in a
+        callback. Call it whenever the graph upstream of a sink changes.
+        """
+        with self._lock:
+            for sink in self.sinks:
+                for upstream in sink.upstream():
+                    if isinstance(upstream, SideEffect):
+                        upstream.reserve(self.block_size)
+
+    def set_block_size(self, block_size: int) -> None:
+        with self._lock:
+            # Replay whatever was queued but not yet played, in the new size
+            position = self.position - max((sink.fifo.available for sink in self.sinks), default=0)
+            self.block_size = block_size
+            self.buffer_frames = block_size * self.buffer_blocks
+            if self.sinks:
+                for sink in self.sinks:
+                    self.attach(sink)
+                self.seek(position)
+
+    def latency(self, sink: SinkDevice) -> float:
+        """
+        The longest time in seconds between a block being evaluated and
+        `sink` playing it: as much as its queue holds, plus the device's own
+        buffer.
+        """
+        return sink.fifo.capacity / self.rate + sink.latency
+
+    def detach(self, sink: SinkDevice) -> None:
+        with self._lock:
+            if sink in self.sinks:
+                self.sinks.remove(sink)
+            self._programs.pop(sink, None)
+
+    def release(self, sink: SinkDevice) -> None:
+        """
+        Detach `sink` and close its stream, leaving it silent until it is
+        attached again.
+        """
+        self.detach(sink)
+        if sink.is_open:
+            sink.close()
+        sink.fifo = None
+
+    def replace(self, sinks: typing.Iterable[SinkDevice]) -> None:
+        """
+        Attach `sinks` instead of the sinks attached now, replaying whatever
+        was queued but not yet played, so that the change is heard at once.
+        """
+        sinks = list(sinks)
+        with self._lock:
+            position = self.position - max((sink.fifo.available for sink in self.sinks), default=0)
+            for sink in tuple(self.sinks):
+                if sink not in sinks:
+                    self.release(sink)
+            for sink in sinks:
+                self.attach(sink)
+            self.seek(position)
+
+    def play(self) -> None:
+        with self._lock:
+            self.is_playing = True
+            for sink in self.sinks:
+                if not sink.is_active:
+                    sink.start()
+
+    def pause(self) -> None:
+        with self._lock:
+            self.is_playing = False
+            self.shedder.reset()
+            for sink in self.sinks:
+                if sink.is_active:
+                    sink.stop()
+
+    def stop(self) -> None:
+        self.pause()
+        self.seek(0)
+
+    def seek(self, position: int) -> None:
+        with self._lock:
+            self.position = position
+            for sink in self.sinks:
+                sink.fifo.discard()
+            self._generation += 1
+            self._warming = True
+            self._seeked_at = time.perf_counter()
+            threading.Thread(target=self._warm_up, args=(self._generation,), daemon=True).start()
+
+    def tell(self) -> int:
+        return self.position
+
+    def fill(self, sink: SinkDevice, frames: int) -> None:
+        """
+        Evaluate blocks for every sink until `sink` has `frames` frames queued.
+        """
+        if sink.fifo is None or sink.fifo.available >= frames:
+            return
+        elif self._warming and time.perf_counter() - self._seeked_at < self.max_warmup:
+            # The warm-up is already rendering; rather than wait for it, play
+            # whatever it has queued so far
+            return
+        with self._lock:
+            if sink not in self.sinks:
+                # A late callback of a sink being released, which no tick
+                # would ever fill
+                return
+            if frames + self.block_size > sink.fifo.capacity:
+                # The device asks for more at once than the queue can hold
+                sink.fifo = sink.fifo.resized(frames + self.block_size)
+            while sink.fifo.available < frames:
+                self._tick()
+
+    def _warm_up(self, generation: int) -> None:
+        try:
+            with self._lock:
+                if generation != self._generation:
+                    return
+                prefetches = [
+                    (upstream, BlockLoc(position=self.position,
+                                        rate=self.rate,
+                                        shape=Shape(frames=self.buffer_frames, channels=sink.fifo.channels)))
+                    for sink in self.sinks
+                    for upstream in sink.upstream()
+                    if isinstance(upstream, Emitter)
+                ]
+            # Disk reads and renders run outside the lock, which callbacks
+            # take; signals that prefetch guard themselves
+            for upstream, loc in prefetches:
+                if generation != self._generation:
+                    return
+                upstream.prefetch(loc)
+            while True:
+                # Callbacks may read in between blocks
+                with self._lock:
+                    if generation != self._generation or not self._has_room():
+                        break
+                    self._tick()
+        except Exception:
+            traceback.print_exc()
+        finally:
+            with self._lock:
+                if generation == self._generation:
+                    self._warming = False
+
+    def _has_room(self) -> bool:
+        return bool(self.sinks) and all(
+            sink.fifo.capacity - sink.fifo.available >= self.block_size
+            for sink in self.sinks
+        )
+
+    def _tick(self) -> None:
+        start = time.perf_counter()
+        for sink in self.sinks:
+            shape = Shape(frames=self.block_size, channels=sink.fifo.channels)
+            block = self._request(sink, BlockLoc(position=self.position, rate=self.rate, shape=shape))
+            sink.fifo.write(np.broadcast_to(block, shape))
+        self.position += self.block_size
+        self.shedder.record(time.perf_counter() - start, self.block_size / self.rate)
+
+    def _request(self, sink: SinkDevice, loc: BlockLoc) -> np.ndarray:
+        if not (self.compiled and sink.input):
+            return sink.input.request(loc)
+        program = self._programs.get(sink)
+        if program is None or program.root is not sink.input.sig:
+            program = self._programs[sink] = Program(sink.input.sig)
+        return program(loc)
 
 
 class SourceDevice(Device, Emitter):
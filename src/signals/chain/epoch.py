@@ -0,0 +1,118 @@
+import functools
+import math
+import os
+
+import attr
+import attrs.validators
+import numpy as np
+import scipy.signal
+import soundfile as sf
+
+from signals import (
+    SignalFlags,
+)
+from signals.chain import (
+    BadStateValue,
+    Epoch,
+    state,
+)
+
+
+class Envelope(Epoch):
+    """
+    Rises to 1, falls to `sustain`, holds there and falls to 0, over the
+    given numbers of seconds.
+    """
+
+    @state
+    class State(Epoch.State):
+        attack: float = attr.ib(validator=attrs.validators.ge(0), default=0.01)
+        decay: float = attr.ib(validator=attrs.validators.ge(0), default=0.1)
+        sustain: float = attr.ib(default=0.5)
+        hold: float = attr.ib(validator=attrs.validators.ge(0), default=0.5)
+        release: float = attr.ib(validator=attrs.validators.ge(0), default=0.5)
+
+    @classmethod
+    def flags(cls) -> SignalFlags:
+        return super().flags()
+
+    @property
+    def channels(self) -> int:
+        return 1
+
+    def length(self, rate: int) -> int:
+        s = self._state
+        return round((s.attack + s.decay + s.hold + s.release) * rate)
+
+    def _render(self, frames: int, rate: int) -> np.ndarray:
+        s = self._state
+        times = np.cumsum([0, s.attack, s.decay, s.hold, s.release])
+        levels = [0, 1, s.sustain, s.sustain, 0]
+        return np.interp(np.arange(frames) / rate, times, levels).reshape(-1, 1)
+
+
+@functools.lru_cache(maxsize=64)
+def _read_info(path: str, mtime_ns: int) -> sf._SoundFileInfo:
+    return sf.info(path)
+
+
+def _sample_info(path: str) -> sf._SoundFileInfo | None:
+    """
+    The header of the sound file at `path`, read again only once the file
+    changes, or None for no file.
+    """
+    return _read_info(path, os.stat(path).st_mtime_ns) if path else None
+
+
+def _validate_sample_path(instance, attribute, new_value):
+    try:
+        _sample_info(new_value)
+    except (OSError, RuntimeError) as e:
+        raise BadStateValue(instance, attribute.name, new_value, e)
+
+
+class Sample(Epoch):
+    """
+    A whole sound file, resampled to the rate requested. Without a file it
+    is silent.
+    """
+
+    @state
+    class State(Epoch.State):
+        path: str = attr.ib(default='', validator=_validate_sample_path)
+
+    def __init__(self):
+        super().__init__()
+        # Read by every block, e.g. for the channels, so not from disk
+        self._info: sf._SoundFileInfo | None = None
+
+    def set_state(self, new_state: 'Sample.State') -> None:
+        super().set_state(new_state)
+        self._info = _sample_info(new_state.path)
+
+    @classmethod
+    def flags(cls) -> SignalFlags:
+        return super().flags() | SignalFlags.GENERATOR
+
+    @property
+    def channels(self) -> int:
+        return 1 if self._info is None else self._info.channels
+
+    def is_deterministic(self) -> bool:
+        # The file's contents are not part of the graph
+        return False
+
+    def length(self, rate: int) -> int:
+        if self._info is None:
+            return 0
+        else:
+            return math.ceil(self._info.frames * rate / self._info.samplerate)
+
+    def _render(self, frames: int, rate: int) -> np.ndarray:
+        if self._info is None:
+            return np.zeros((0, 1))
+        block, file_rate = sf.read(self._state.path, always_2d=True)
+        if file_rate != rate:
+            gcd = math.gcd(rate, file_rate)
+            block = scipy.signal.resample_poly(block, rate // gcd, file_rate // gcd, axis=0)
+        return block[:frames]
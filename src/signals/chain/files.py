@@ -2,6 +2,7 @@ import abc
 import functools
 import pathlib
 import tempfile
+import threading
 
 import attr
 import numpy as np
@@ -12,12 +13,15 @@ from signals import (
 )
 from signals.chain import (
     BlockCachingEmitter,
+    BlockLoc,
     Emitter,
-    PassThroughResult,
     Request,
     Signal,
     state,
 )
+from signals.chain.handoff import (
+    SideEffect,
+)
 
 
 class SoundFileBase(Emitter, abc.ABC):
@@ -39,21 +43,21 @@ class SoundFileBase(Emitter, abc.ABC):
     def _file_path(self) -> pathlib.Path:
         return pathlib.Path(self._state.path)
 
-    def _open(self, mode: str, request: Request) -> None:
+    def _open(self, mode: str, loc: BlockLoc) -> None:
         if self._buffer is None:
             self._buffer = sf.SoundFile(file=self._file_path,
                                         mode=mode,
-                                        samplerate=request.loc.rate,
-                                        channels=request.loc.shape.channels)
-            self._open(mode, request)
+                                        samplerate=loc.rate,
+                                        channels=loc.shape.channels)
+            self._open(mode, loc)
         # FIXME fix handling of mismatch between request.channels and file.channels
-        elif self._buffer.mode != mode or self._buffer.samplerate != request.loc.rate:
+        elif self._buffer.mode != mode or self._buffer.samplerate != loc.rate:
             self._close()
-            self._open(mode, request)
+            self._open(mode, loc)
         else:
             assert self._buffer.mode == mode, self._buffer
-            assert self._buffer.samplerate == request.loc.rate, self._buffer
-            position = request.loc.position
+            assert self._buffer.samplerate == loc.rate, self._buffer
+            position = loc.position
             sought_position = self._buffer.seek(position)
             assert position == sought_position, (position, sought_position)
 
@@ -68,11 +72,61 @@ class SoundFileBase(Emitter, abc.ABC):
 
 
 class FileReader(SoundFileBase):
+    """
+    Reads from disk in large chunks, ahead of the position requested, so that
+    most requests are served from memory. `prefetch` reads the chunk in the
+    background, e.g. right after a seek.
+    """
+    # Frames read from disk at once
+    read_ahead = 1 << 15
+
+    def __init__(self):
+        super().__init__()
+        # Prefetches arrive from a background thread
+        self._lock = threading.Lock()
+        self._ahead: np.ndarray | None = None
+        self._ahead_position = 0
+
+    def set_state(self, new_state: 'FileReader.State') -> None:
+        super().set_state(new_state)
+        with self._lock:
+            self._close()
+            self._ahead = None
+
+    def _file(self) -> sf.SoundFile:
+        # The file decides its own format, so unlike writing this doesn't
+        # depend on the request
+        if self._buffer is None:
+            self._buffer = sf.SoundFile(self._file_path)
+        return self._buffer
+
+    def _read_ahead(self, position: int, frames: int) -> None:
+        file = self._file()
+        file.seek(min(position, file.frames))
+        self._ahead = file.read(frames=max(frames, self.read_ahead), always_2d=True)
+        self._ahead_position = position
 
     def _read(self, request: Request) -> np.ndarray:
-        self._open('r', request)
-        shape = request.loc.shape
-        return self._buffer.read(frames=shape.frames, always_2d=True)
+        loc = request.loc
+        with self._lock:
+            offset = loc.position - self._ahead_position
+            if (
+                self._ahead is None
+                or offset < 0
+                or (offset + loc.shape.frames > len(self._ahead)
+                    and self._ahead_position + len(self._ahead) < self._file().frames)
+            ):
+                self._read_ahead(loc.position, loc.shape.frames)
+                offset = 0
+            block = self._ahead[offset:offset + loc.shape.frames]
+        if len(block) < loc.shape.frames:
+            # Past the end of the file is silence
+            block = np.pad(block, ((0, loc.shape.frames - len(block)), (0, 0)))
+        return block
+
+    def prefetch(self, loc: BlockLoc) -> None:
+        with self._lock:
+            self._read_ahead(loc.position, loc.shape.frames)
 
     @classmethod
     def flags(cls) -> SignalFlags:
@@ -80,23 +134,28 @@ class FileReader(SoundFileBase):
 
     @property
     def channels(self) -> int:
-        return self._buffer.channels
+        with self._lock:
+            return self._file().channels
+
+    def is_deterministic(self) -> bool:
+        # The file's contents are not part of the graph
+        return False
 
     def _eval(self, request: Request) -> np.ndarray:
         return self._read(request)
 
 
-class FileWriter(SoundFileBase, PassThroughResult):
+class FileWriter(SoundFileBase, SideEffect):
 
     @classmethod
     def flags(cls) -> SignalFlags:
         return super().flags() | SignalFlags.RECORDER
 
-    def _write(self, request: Request, block: np.ndarray) -> None:
-        self._open('w', request)
+    def _apply(self, loc: BlockLoc, block: np.ndarray) -> None:
+        self._open('w', loc)
         self._buffer.write(block)
 
-    def _eval(self, request: Request) -> np.ndarray:
-        result = self.input.forward(request)
-        self._write(request, result)
-        return result
+    def destroy(self) -> None:
+        # Write everything handed off before the file is closed
+        self._close_handoff()
+        super().destroy()
@@ -1,5 +1,6 @@
 import abc
 import enum
+import math
 import typing
 
 import numpy as np
@@ -12,8 +13,10 @@ from signals.chain import (
     BlockCachingEmitter,
     ImplicitChannels,
     Receiver,
+    Recursive,
     Request,
     Shape,
+    Shedding,
     port,
 )
 
@@ -60,10 +63,12 @@ class Amp(BinaryEffect):
         return np.copysign(input_ ** exp, input_)
 
 
-class CritFilter(Effect, abc.ABC):
+class CritFilter(Effect, Recursive, abc.ABC):
     input: Receiver.BoundPort = port('input')
 
     order = 2
+    # Designing and priming filters costs far more than reading a block back
+    disk_caching = True
 
     class Type(enum.StrEnum):
         low_pass = 'lp'
@@ -79,8 +84,36 @@ class CritFilter(Effect, abc.ABC):
     def type(self) -> Type:
         raise NotImplementedError
 
-    def context_frames(self) -> int:
-        return 100
+    # How much input from before a block may still sway its output, relative
+    # to the input, once the filter has been run over its context
+    transient_tolerance = 1e-12
+    # The most context a block is filtered from, enough for cutoffs down to
+    # about 20 Hz at 44.1 kHz
+    max_context_frames = 1 << 14
+
+    def __init__(self):
+        super().__init__()
+        # Where the last block ended, at which version, rate, channels and
+        # order, and the state each channel's recursion ended it in
+        self._carried: tuple[tuple, np.ndarray] | None = None
+
+    def context_frames(self, sos: np.ndarray) -> int:
+        """
+        How many frames before a block the filter `sos` must be run over, when
+        it doesn't continue from the block before, to end up in the state it
+        would have had if it did: as long as its slowest pole takes to decay
+        below `transient_tolerance`.
+        """
+        radius = np.max(np.abs(scipy.signal.sos2zpk(sos)[1]), initial=0.)
+        if radius == 0:
+            return 0
+        elif radius >= 1:
+            return self.max_context_frames
+        else:
+            return min(math.ceil(math.log(self.transient_tolerance) / math.log(radius)), self.max_context_frames)
+
+    def warmup_frames(self) -> int:
+        return self.max_context_frames
 
     def _filter(self,
                 request: Request,
@@ -90,20 +123,47 @@ class CritFilter(Effect, abc.ABC):
         assert Shape.of_array(crit_1).frames == 1
         if crit_2 is not None:
             assert Shape.of_array(crit_2).frames == 1
-        context_frames = self.context_frames()
-        input_ = self.input.forward_with_context(request, context_frames)
-        shape = request.loc.shape
-        result = np.empty(shape=shape)
-        rate = request.loc.rate
+        loc = request.loc
+        shape = loc.shape
+        rate = loc.rate
+        # Any of the inputs may be a single channel to be shared by all the
+        # others, e.g. one source filtered at several cutoffs.
+        crits = np.vstack(np.broadcast_arrays(*((crit_1,) if crit_2 is None else (crit_1, crit_2))))
+        crits = np.broadcast_to(crits, (len(crits), shape.channels))
+        # A first-order design costs half as much to run
+        order = 1 if self.shedding >= Shedding.FILTERS else self.order
+        soses = []
         for i in range(shape.channels):
-            scaled_crit = np.array((crit_1[0, i], *(() if crit_2 is None else crit_2[0, i])), dtype=np.float)
-            scaled_crit /= rate / 2
+            scaled_crit = crits[:, i] / (rate / 2)
             scaled_crit.clip(0, 1, out=scaled_crit)
-            sos = self._get_sos(self.type(), self.order, scaled_crit, rate)
-            input_slice = slice(-(shape.frames + context_frames), -context_frames)
-            assert (input_slice.stop - input_slice.start) == shape.frames
-            result[:, i] = scipy.signal.sosfilt(sos, input_[:, i], axis=0)[input_slice]
-        return result
+            soses.append(self._get_sos(self.type(), order, scaled_crit, rate))
+
+        # Continue from the state the last block ended in, if this block
+        # follows it, and otherwise from silence some context before
+        version = self.version
+        zi = np.zeros((shape.channels, len(soses[0]), 2))
+        context = None
+        carried = self._carried
+        if (
+            carried is not None
+            and carried[0] == (loc.position, version, rate, loc.mask, order)
+            and carried[1].shape == zi.shape
+        ):
+            zi = carried[1]
+        elif loc.position > 0 and (context_frames := max(map(self.context_frames, soses))):
+            context_loc = loc.before(context_frames)
+            context = self._protect_input(np.broadcast_to(self.input.request(context_loc), context_loc.shape))
+        block = self._protect_input(np.broadcast_to(self.input.forward(request), shape))
+        result = np.empty(shape=shape)
+        zf = np.empty_like(zi)
+        for i, sos in enumerate(soses):
+            state = zi[i]
+            if context is not None:
+                _, state = scipy.signal.sosfilt(sos, context[:, i], zi=state)
+                state = self._protect_state(state)
+            result[:, i], zf[i] = scipy.signal.sosfilt(sos, block[:, i], zi=state)
+        self._carried = (loc.end_position, version, rate, loc.mask, order), self._protect_state(zf)
+        return self._protect_output(result)
 
     def _get_sos(self,
                  type_: Type,
@@ -0,0 +1,237 @@
+import abc
+import collections
+import contextlib
+import sys
+import threading
+import traceback
+import typing
+
+import numpy as np
+
+from signals import (
+    SignalFlags,
+)
+from signals.chain import (
+    BlockLoc,
+    PassThroughResult,
+    Request,
+    Shape,
+)
+
+
+_offline = threading.local()
+
+
+@contextlib.contextmanager
+def offline() -> typing.Iterator[None]:
+    """
+    Mark what this thread evaluates meanwhile as rendered offline, where
+    side effects may hold rendering up rather than lose blocks.
+    """
+    was_offline = getattr(_offline, 'active', False)
+    _offline.active = True
+    try:
+        yield
+    finally:
+        _offline.active = was_offline
+
+
+def is_offline() -> bool:
+    return getattr(_offline, 'active', False)
+
+
+class Handoff:
+    """
+    Passes blocks from the audio thread to a worker thread, which applies
+    `effect` to them in order.
+    Blocks are copied into a preallocated ring of samples, whatever their
+    shape, so that putting one never allocates. If the worker falls so far
+    behind that the ring is full, `put` either drops the block, counting it
+    in `dropped`, or catches up by applying the effect itself. Unless `name`
+    is None, the worker reports drops on stderr.
+    """
+
+    def __init__(self,
+                 effect: typing.Callable[[BlockLoc, np.ndarray], None],
+                 *,
+                 samples: int,
+                 name: str | None = None):
+        self._effect = effect
+        self._name = name
+        self._buffer = np.zeros(samples)
+        # Only `put` advances `_written`, and only `drain` advances `_read`
+        self._written = 0
+        self._read = 0
+        self._pending: collections.deque[tuple[BlockLoc, Shape]] = collections.deque()
+        self.dropped = 0
+        self._reported = 0
+        # Serializes `drain` between the worker and the thread putting blocks
+        self._drain_lock = threading.Lock()
+        # Set by `put` and `close` whenever the worker has something to do
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='signals-handoff', daemon=True)
+        self._thread.start()
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buffer)
+
+    def reserve(self, samples: int) -> None:
+        """
+        Grow the ring to at least `samples`, after applying the effect to
+        everything pending. Nothing may put blocks meanwhile.
+        """
+        if samples > self.capacity:
+            with self._drain_lock:
+                self._drain()
+                self._buffer = np.zeros(samples)
+                self._written = self._read = 0
+
+    def put(self, loc: BlockLoc, block: np.ndarray, *, wait: bool = False) -> bool:
+        """
+        Hand `block` off to the worker. If there is no room for it, drop it
+        and return false, or if `wait` is true, first apply the effect to
+        everything pending on this thread.
+        """
+        samples = block.size
+        if samples > self.capacity - (self._written - self._read):
+            if not wait:
+                self.dropped += 1
+                self._wake.set()
+                return False
+            self.drain()
+            if samples > self.capacity:
+                with self._drain_lock:
+                    self._apply(loc, block)
+                return True
+        start = self._written % self.capacity
+        head = min(samples, self.capacity - start)
+        flat = block.reshape(-1)
+        self._buffer[start:start + head] = flat[:head]
+        self._buffer[:samples - head] = flat[head:]
+        self._written += samples
+        self._pending.append((loc, Shape.of_array(block)))
+        self._wake.set()
+        return True
+
+    def drain(self) -> None:
+        with self._drain_lock:
+            self._drain()
+
+    def _drain(self) -> None:
+        while self._pending:
+            loc, shape = self._pending.popleft()
+            samples = shape.frames * shape.channels
+            block = self._buffer[np.arange(self._read, self._read + samples) % self.capacity]
+            self._read += samples
+            self._apply(loc, block.reshape(tuple(shape)))
+
+    def _apply(self, loc: BlockLoc, block: np.ndarray) -> None:
+        try:
+            self._effect(loc, block)
+        except Exception:
+            traceback.print_exc()
+
+    def flush(self) -> None:
+        """
+        Apply the effect to everything put so far, before returning.
+        """
+        self.drain()
+
+    def close(self, wait: bool = True) -> None:
+        """
+        Stop the worker once it has drained what is left, and wait for that
+        unless `wait` is false.
+        """
+        self._closed = True
+        self._wake.set()
+        if wait:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            # Read before draining, so that nothing put before `close` is left
+            closed = self._closed
+            self.drain()
+            self._report()
+            if closed:
+                return
+
+    def _report(self) -> None:
+        dropped = self.dropped
+        if self._name is not None and dropped != self._reported:
+            print(f'{self._name} fell behind and dropped {dropped - self._reported} blocks', file=sys.stderr)
+        self._reported = dropped
+
+
+class SideEffect(PassThroughResult, abc.ABC):
+    """
+    Passes its input through at once, and applies its side effect to a copy
+    on a worker thread, so that nothing slow ever runs in an audio callback.
+    """
+    # Samples, i.e. frames times channels, the audio thread may get ahead of
+    # the worker by, until the transport reserves room for its blocks
+    handoff_samples = 1 << 17
+    # Blocks the audio thread may get ahead of the worker by
+    handoff_blocks = 16
+    # The side effect needs every channel
+    masks_channels = False
+
+    def __init__(self):
+        super().__init__()
+        # Visualizations drop blocks as a matter of course
+        name = None if self.flags() & SignalFlags.VIS else type(self).__name__
+        self.handoff: Handoff | None = Handoff(self._apply, samples=self.handoff_samples, name=name)
+
+    @abc.abstractmethod
+    def _apply(self, loc: BlockLoc, block: np.ndarray) -> None:
+        """
+        The side effect, called on the worker thread.
+        """
+        raise NotImplementedError
+
+    def _skip(self) -> bool:
+        return False
+
+    def reserve(self, frames: int) -> None:
+        """
+        Make room for `handoff_blocks` blocks of `frames` frames, while
+        nothing evaluates this signal.
+        """
+        try:
+            channels = self.channels
+        except ValueError:
+            # Nothing is connected yet
+            return
+        if self.handoff is not None:
+            self.handoff.reserve(self.handoff_blocks * frames * channels)
+
+    def _waits(self) -> bool:
+        """
+        Whether to wait for the worker, rather than drop blocks, when it falls
+        behind. Only offline renders can, as live playback would stall, and
+        visualizations can do without some blocks anyway.
+        """
+        return is_offline() and not self.flags() & SignalFlags.VIS
+
+    def _eval(self, request: Request) -> np.ndarray:
+        result = self.input.forward(request)
+        if self.handoff is not None and not self._skip():
+            self.handoff.put(request.loc, result, wait=self._waits())
+        return result
+
+    def flush(self) -> None:
+        if self.handoff is not None:
+            self.handoff.flush()
+
+    def _close_handoff(self, wait: bool = True) -> None:
+        if self.handoff is not None:
+            self.handoff.close(wait)
+            self.handoff = None
+
+    def destroy(self) -> None:
+        super().destroy()
+        self._close_handoff()
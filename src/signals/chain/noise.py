@@ -1,5 +1,7 @@
 import abc
 
+import attr
+import attrs.validators
 import numpy as np
 
 from signals import SignalFlags
@@ -7,10 +9,16 @@ from signals.chain import (
     BlockCachingEmitter,
     ExplicitChannelsEmitter,
     Request,
+    state,
 )
 
 
 class Noise(ExplicitChannelsEmitter, BlockCachingEmitter, abc.ABC):
+    masks_channels = True
+
+    @state
+    class State(ExplicitChannelsEmitter.State, BlockCachingEmitter.State):
+        pass
 
     @classmethod
     def flags(cls) -> SignalFlags:
@@ -18,6 +26,33 @@ class Noise(ExplicitChannelsEmitter, BlockCachingEmitter, abc.ABC):
 
 
 class White(Noise):
+    # Each seed is one stream, and each channel a stretch of it this far
+    # apart; every sample is the draw at its absolute frame in its channel's
+    # stretch, so that any block is the same slice of the same noise however
+    # the timeline is split up, and any channel can be drawn alone
+    channel_stride = 1 << 48
+
+    @state
+    class State(Noise.State):
+        # Negative values leave the noise unseeded
+        seed: int = attr.ib(validator=attrs.validators.ge(-1), default=-1)
+
+    def is_deterministic(self) -> bool:
+        return self._state.seed >= 0
 
     def _eval(self, request: Request) -> np.ndarray:
-        return np.random.rand(*request.loc.shape)
+        loc = request.loc
+        if not self.is_deterministic():
+            return np.random.rand(*loc.shape)
+        frames = loc.shape.frames
+        # Each double drawn advances the stream by exactly one step
+        bit_generator = np.random.PCG64(self._state.seed)
+        rng = np.random.Generator(bit_generator)
+        result = np.empty((loc.shape.channels, frames))
+        drawn = 0
+        for i, channel in enumerate(loc.channel_indices):
+            start = channel * self.channel_stride + loc.position
+            bit_generator.advance(start - drawn)
+            rng.random(frames, out=result[i])
+            drawn = start + frames
+        return result.T
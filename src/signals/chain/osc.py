@@ -1,7 +1,9 @@
 import abc
+import functools
 import typing
 
 import attr
+import attrs.validators
 import numpy as np
 
 from signals import (
@@ -12,6 +14,7 @@ from signals.chain import (
     ImplicitChannels,
     Request,
     port,
+    state,
 )
 
 
@@ -30,7 +33,11 @@ class Osc(BlockCachingEmitter, ImplicitChannels, abc.ABC):
         hertz = self.hertz.forward_at_block_rate(request)
         # frames / (frames / second) * (cycles / second) + cycles
         cycles = request.loc.frame_range / request.loc.rate * hertz + phase
-        return self._osc(cycles)
+        return self._wave(cycles, hertz / request.loc.rate)
+
+    def _wave(self, t: np.ndarray, hertz: np.ndarray) -> np.ndarray:
+        # hertz: cycles/frame, for waveforms that depend on it
+        return self._osc(t)
 
     @abc.abstractmethod
     def _osc(self, t: np.ndarray) -> np.ndarray:
@@ -62,42 +69,108 @@ class Triangle(Osc):
         return (4 * np.mod(t, 0.5) - 1) * np.sign(np.mod(t, 1) - 0.5)
 
 
-@attr.s(auto_attribs=True, frozen=True, kw_only=True)
-class OscTable:
-    # Testing indicates that this is actually significantly slower than just
-    # calling the function across the entire request range
-    framerate: int
-    hertz: float
-    buffer: np.ndarray
+class Wavetable(Osc, abc.ABC):
+    """
+    Reads each cycle from tables of the waveform made of only so many of its
+    harmonics: one table per octave of `hertz`, each with half as many
+    harmonics as the one before, so that none is ever above the Nyquist
+    frequency. The tables are built once for each waveform.
+    Like any band-limited waveform, edges ring, overshooting by up to a
+    tenth or so.
+    """
+    # Samples in each table
+    size: typing.ClassVar[int] = 2048
+
+    @state
+    class State(Osc.State):
+        interpolation: str = attr.ib(default='linear',
+                                     validator=attrs.validators.in_(('linear', 'cubic')))
 
     @classmethod
-    def create(cls,
-               hertz: float,
-               framerate: int,
-               func: typing.Callable[[np.ndarray], np.ndarray]) -> typing.Self:
-        # hertz: cycles/second
-        # framerate: frames/second
-        frames_per_cycle = int(framerate / hertz)
-        buffer = func(np.arange(frames_per_cycle)/frames_per_cycle)
-        assert len(buffer) == frames_per_cycle
-        buffer.flags.writeable = False
-        return cls(hertz=hertz,
-                   framerate=framerate,
-                   buffer=buffer)
-
-    def read(self, phase: float, size: int) -> np.ndarray:
-        # phase: cycles
-        frames_per_cycle = len(self.buffer)
-        phase = int(phase % 1.0 * frames_per_cycle) % frames_per_cycle
-        # phase: frames
-        if phase + size <= frames_per_cycle:
-            result = self.buffer[phase:phase + size]
-        elif phase + size <= frames_per_cycle * 2:
-            result = np.concatenate((self.buffer[phase:],
-                                     self.buffer[:(phase + size) % frames_per_cycle]))
+    @abc.abstractmethod
+    def _harmonics(cls, k: np.ndarray) -> np.ndarray:
+        """
+        The amplitude of the sine at each harmonic `k` of the waveform.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    @functools.cache
+    def tables(cls) -> np.ndarray:
+        """
+        The table for each octave, starting with every harmonic a table can
+        hold. Each is wrapped around by one sample before it and two after,
+        for interpolating.
+        """
+        levels = (cls.size // 2).bit_length()
+        k = np.arange(1, cls.size // 2 + 1)
+        spectra = np.zeros((levels, cls.size // 2 + 1), dtype=complex)
+        for level in range(levels):
+            harmonics = (cls.size // 2) >> level
+            spectra[level, 1:harmonics + 1] = -0.5j * cls.size * cls._harmonics(k[:harmonics])
+        waves = np.fft.irfft(spectra, n=cls.size, axis=1)
+        tables = np.concatenate((waves[:, -1:], waves, waves[:, :2]), axis=1)
+        tables.flags.writeable = False
+        return tables
+
+    def _wave(self, t: np.ndarray, hertz: np.ndarray) -> np.ndarray:
+        # hertz: cycles/frame, so a table with so many harmonics that
+        # hertz * harmonics <= 0.5
+        levels = len(self.tables())
+        level = np.ceil(np.log2(np.maximum(np.abs(hertz) * self.size, 1)))
+        return self._read(t, np.minimum(level, levels - 1).astype(np.intp))
+
+    def _osc(self, t: np.ndarray) -> np.ndarray:
+        # Every harmonic the tables hold
+        return self._read(t, np.zeros((1, 1), dtype=np.intp))
+
+    def _read(self, t: np.ndarray, level: np.ndarray) -> np.ndarray:
+        tables = self.tables()
+        # Indexing the flattened tables is much cheaper than by level and
+        # index together
+        samples = tables.ravel()
+        position = np.mod(t, 1)
+        position *= self.size
+        index = position.astype(np.intp)
+        # Rounding may carry a position just short of a cycle onto the next
+        np.minimum(index, self.size - 1, out=index)
+        fraction = position
+        fraction -= index
+        # Past the sample wrapped around before each table
+        index += level * tables.shape[1] + 1
+        y1 = samples.take(index)
+        y2 = samples.take(index + 1)
+        if self._state.interpolation == 'linear':
+            y2 -= y1
+            y2 *= fraction
+            y2 += y1
+            return y2
         else:
-            pad_before = frames_per_cycle - phase
-            pad_after = (phase + size) - frames_per_cycle * 2
-            result = np.pad(self.buffer, (pad_before, pad_after), mode='wrap')
-        assert len(result) == size
-        return result
+            # Catmull-Rom
+            y0 = samples.take(index - 1)
+            y3 = samples.take(index + 2)
+            c1 = 0.5 * (y2 - y0)
+            c2 = y0 - 2.5 * y1 + 2 * y2 - 0.5 * y3
+            c3 = 0.5 * (y3 - y0) + 1.5 * (y1 - y2)
+            return ((c3 * fraction + c2) * fraction + c1) * fraction + y1
+
+
+class TableSquare(Wavetable):
+
+    @classmethod
+    def _harmonics(cls, k: np.ndarray) -> np.ndarray:
+        return np.where(k % 2 == 1, 4 / (np.pi * k), 0)
+
+
+class TableSawtooth(Wavetable):
+
+    @classmethod
+    def _harmonics(cls, k: np.ndarray) -> np.ndarray:
+        return 2 / np.pi * (-1.) ** (k + 1) / k
+
+
+class TableTriangle(Wavetable):
+
+    @classmethod
+    def _harmonics(cls, k: np.ndarray) -> np.ndarray:
+        return np.where(k % 2 == 1, 8 / np.pi ** 2 * (-1.) ** ((k - 1) // 2) / k ** 2, 0)
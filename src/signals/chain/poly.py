@@ -0,0 +1,250 @@
+import abc
+import bisect
+import collections
+import itertools
+import threading
+import typing
+
+import attr
+import attrs.validators
+import numpy as np
+
+from signals import (
+    SignalFlags,
+)
+from signals.chain import (
+    ChainLayerError,
+    Emitter,
+    Request,
+    state,
+)
+
+
+class BadVoiceBank(ChainLayerError):
+
+    def __init__(self, name: str):
+        super().__init__(f'No voice bank named {name!r}')
+
+
+@attr.s(auto_attribs=True, frozen=True, kw_only=True)
+class VoiceEvent:
+    position: int
+    # Breaks ties between events at the same position, and ages voices for stealing
+    serial: int
+    note: int
+    velocity: float
+    gate: bool
+
+    @property
+    def hertz(self) -> float:
+        return 440 * 2 ** ((self.note - 69) / 12)
+
+
+class VoiceBank:
+    """
+    Assigns notes to a fixed number of voices, each of which is a channel of
+    every signal that reads from the bank.
+    A chain of ordinary signals fed by `VoiceHertz`, `VoiceVelocity` and
+    `VoiceGate` therefore plays every voice at once, with the cost of one
+    wider block instead of one chain per voice.
+    """
+    # Events older than this are forgotten, per voice
+    history = 64
+
+    _banks: dict[str, 'VoiceBank'] = {}
+
+    def __init__(self, voices: int):
+        # Notes arrive from the controller while the audio thread reads
+        self._lock = threading.Lock()
+        self._serial = itertools.count()
+        self._events: list[collections.deque[VoiceEvent]] = []
+        self.position = 0
+        # How many signals read from this bank; it is forgotten at none
+        self.readers = 0
+        self.resize(voices)
+
+    @classmethod
+    def get(cls, name: str, voices: int | None = None) -> typing.Self:
+        """
+        Find the bank called `name`, creating it if `voices` is given.
+        """
+        try:
+            bank = cls._banks[name]
+        except KeyError:
+            if voices is None:
+                raise BadVoiceBank(name)
+            bank = cls._banks[name] = cls(voices)
+        else:
+            if voices is not None:
+                bank.resize(voices)
+        return bank
+
+    @classmethod
+    def acquire(cls, name: str, voices: int) -> typing.Self:
+        """
+        Like `get`, for a signal that reads from the bank until it calls
+        `release`.
+        """
+        bank = cls.get(name, voices)
+        bank.readers += 1
+        return bank
+
+    @classmethod
+    def release(cls, name: str) -> None:
+        bank = cls._banks.get(name)
+        if bank is not None:
+            bank.readers -= 1
+            if bank.readers <= 0:
+                del cls._banks[name]
+
+    @property
+    def voices(self) -> int:
+        return len(self._events)
+
+    def resize(self, voices: int) -> None:
+        with self._lock:
+            del self._events[voices:]
+            while len(self._events) < voices:
+                self._events.append(collections.deque(maxlen=self.history))
+
+    def advance(self, position: int) -> None:
+        """
+        Note that rendering has reached `position`, so that events without a
+        position of their own start there. It moves back after a seek.
+        """
+        self.position = position
+
+    def note_on(self, note: int, velocity: float = 1., position: int | None = None) -> int:
+        """
+        Start `note` on a free voice, or else steal the voice whose note
+        started longest ago. A note that is already sounding is retriggered on
+        its own voice.
+        """
+        with self._lock:
+            latest = [events[-1] if events else None for events in self._events]
+            sounding = [i for i, event in enumerate(latest) if event is not None and event.gate]
+            voice = next((i for i in sounding if latest[i].note == note), None)
+            if voice is None:
+                voice = next((i for i, event in enumerate(latest) if event is None or not event.gate), None)
+            if voice is None:
+                voice = min(sounding, key=lambda i: latest[i].serial)
+            self._push(voice, note, velocity, True, position)
+            return voice
+
+    def note_off(self, note: int, position: int | None = None) -> int | None:
+        with self._lock:
+            for voice, events in enumerate(self._events):
+                if events and events[-1].gate and events[-1].note == note:
+                    self._push(voice, note, events[-1].velocity, False, position)
+                    return voice
+            return None
+
+    def _push(self, voice: int, note: int, velocity: float, gate: bool, position: int | None) -> None:
+        events = self._events[voice]
+        if position is None:
+            position = self.position
+            # Events past where rendering is were left behind by a seek back
+            while events and events[-1].position > position:
+                events.pop()
+        elif events:
+            # Each voice's events must stay in order for lookups
+            position = max(position, events[-1].position)
+        events.append(VoiceEvent(position=position,
+                                 serial=next(self._serial),
+                                 note=note,
+                                 velocity=velocity,
+                                 gate=gate))
+
+    def _event_at(self, voice: int, position: int) -> VoiceEvent | None:
+        events = self._events[voice]
+        index = bisect.bisect_right(events, position, key=lambda event: event.position)
+        return events[index - 1] if index else None
+
+    def hertz(self, position: int) -> np.ndarray:
+        with self._lock:
+            events = [self._event_at(voice, position) for voice in range(self.voices)]
+        return np.array([[0. if event is None else event.hertz for event in events]])
+
+    def velocity(self, position: int) -> np.ndarray:
+        with self._lock:
+            events = [self._event_at(voice, position) for voice in range(self.voices)]
+        return np.array([[0. if event is None else event.velocity for event in events]])
+
+    def gate(self, position: int, frames: int) -> np.ndarray:
+        result = np.zeros((frames, self.voices))
+        with self._lock:
+            for voice in range(self.voices):
+                event = self._event_at(voice, position)
+                start = 0
+                gate = event is not None and event.gate
+                for event in self._events[voice]:
+                    if position < event.position < position + frames:
+                        stop = event.position - position
+                        result[start:stop, voice] = gate
+                        start, gate = stop, event.gate
+                result[start:, voice] = gate
+        return result
+
+
+class Voices(Emitter, abc.ABC):
+    # Values change at most this often, however large the blocks requested
+    max_block_frames = 64
+
+    @state
+    class State(Emitter.State):
+        bank: str = attr.ib(default='default')
+        voices: int = attr.ib(validator=attrs.validators.ge(1), default=8)
+
+    def __init__(self):
+        super().__init__()
+        self.bank = VoiceBank.acquire(self._state.bank, self._state.voices)
+
+    @classmethod
+    def flags(cls) -> SignalFlags:
+        return super().flags()
+
+    def set_state(self, new_state: 'Voices.State') -> None:
+        old_bank = self._state.bank
+        super().set_state(new_state)
+        # Acquired first, so that staying on the same bank keeps its notes
+        self.bank = VoiceBank.acquire(new_state.bank, new_state.voices)
+        VoiceBank.release(old_bank)
+
+    def destroy(self) -> None:
+        super().destroy()
+        VoiceBank.release(self._state.bank)
+
+    def is_deterministic(self) -> bool:
+        return False
+
+    @property
+    def channels(self) -> int:
+        return self.bank.voices
+
+    def _eval(self, request: Request) -> np.ndarray:
+        self.bank.advance(request.loc.end_position)
+        return self._eval_voices(request)
+
+    @abc.abstractmethod
+    def _eval_voices(self, request: Request) -> np.ndarray:
+        raise NotImplementedError
+
+
+class VoiceHertz(Voices):
+
+    def _eval_voices(self, request: Request) -> np.ndarray:
+        return self.bank.hertz(request.loc.position)
+
+
+class VoiceVelocity(Voices):
+
+    def _eval_voices(self, request: Request) -> np.ndarray:
+        return self.bank.velocity(request.loc.position)
+
+
+class VoiceGate(Voices):
+    # Already sample-accurate
+    max_block_frames = None
+
+    def _eval_voices(self, request: Request) -> np.ndarray:
+        return self.bank.gate(request.loc.position, request.loc.shape.frames)
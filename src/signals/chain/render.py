@@ -0,0 +1,122 @@
+import functools
+import os
+import tempfile
+import typing
+
+import numpy as np
+
+from signals.chain import (
+    BlockLoc,
+    Emitter,
+    Frozen,
+    Receiver,
+    Shape,
+)
+from signals.chain.compiler import (
+    Program,
+)
+from signals.chain.handoff import (
+    SideEffect,
+    offline,
+)
+
+
+class Bounce:
+    """
+    Pulls an emitter block by block without a device, the same way a sink
+    would, so that the whole upstream graph sees ordinary requests.
+    """
+
+    def __init__(self, emitter: Emitter, *, rate: int, block_size: int = 1024, compiled: bool = False):
+        self.port = Receiver.BoundPort(parent=None, name='bounce', emitter=emitter)
+        self.rate = rate
+        self.block_size = block_size
+        self.program = Program(emitter) if compiled else None
+
+    @property
+    def channels(self) -> int:
+        return self.port.channels
+
+    def locs(self, start: int, frames: int) -> typing.Iterator[BlockLoc]:
+        stop = start + frames
+        for position in range(start, stop, self.block_size):
+            yield BlockLoc(position=position,
+                           rate=self.rate,
+                           shape=Shape(frames=min(self.block_size, stop - position),
+                                       channels=self.channels))
+
+    def render_into(self, out: np.ndarray, start: int = 0) -> np.ndarray:
+        with offline():
+            for loc in self.locs(start, len(out)):
+                # Blocks may be smaller than requested; assignment broadcasts them.
+                out[loc.position - start:loc.end_position - start] = (
+                    self.port.request(loc) if self.program is None else self.program(loc)
+                )
+        self.flush()
+        return out
+
+    def flush(self) -> None:
+        """
+        Wait for side effects of what was rendered, e.g. files written.
+        """
+        emitter = self.port.sig
+        for sig in emitter.upstream() if isinstance(emitter, Receiver) else (emitter,):
+            if isinstance(sig, SideEffect):
+                sig.flush()
+
+    def render(self, frames: int, start: int = 0) -> np.ndarray:
+        return self.render_into(np.empty(Shape(frames=frames, channels=self.channels)), start)
+
+
+def preroll(emitter: Emitter) -> int:
+    """
+    The longest chain of warm-up requirements upstream of `emitter`, i.e. how
+    far before a position rendering must begin for the output there to be
+    correct.
+    """
+
+    @functools.cache
+    def _preroll(sig: Emitter) -> int:
+        inputs = sig.inputs_by_port.values() if isinstance(sig, Receiver) else ()
+        return sig.warmup_frames() + max(map(_preroll, inputs), default=0)
+
+    return _preroll(emitter)
+
+
+def freeze(emitter: Emitter,
+           *,
+           frames: int,
+           rate: int,
+           start: int = 0,
+           block_size: int = 1024,
+           directory: str | None = None,
+           source: Emitter | None = None
+           ) -> Frozen:
+    """
+    Render `frames` frames of `emitter` into a memory-mapped file and attach
+    the result, so that later requests are served from the file.
+    If `source` is given, it is rendered instead: an identical copy of
+    `emitter` that nothing else pulls, so that `emitter` can keep playing
+    meanwhile.
+    """
+    if source is None:
+        emitter.unfreeze()
+        source = emitter
+    bounce = Bounce(source, rate=rate, block_size=block_size)
+    shape = Shape(frames=frames, channels=bounce.channels)
+    fd, path = tempfile.mkstemp(prefix='signals-freeze-', suffix='.npy', dir=directory)
+    os.close(fd)
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=tuple(shape))
+    try:
+        bounce.render_into(out, start)
+        out.flush()
+    except BaseException:
+        del out
+        os.unlink(path)
+        raise
+    del out
+    frozen = Frozen(loc=BlockLoc(position=start, rate=rate, shape=shape),
+                    buffer=np.load(path, mmap_mode='r'),
+                    path=path)
+    emitter.freeze(frozen)
+    return frozen
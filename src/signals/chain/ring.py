@@ -0,0 +1,87 @@
+import multiprocessing.shared_memory
+
+import numpy as np
+
+from signals.chain import (
+    Shape,
+)
+
+
+class SharedRing:
+    """
+    A fixed-size ring of frames in shared memory, written by a single producer
+    and read by any number of consumers, in this process or another one.
+    The header holds the total number of frames claimed by the writer,
+    advanced before frames are overwritten, and the total number written,
+    advanced after they are in place. Readers never need a lock: they copy the
+    window they want and then discard whatever the writer claimed in the
+    meantime.
+    """
+    _header = 3
+
+    def __init__(self, shm: multiprocessing.shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self._owner = owner
+        words = np.ndarray((shm.size // 8,), dtype=np.int64, buffer=shm.buf)
+        self._header_view = words[:self._header]
+        channels = int(self._header_view[2])
+        self._frames_view = np.ndarray(((shm.size // 8 - self._header) // channels, channels),
+                                       dtype=np.float64,
+                                       buffer=shm.buf,
+                                       offset=self._header * 8)
+
+    @classmethod
+    def create(cls, shape: Shape) -> 'SharedRing':
+        shm = multiprocessing.shared_memory.SharedMemory(create=True,
+                                                        size=(cls._header + shape.frames * shape.channels) * 8)
+        header = np.ndarray((cls._header,), dtype=np.int64, buffer=shm.buf)
+        header[:] = 0, 0, shape.channels
+        del header
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedRing':
+        return cls(multiprocessing.shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def shape(self) -> Shape:
+        return Shape.of_array(self._frames_view)
+
+    @property
+    def written(self) -> int:
+        return int(self._header_view[0])
+
+    def write(self, block: np.ndarray) -> None:
+        capacity = self.shape.frames
+        written = self.written
+        block = np.broadcast_to(block, (len(block), self.shape.channels))[-capacity:]
+        self._header_view[1] = written + len(block)
+        start = written % capacity
+        head = min(len(block), capacity - start)
+        self._frames_view[start:start + head] = block[:head]
+        self._frames_view[:len(block) - head] = block[head:]
+        self._header_view[0] = written + len(block)
+
+    def read(self, frames: int) -> np.ndarray:
+        """
+        Copy out the most recent `frames` frames, or fewer if not that many
+        have been written or the writer overtook this read.
+        """
+        capacity = self.shape.frames
+        stop = self.written
+        start = max(0, stop - min(frames, capacity))
+        positions = np.arange(start, stop) % capacity
+        block = self._frames_view[positions]
+        # Frames the writer claimed while we were copying may be torn
+        overtaken = max(0, int(self._header_view[1]) - capacity - start)
+        return block[overtaken:]
+
+    def close(self) -> None:
+        del self._header_view, self._frames_view
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
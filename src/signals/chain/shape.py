@@ -7,6 +7,7 @@ import numpy as np
 from signals import SignalFlags
 from signals.chain import (
     BlockCachingEmitter,
+    BlockLoc,
     Receiver,
     Request,
     port,
@@ -28,17 +29,20 @@ class Scalar(Shaper, abc.ABC):
     def channels(self) -> int:
         return 1
 
+    def _forward_all(self, request: Request) -> np.ndarray:
+        return self.input.request(request.loc.reslice(self.input.channels))
+
 
 class Flatten(Scalar):
 
     def _eval(self, request: Request) -> np.ndarray:
-        return np.sum(self.input.forward(request), axis=0)
+        return np.sum(self._forward_all(request), axis=1, keepdims=True)
 
 
 class FlattenUnit(Scalar):
 
     def _eval(self, request: Request) -> np.ndarray:
-        return np.mean(self.input.forward(request), axis=0)
+        return np.mean(self._forward_all(request), axis=1, keepdims=True)
 
 
 class Select(Scalar):
@@ -54,10 +58,11 @@ class Select(Scalar):
             return self.empty_result()
 
     def _eval(self, request: Request) -> np.ndarray:
-        return self.input.forward(request)[:, self._state.index]
+        return self.input.request(request.loc.masked((self._state.index,)))
 
 
 class Merge(Shaper):
+    masks_channels = True
 
     @property
     def channels(self) -> int:
@@ -67,8 +72,22 @@ class Merge(Shaper):
     right: Receiver.BoundPort = port('right')
 
     def _eval(self, request: Request) -> np.ndarray:
+        loc = request.loc
+        if loc.mask is not None:
+            return self._eval_masked(loc)
         # FIXME when one input is unplugged:
         #  ValueError: all the input array dimensions for the concatenation axis must match exactly, but along dimension
         #  0, the array at index 0 has size 384 and the array at index 1 has size 1
-        return np.hstack((self.left.request(request.loc.reslice(self.left.channels)),
-                          self.right.request(request.loc.reslice(self.right.channels))))
+        return np.hstack((self.left.request(loc.reslice(self.left.channels)),
+                          self.right.request(loc.reslice(self.right.channels))))
+
+    def _eval_masked(self, loc: BlockLoc) -> np.ndarray:
+        # Only ask each side for the channels read from it
+        split = self.left.channels
+        left = tuple(channel for channel in loc.mask if channel < split)
+        right = tuple(channel - split for channel in loc.mask if channel >= split)
+        return np.hstack([
+            port.request(loc.masked(mask))
+            for port, mask in ((self.left, left), (self.right, right))
+            if mask
+        ])
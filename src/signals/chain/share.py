@@ -0,0 +1,65 @@
+import typing
+
+from signals import (
+    SignalFlags,
+)
+from signals.chain import (
+    Emitter,
+    Receiver,
+    Signal,
+)
+
+
+def _shareable(sig: Signal) -> bool:
+    return (
+        isinstance(sig, Emitter)
+        and sig.is_deterministic()
+        # Its readers are served from its own rendering
+        and not sig.is_frozen
+        and not (sig.flags() & (SignalFlags.DEVICE | SignalFlags.SIDE_EFFECT))
+    )
+
+
+def share_duplicates(sigs: typing.Iterable[Signal]) -> dict[Emitter, Emitter]:
+    """
+    Find emitters that are identical, i.e. of the same class, with the same
+    state, and reading the same or identical inputs, and point every port
+    reading one of them at the first, so that only it is evaluated and the
+    others share its output. The graph itself is left as it is.
+    Emitters whose output isn't determined by those, that have side
+    effects, or that are frozen, are never shared, so sharing must be
+    redone whenever one is frozen or unfrozen.
+    Returns each duplicate with the emitter it shares.
+    """
+    representatives: dict[Signal, Signal] = {}
+    by_key: dict[tuple, Signal] = {}
+
+    def resolve(sig: Signal) -> Signal:
+        try:
+            return representatives[sig]
+        except KeyError:
+            pass
+        inputs = sorted(sig.inputs_by_port.items()) if isinstance(sig, Receiver) else []
+        key = (
+            sig.cls_name(),
+            sig._state_key(),
+            tuple((port_name, id(resolve(input_))) for port_name, input_ in inputs),
+        )
+        representative = by_key.setdefault(key, sig) if _shareable(sig) else sig
+        representatives[sig] = representative
+        return representative
+
+    for sig in sigs:
+        if isinstance(sig, Receiver):
+            for port_name in sig.port_names():
+                port = getattr(sig, port_name)
+                if port and (source := resolve(port.sig)) is not port.source:
+                    port.source = source
+                    port._fed = None
+                    # So that anything bound to the old source is rebound
+                    sig._changed()
+    return {
+        sig: representative
+        for sig, representative in representatives.items()
+        if sig is not representative
+    }
@@ -1,5 +1,4 @@
 import abc
-import queue
 
 import attr
 import matplotlib.pyplot as plt
@@ -9,59 +8,67 @@ from signals import (
     SignalFlags,
 )
 from signals.chain import (
-    PassThroughResult,
-    Request,
+    BlockLoc,
     Shape,
+    Shedding,
     state,
 )
+from signals.chain.handoff import (
+    SideEffect,
+)
+from signals.chain.ring import (
+    SharedRing,
+)
 
 
-class Vis(PassThroughResult, abc.ABC):
+class Vis(SideEffect, abc.ABC):
+    # Enough for a few seconds of history at common rates
+    ring_frames = 1 << 18
 
     def __init__(self):
         super().__init__()
-        self.q = queue.Queue()
+        self.ring: SharedRing | None = None
 
     @classmethod
     def flags(cls) -> SignalFlags:
         return super().flags() | SignalFlags.VIS
 
-    def render(self, ax: plt.Axes, frames: int) -> list[plt.Artist]:
-        blocks = []
-        queued_frames = 0
-        while True:
-            try:
-                block = self.q.get_nowait()
-            except queue.Empty:
-                break
-            else:
-                # FIXME take part of a block to fill frames completely
-                queued_frames += Shape.of_array(block).frames
-                if queued_frames <= frames:
-                    blocks.append(block)
-                else:
-                    # Blocks that exceed the frame limit are dropped
-                    pass
+    def destroy(self) -> None:
+        super().destroy()
+        self._close_ring()
 
+    def collect(self, frames: int) -> np.ndarray | None:
+        return None if self.ring is None else self.ring.read(frames)
+
+    def draw(self, ax: plt.Axes, block: np.ndarray | None, frames: int) -> list[plt.Artist]:
         ax.clear()
         result = []
-        if blocks:
-            x = 0
-            for block in blocks[:-1]:
-                x += Shape.of_array(block).frames
-                result.append(ax.axvline(x, c='black'))
-            result.extend(self._plot(np.concatenate(blocks), ax))
+        if block is not None and len(block):
+            result.extend(self._plot(block, ax))
         ax.set_xlim(0, frames)
         return result
 
+    def render(self, ax: plt.Axes, frames: int) -> list[plt.Artist]:
+        return self.draw(ax, self.collect(frames), frames)
+
     @abc.abstractmethod
     def _plot(self, block: np.ndarray, ax: plt.Axes) -> list[plt.Artist]:
         raise NotImplementedError
 
-    def _eval(self, request: Request) -> np.ndarray:
-        result = self.input.forward(request)
-        self.q.put(result)
-        return result
+    def _skip(self) -> bool:
+        return self.shedding >= Shedding.VIS
+
+    def _apply(self, loc: BlockLoc, block: np.ndarray) -> None:
+        channels = Shape.of_array(block).channels
+        if self.ring is None or self.ring.shape.channels != channels:
+            self._close_ring()
+            self.ring = SharedRing.create(Shape(frames=self.ring_frames, channels=channels))
+        self.ring.write(block)
+
+    def _close_ring(self) -> None:
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
 
 
 class Wave(Vis):
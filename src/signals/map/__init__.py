@@ -1,8 +1,11 @@
 import abc
+import collections
+import contextlib
 import copy
 import functools
 import json
 import re
+import shlex
 import string
 import typing
 
@@ -18,12 +21,20 @@ from signals import (
     SignalsError,
 )
 from signals.chain import (
+    BlockCachingEmitter,
+    CacheUsage,
     Emitter,
     Receiver,
     Signal,
 )
+import signals.chain.cache
+import signals.chain.cost
 import signals.chain.dev
 import signals.chain.discovery
+import signals.chain.fixed
+import signals.chain.poly
+import signals.chain.render
+import signals.chain.share
 import signals.chain.vis
 
 CoordinateRow = int
@@ -151,7 +162,15 @@ class SigStateItem(typing.NamedTuple):
 class SigStateItems(tuple[SigStateItem]):
 
     def __str__(self) -> str:
-        return ' '.join(map(str, self))
+        """
+        >>> str(SigStateItems((SigStateItem(k='foo', v=1), SigStateItem(k='bar', v=np.array([[1, 2]])))))
+        "foo=1 'bar=[[1, 2]]'"
+        """
+        # Items are split with `shlex`, so they must not contain bare whitespace
+        return ' '.join(
+            item if not any(c.isspace() for c in item) else shlex.quote(item)
+            for item in map(str, self)
+        )
 
 
 class SigState(dict[str, SigStateValue]):
@@ -273,8 +292,11 @@ class MappedDevInfo(MappedSigInfo):
                    device=device,
                    at=at)
 
-    def create(self) -> signals.chain.Signal:
-        return self._sig_cls(self.device)
+    def create(self, transport: signals.chain.dev.Transport | None = None) -> signals.chain.Signal:
+        if issubclass(self._sig_cls, signals.chain.dev.SinkDevice):
+            return self._sig_cls(self.device, transport)
+        else:
+            return self._sig_cls(self.device)
 
 
 @attr.s(auto_attribs=True, kw_only=True, frozen=True)
@@ -392,9 +414,9 @@ class BadReceiver(BadSignalClass):
         super().__init__(at, signal, Receiver)
 
 
-class BadPlaybackTarget(BadSignalClass):
+class BadEmitter(BadSignalClass):
     def __init__(self, at: Coordinates, signal: Signal):
-        super().__init__(at, signal, signals.chain.dev.SinkDevice)
+        super().__init__(at, signal, Emitter)
 
 
 class BadVis(BadSignalClass):
@@ -402,40 +424,132 @@ class BadVis(BadSignalClass):
         super().__init__(at, signal, signals.chain.vis.Vis)
 
 
+class BadSweepParameter(BadSignalClass):
+    def __init__(self, at: Coordinates, signal: Signal):
+        super().__init__(at, signal, signals.chain.fixed.Fixed)
+
+
+class BadSweepChannels(MapError):
+
+    def __init__(self, at: Coordinates, channels: int, variants: int):
+        super().__init__(at, f'Sweep of {variants} variants produced {channels} channels; '
+                             f'only single-channel signals can be swept')
+
+
+class BadVoiceBank(MapLayerError):
+
+    def __init__(self, bank: str):
+        super().__init__(f'No voice bank named {bank!r}; add a voice signal that uses it first')
+
+
 class Map:
 
-    def __init__(self):
+    def __init__(self, disk_cache: signals.chain.cache.DiskCache | None = None):
         self._map = bijection.Bijection[Coordinates, Signal]()
+        self.disk_cache = disk_cache
+        self.transport = signals.chain.dev.Transport()
+        self.cost_model = signals.chain.cost.CostModel.load()
+        # Whether the devices play this map, rather than a variant of it
+        self.live = True
+        # How many variants hold each signal, shared by all of them
+        self._holders = collections.Counter[Signal]()
+        # The inputs of this map's sinks, while it isn't live
+        self._parked: dict[tuple[signals.chain.dev.SinkDevice, PortName], Emitter | None] = {}
+
+    def fork(self) -> 'Map':
+        """
+        A copy-on-write variant of this map: it holds the very same signals,
+        caches and all, until one is changed in either, which then copies it
+        and whatever is downstream of it in that variant only.
+        Devices are never copied; they only play the live variant.
+        """
+        fork = Map(self.disk_cache)
+        fork.transport = self.transport
+        fork.cost_model = self.cost_model
+        for at, sig in self._map.items():
+            fork._map[at] = sig
+        fork._holders = self._holders
+        self._holders.update(self._map.values())
+        fork.live = False
+        fork._parked = {
+            (sink, port_name): self._port_input(sink, port_name)
+            for sink in self._sinks()
+            for port_name in sink.port_names()
+        }
+        return fork
+
+    def switch(self, to: 'Map') -> None:
+        """
+        Play `to`, a variant of this map, instead, from whatever was last
+        heard. Only the signals they don't share start cold.
+        """
+        assert self.live and to._holders is self._holders, to
+        if to is self:
+            return
+        for sink in self._sinks():
+            for port_name in sink.port_names():
+                self._parked[sink, port_name] = self._port_input(sink, port_name)
+        self.live = False
+        to.live = True
+        sinks = to._sinks()
+        for sink in sinks:
+            for port_name in sink.port_names():
+                to._set_port_input(sink, port_name, to._parked.get((sink, port_name)))
+        to._parked.clear()
+        self.transport.replace(sinks)
+        to._share_duplicates()
 
     def add(self, info: MappedSigInfo):
-        sig = info.create()
+        sig = info.create(self.transport) if isinstance(info, MappedDevInfo) else info.create()
+        if isinstance(sig, BlockCachingEmitter):
+            sig.disk_cache = self.disk_cache
         self._apply_state(info.at, sig, info.state)
         if self._map.setdefault(info.at, sig) is not sig:
             raise NonEmpty(info.at)
+        self._holders[sig] += 1
+        if isinstance(sig, signals.chain.dev.SinkDevice) and self.live and self._plays():
+            self.transport.attach(sig)
+        self._share_duplicates()
 
     def rm(self, at: Coordinates) -> LinkedSigInfo:
         sig = self._find(at)
+        # Another variant still holds it, inputs and all
+        shared = self._holders[sig] > 1
 
         state = SigState.from_signal(sig)
         inputs = []
         outputs = []
         if isinstance(sig, Emitter):
-            for port, output_sig in tuple(sig.outputs_with_ports):
-                output_at = self._map.inv[output_sig]
-                port_info = PortInfo(at=output_at, port=port)
+            # Disconnecting may copy readers, so find them by where they are
+            for port_info in [PortInfo(at=self._map.inv[output_sig], port=port)
+                              for port, output_sig in self._readers(sig)]:
                 self.disconnect(port_info)
                 con_info = ConnectionInfo(input_at=at, output=port_info)
                 outputs.append(con_info)
         if isinstance(sig, Receiver):
-            for port_name, input_sig in tuple(sig.inputs_by_port.items()):
+            for port_name in sig.port_names():
+                input_sig = self._port_input(sig, port_name)
+                if input_sig is None:
+                    continue
                 port_info = PortInfo(at=at, port=port_name)
-                self.disconnect(port_info)
+                if not shared:
+                    self.disconnect(port_info)
                 input_at = self._map.inv[input_sig]
                 con_info = ConnectionInfo(input_at=input_at, output=port_info)
                 inputs.append(con_info)
 
-        sig.destroy()
+        self._holders[sig] -= 1
+        if not shared:
+            del self._holders[sig]
+            sig.destroy()
+        elif isinstance(sig, signals.chain.dev.SinkDevice):
+            if self.live:
+                self.transport.release(sig)
+            else:
+                for port_name in sig.port_names():
+                    self._parked.pop((sig, port_name), None)
         self._map.inv.pop(sig)
+        self._share_duplicates()
 
         if isinstance(sig, signals.chain.dev.SourceDevice):
             assert not inputs, inputs
@@ -459,9 +573,10 @@ class Map:
         return result
 
     def edit(self, at: Coordinates, state: SigState) -> SigState:
-        sig = self._find(at)
+        sig = self._own(self._find(at))
         old_state = SigState.from_signal(sig)
         self._apply_state(at, sig, state)
+        self._share_duplicates()
         return old_state
 
     def mv(self, at1: Coordinates, at2: Coordinates) -> None:
@@ -473,18 +588,21 @@ class Map:
     def connect(self, info: ConnectionInfo) -> Coordinates | None:
         input_sig = self._find(info.input_at)
         output_sig = self._find(info.output.at)
-        old_input_port = getattr(output_sig, info.output.port)
-        old_input_at = self._map.inv[old_input_port.sig] if old_input_port else None
+        old_input = self._port_input(output_sig, info.output.port)
+        old_input_at = self._map.inv[old_input] if old_input is not None else None
         if old_input_at == info.input_at:
             raise AlreadyConnected(info)
         elif isinstance(output_sig, Receiver):
             try:
                 # FIXME this does not raise a KeyError if the part name is invalid
                 #  i think I need actual setters instead of using setattr
-                setattr(output_sig, info.output.port, input_sig)
+                self._set_port_input(self._own(output_sig), info.output.port, input_sig)
             except KeyError:
                 raise BadPort(info.output, output_sig)
             else:
+                self._share_duplicates()
+                if self.live:
+                    self.transport.reserve()
                 return old_input_at
         else:
             raise BadReceiver(info.output.at, output_sig)
@@ -492,7 +610,7 @@ class Map:
     def disconnect(self, info: PortInfo) -> Coordinates:
         output = self._find(info.at)
         try:
-            input = getattr(output, info.port).sig
+            input = self._port_input(output, info.port)
         except KeyError:
             if isinstance(output, Receiver):
                 raise BadPort(info, output)
@@ -505,21 +623,146 @@ class Map:
                 # this may fail if the input is outside the map
                 # e.g. if we only map a subset of the graph
                 input_at = self._map.inv[input]
-                delattr(output, info.port)
+                self._set_port_input(self._own(output), info.port, None)
+                self._share_duplicates()
                 return input_at
 
-    def playback(self, at: Coordinates, state: PlaybackState) -> None:
-        sink = self._find(at)
-        if isinstance(sink, signals.chain.dev.SinkDevice):
-            if state.position is not None:
-                sink.seek(state.position)
-            if state.active is not None:
-                if state.active:
-                    sink.start()
-                else:
-                    sink.stop()
+    def _plays(self) -> bool:
+        """
+        Whether this map's transport plays its sinks while it is live.
+        """
+        return True
+
+    @property
+    def block_size(self) -> int:
+        return self.transport.block_size
+
+    def set_block_size(self, block_size: int) -> None:
+        self.transport.set_block_size(block_size)
+
+    @property
+    def compiled(self) -> bool:
+        return self.transport.compiled
+
+    def set_compiled(self, compiled: bool) -> None:
+        self.transport.compiled = compiled
+
+    def latency(self) -> dict[Coordinates, float]:
+        return {
+            self._map.inv[sink]: self.transport.latency(sink)
+            for sink in self.transport.sinks
+        }
+
+    def predict_costs(self, connection: ConnectionInfo | None = None) -> dict[Coordinates, float]:
+        """
+        Nanoseconds each signal played, or made part of `connection`, is
+        predicted to take per block, as if that connection were made.
+        """
+        return {
+            self._map.inv[sig]: ns
+            for sig, ns in self._predict(connection).items()
+            if sig in self._map.inv
+        }
+
+    def predict_load(self, connection: ConnectionInfo | None = None) -> float:
+        """
+        The fraction of the time each block is due in that evaluating it is
+        predicted to take, as if `connection` were made. Its receiver, and
+        everything it reads, count even if no sink plays them yet.
+        """
+        ns = sum(self._predict(connection).values())
+        return ns * 1e-9 * self.transport.rate / self.block_size
+
+    def _predict(self, connection: ConnectionInfo | None) -> dict[Signal, float]:
+        inputs = dict(self._parked)
+        roots: list[Signal] = list(self._sinks())
+        if connection is not None:
+            receiver = self._find(connection.output.at)
+            inputs[receiver, connection.output.port] = self._find(connection.input_at)
+            roots.append(receiver)
+        return self.cost_model.predict(roots, self.block_size, inputs)
+
+    def playback(self, state: PlaybackState) -> None:
+        if state.position is not None:
+            self.transport.seek(state.position)
+        if state.active is not None:
+            if state.active:
+                self.transport.play()
+            else:
+                self.transport.pause()
+
+    def freeze(self, at: Coordinates, frames: int, rate: int) -> None:
+        sig = self._find(at)
+        if not isinstance(sig, Emitter):
+            raise BadEmitter(at, sig)
+        with self._private_copy(at) as copy_map:
+            signals.chain.render.freeze(sig, frames=frames, rate=rate, source=copy_map._find(at))
+        self._share_duplicates()
+
+    def unfreeze(self, at: Coordinates) -> None:
+        sig = self._find(at)
+        if isinstance(sig, Emitter):
+            sig.unfreeze()
         else:
-            raise BadPlaybackTarget(at, sink)
+            raise BadEmitter(at, sig)
+        self._share_duplicates()
+
+    def sweep(self,
+              at: Coordinates,
+              param_at: Coordinates,
+              candidates: typing.Sequence[float],
+              frames: int,
+              rate: int
+              ) -> np.ndarray:
+        """
+        Render the signal at `at` once for every candidate value of the fixed
+        signal at `param_at`.
+        The variants are carried through the graph side by side along the
+        channel axis, so every node is evaluated once per block for all of
+        them, in a private copy of the graph that leaves what plays as it
+        is. Returns one column per candidate.
+        """
+        sig = self._find(at)
+        if not isinstance(sig, Emitter):
+            raise BadEmitter(at, sig)
+        param = self._find(param_at)
+        if not isinstance(param, signals.chain.fixed.Fixed):
+            raise BadSweepParameter(param_at, param)
+        with self._private_copy(at) as copy_map:
+            # A parameter that isn't upstream can't make any difference
+            if param_at in copy_map._map:
+                copy_map.edit(param_at, SigState(value=np.array([candidates], dtype=float)))
+            source = copy_map._find(at)
+            channels = source.channels
+            if channels != len(candidates):
+                raise BadSweepChannels(at, channels, len(candidates))
+            return signals.chain.render.Bounce(source, rate=rate).render(frames)
+
+    @contextlib.contextmanager
+    def _private_copy(self, at: Coordinates) -> typing.Iterator['Map']:
+        """
+        A map of copies of the signal at `at` and of everything upstream of
+        it, for rendering offline while the transport keeps pulling the
+        originals. Devices are left out, side effects are disabled, and the
+        copies are destroyed afterwards.
+        """
+        sig = self._find(at)
+        upstream = {sig, *(sig.upstream() if isinstance(sig, Receiver) else ())}
+        copy_map = Map(self.disk_cache)
+        try:
+            for info in self.iter_signals():
+                if self._find(info.at) in upstream:
+                    state = SigState(info.state)
+                    if info.flags & (SignalFlags.RECORDER | SignalFlags.VIS):
+                        state['enabled'] = False
+                    copy_map.add(attr.evolve(info, state=state))
+            for connection in self.iter_connections():
+                if connection.input_at in copy_map._map and connection.output.at in copy_map._map:
+                    copy_map.connect(connection)
+            yield copy_map
+        finally:
+            for copied in copy_map._map.values():
+                copied.destroy()
 
     def iter_signals(self) -> typing.Iterator[MappedSigInfo]:
         for at, sig in self._map.items():
@@ -531,9 +774,10 @@ class Map:
     def iter_connections(self) -> typing.Iterator[ConnectionInfo]:
         for at, sig in self._map.items():
             if isinstance(sig, Receiver):
-                for port, input_sig in sig.inputs_by_port.items():
-                    yield ConnectionInfo(input_at=self._map.inv[input_sig],
-                                         output=PortInfo(at=at, port=port))
+                for port in sig.port_names():
+                    if (input_sig := self._port_input(sig, port)) is not None:
+                        yield ConnectionInfo(input_at=self._map.inv[input_sig],
+                                             output=PortInfo(at=at, port=port))
 
     def iter_sources(self) -> typing.Iterator[MappedDevInfo]:
         for at, sig in self._map.items():
@@ -542,6 +786,12 @@ class Map:
                                                device=sig.info,
                                                state=SigState.from_signal(sig))
 
+    def note_on(self, bank: str, note: int, velocity: float) -> int:
+        return self._find_bank(bank).note_on(note, velocity)
+
+    def note_off(self, bank: str, note: int) -> int | None:
+        return self._find_bank(bank).note_off(note)
+
     def iter_sinks(self) -> typing.Iterator[MappedDevInfo]:
         for at, sig in self._map.items():
             if isinstance(sig, signals.chain.dev.SinkDevice):
@@ -549,12 +799,104 @@ class Map:
                                              device=sig.info,
                                              state=SigState.from_signal(sig))
 
+    def collect(self, at: Coordinates, frames: int) -> np.ndarray | None:
+        return self._find_vis(at).collect(frames)
+
+    def vis_ring(self, at: Coordinates) -> str | None:
+        ring = self._find_vis(at).ring
+        return None if ring is None else ring.name
+
     def render(self, at: Coordinates, ax: plt.Axes, frames: int) -> list[plt.Artist]:
-        sig = self._find(at)
-        if isinstance(sig, signals.chain.vis.Vis):
-            return sig.render(ax, frames)
+        return self._find_vis(at).draw(ax, self.collect(at, frames), frames)
+
+    def cache_usage(self) -> dict[Coordinates, CacheUsage]:
+        return {
+            at: sig.cache_usage
+            for at, sig in self._map.items()
+            if isinstance(sig, BlockCachingEmitter)
+        }
+
+    def _share_duplicates(self) -> None:
+        # Identical signals are evaluated once, leaving the patch as it is
+        signals.chain.share.share_duplicates(sig for sig in self._map.values() if not self._parks(sig))
+
+    def _sinks(self) -> list[signals.chain.dev.SinkDevice]:
+        return [sig for sig in self._map.values() if isinstance(sig, signals.chain.dev.SinkDevice)]
+
+    def _parks(self, sig: Signal) -> bool:
+        # A sink's ports hold the live variant's inputs, and any other
+        # receiver's those of every variant holding it
+        return not self.live and isinstance(sig, signals.chain.dev.SinkDevice)
+
+    def _port_input(self, receiver: Signal, port_name: PortName) -> Emitter | None:
+        if self._parks(receiver):
+            if port_name not in receiver.port_names():
+                raise KeyError(port_name)
+            return self._parked.get((receiver, port_name))
         else:
-            raise BadVis(at, sig)
+            return getattr(receiver, port_name).sig
+
+    def _set_port_input(self, receiver: Receiver, port_name: PortName, input_: Emitter | None) -> None:
+        if self._parks(receiver):
+            if port_name not in receiver.port_names():
+                raise KeyError(port_name)
+            self._parked[receiver, port_name] = input_
+        elif input_ is None:
+            if getattr(receiver, port_name):
+                delattr(receiver, port_name)
+        elif getattr(receiver, port_name).sig is not input_:
+            setattr(receiver, port_name, input_)
+
+    def _readers(self, sig: Emitter) -> list[tuple[PortName, Receiver]]:
+        readers = [
+            (port_name, receiver)
+            for port_name, receiver in sig.outputs_with_ports
+            if receiver in self._map.inv and not self._parks(receiver)
+        ]
+        readers += [
+            (port_name, sink)
+            for (sink, port_name), input_ in self._parked.items()
+            if input_ is sig and sink in self._map.inv
+        ]
+        return readers
+
+    def _own(self, sig: Signal) -> Signal:
+        """
+        Copy `sig` if another variant holds it too, along with whatever is
+        downstream of it here and held by another variant, so that changing
+        it leaves the others as they are. Returns the signal to change.
+        """
+        copies: dict[Signal, Signal] = {}
+        pending = [sig]
+        while pending:
+            original = pending.pop()
+            if (original not in copies
+                    and self._holders[original] > 1
+                    and not isinstance(original, signals.chain.dev.Device)):
+                copies[original] = self._copy(original)
+                if isinstance(original, Emitter):
+                    pending.extend(receiver for _, receiver in self._readers(original))
+        for original, duplicate in copies.items():
+            at = self._map.inv.pop(original)
+            self._map[at] = duplicate
+            self._holders[original] -= 1
+            self._holders[duplicate] += 1
+        for original, duplicate in copies.items():
+            if isinstance(original, Receiver):
+                for port_name, input_sig in original.inputs_by_port.items():
+                    setattr(duplicate, port_name, copies.get(input_sig, input_sig))
+            if isinstance(original, Emitter):
+                # Only readers that weren't copied still read the original
+                for port_name, receiver in self._readers(original):
+                    self._set_port_input(receiver, port_name, duplicate)
+        return copies.get(sig, sig)
+
+    def _copy(self, sig: Signal) -> Signal:
+        duplicate = type(sig)()
+        if isinstance(duplicate, BlockCachingEmitter):
+            duplicate.disk_cache = self.disk_cache
+        duplicate.set_state(copy.copy(sig.get_state()))
+        return duplicate
 
     def _find(self, at: Coordinates) -> Signal:
         try:
@@ -562,6 +904,19 @@ class Map:
         except KeyError:
             raise Empty(at)
 
+    def _find_bank(self, bank: str) -> signals.chain.poly.VoiceBank:
+        try:
+            return signals.chain.poly.VoiceBank.get(bank)
+        except signals.chain.poly.BadVoiceBank:
+            raise BadVoiceBank(bank)
+
+    def _find_vis(self, at: Coordinates) -> signals.chain.vis.Vis:
+        sig = self._find(at)
+        if isinstance(sig, signals.chain.vis.Vis):
+            return sig
+        else:
+            raise BadVis(at, sig)
+
     def _pop(self, at: Coordinates) -> Signal:
         try:
             return self._map.pop(at)
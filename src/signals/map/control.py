@@ -13,10 +13,12 @@ import traceback
 import typing
 
 import attr
+import soundfile as sf
 
 import signals.chain.dev
 import signals.chain.discovery
 import signals.discovery
+import signals.map.render
 from signals.map import (
     BadName,
     ConnectionInfo,
@@ -204,30 +206,28 @@ class HistoryCommand(LineCommand, abc.ABC):
 
 
 @attr.s(auto_attribs=True, kw_only=True, frozen=True)
-class PlaybackCommand(LineCommand, abc.ABC):
-    at: list[Coordinates]
+class PlaybackCommand(LineCommand, SerializingCommand, abc.ABC):
 
-    @classmethod
-    def parser(cls) -> argparse.ArgumentParser:
-        parser = super().parser()
-        parser.add_argument('at', type=Coordinates.parse, nargs='*')
-        return parser
+    def serialize(self) -> str:
+        return self.name()
 
     @abc.abstractmethod
     def target_state(self) -> PlaybackState:
         raise NotImplementedError
 
     def affect(self, controller: 'Controller') -> None:
-        target_state = self.target_state()
-        for at in self._targets(controller.map):
-            controller.map.playback(at, target_state)
+        controller.map.playback(self.target_state())
 
-    def _targets(self, sig_map: Map) -> typing.Iterable[Coordinates]:
-        if self.at:
-            yield from self.at
-        else:
-            for sink in sig_map.iter_sinks():
-                yield sink.at
+
+@attr.s(auto_attribs=True, kw_only=True, frozen=True)
+class FreezeCommand(LineCommand, abc.ABC):
+    at: Coordinates
+
+    @classmethod
+    def parser(cls) -> argparse.ArgumentParser:
+        parser = super().parser()
+        parser.add_argument('at', type=Coordinates.parse)
+        return parser
 
 
 class CommandError(MapLayerError):
@@ -244,6 +244,24 @@ class BadCommand(CommandError, BadName):
         super().__init__(cmd_, options=cmds)
 
 
+class BadVariant(CommandError, BadName):
+
+    def __init__(self, variant: str, variants: typing.Iterable[str]):
+        super().__init__(f'No variant named {variant!r}.', options=variants)
+
+
+class VariantExists(CommandError):
+
+    def __init__(self, variant: str):
+        super().__init__(f'There is already a variant named {variant!r}')
+
+
+class Overload(CommandError):
+
+    def __init__(self, load: float):
+        super().__init__(f'Playback is predicted to take {load:.0%} of the time it has')
+
+
 class BadHistory(CommandError, abc.ABC):
     pass
 
@@ -330,7 +348,7 @@ class CommandSet:
             controller.map.rm(self.signal.at)
 
     @attr.s(auto_attribs=True, kw_only=True, frozen=True)
-    class Remove(LineCommand, StackCommand, LossyCommand[LinkedSigInfo]):
+    class Remove(LineCommand, StackCommand, SerializingCommand, LossyCommand[LinkedSigInfo]):
         at: Coordinates
 
         @classmethod
@@ -348,6 +366,12 @@ class CommandSet:
             parser.add_argument('at', type=Coordinates.parse)
             return parser
 
+        def serialize(self) -> str:
+            return ' '.join((
+                self.symbol(),
+                str(self.at)
+            ))
+
         def do(self, controller: 'Controller'):
             sig_info = controller.map.rm(self.at)
             self.push_stash(sig_info)
@@ -359,7 +383,7 @@ class CommandSet:
                 controller.map.connect(connection)
 
     @attr.s(auto_attribs=True, kw_only=True, frozen=True)
-    class Edit(LineCommand, StackCommand, LossyCommand[SigState]):
+    class Edit(LineCommand, StackCommand, SerializingCommand, LossyCommand[SigState]):
         at: Coordinates
         state: SigState
 
@@ -385,6 +409,13 @@ class CommandSet:
             return dict(at=args.at,
                         state=SigState(args.sig_state))
 
+        def serialize(self) -> str:
+            return ' '.join((
+                self.symbol(),
+                str(self.at),
+                str(self.state)
+            ))
+
         def do(self, controller: 'Controller'):
             old_state = controller.map.edit(at=self.at, state=self.state)
             self.push_stash(old_state)
@@ -393,7 +424,7 @@ class CommandSet:
             controller.map.edit(self.at, self.pop_stash())
 
     @attr.s(auto_attribs=True, kw_only=True, frozen=True)
-    class Move(LineCommand, StackCommand):
+    class Move(LineCommand, StackCommand, SerializingCommand):
         at1: Coordinates
         at2: Coordinates
 
@@ -413,6 +444,13 @@ class CommandSet:
             parser.add_argument('at2', type=Coordinates.parse)
             return parser
 
+        def serialize(self) -> str:
+            return ' '.join((
+                self.symbol(),
+                str(self.at1),
+                str(self.at2)
+            ))
+
         def do(self, controller: 'Controller'):
             controller.map.mv(self.at1, self.at2)
 
@@ -451,6 +489,10 @@ class CommandSet:
                 str(self.connection.output)
             ))
 
+        def affect(self, controller: 'Controller') -> None:
+            controller.admit(self.connection)
+            super().affect(controller)
+
         def do(self, controller: 'Controller'):
             old_input_at = controller.map.connect(self.connection)
             self.push_stash(None
@@ -465,7 +507,7 @@ class CommandSet:
                 controller.map.connect(stash)
 
     @attr.s(auto_attribs=True, kw_only=True, frozen=True)
-    class Disconnect(LineCommand, StackCommand, LossyCommand[ConnectionInfo]):
+    class Disconnect(LineCommand, StackCommand, SerializingCommand, LossyCommand[ConnectionInfo]):
         port: PortInfo
 
         @classmethod
@@ -483,6 +525,12 @@ class CommandSet:
             parser.add_argument('port', type=PortInfo.parse)
             return parser
 
+        def serialize(self) -> str:
+            return ' '.join((
+                self.symbol(),
+                str(self.port)
+            ))
+
         def do(self, controller: 'Controller'):
             input_at = controller.map.disconnect(info=self.port)
             self.push_stash(ConnectionInfo(input_at=input_at, output=self.port))
@@ -685,24 +733,295 @@ class CommandSet:
         def target_state(self) -> PlaybackState:
             return PlaybackState(position=0, active=False)
 
-        class SeekCommand(PlaybackCommand):
-            position: int
+    @attr.s(auto_attribs=True, kw_only=True, frozen=True)
+    class SeekCommand(PlaybackCommand):
+        # Frames from the start
+        position: int
+
+        @classmethod
+        def name(cls) -> str:
+            return 'seek'
+
+        @classmethod
+        @functools.lru_cache(1)
+        def parser(cls) -> argparse.ArgumentParser:
+            parser = super().parser()
+            parser.add_argument('position', type=int)
+            return parser
+
+        def serialize(self) -> str:
+            return f'{self.name()} {self.position}'
+
+        def target_state(self) -> PlaybackState:
+            return PlaybackState(position=self.position, active=None)
+
+    class Caches(LineCommand):
+
+        @classmethod
+        def name(cls) -> str:
+            return 'caches'
+
+        def affect(self, controller: 'Controller') -> None:
+            for at, usage in controller.map.cache_usage().items():
+                print(f'{at} {usage.policy}: {usage.blocks} blocks, {usage.bytes} bytes', file=controller.stdout)
+
+    @attr.s(auto_attribs=True, kw_only=True, frozen=True)
+    class Latency(LineCommand, SerializingCommand):
+        # Frames the engine evaluates at once, whatever the devices ask for
+        block_size: int | None
+        # Whether the graph is compiled for playback
+        compiled: bool | None
+
+        @classmethod
+        def name(cls) -> str:
+            return 'latency'
+
+        @classmethod
+        @functools.lru_cache(1)
+        def parser(cls) -> argparse.ArgumentParser:
+            parser = super().parser()
+            parser.add_argument('--block-size', type=int, default=None)
+            parser.add_argument('--compiled', choices=('on', 'off'), default=None)
+            return parser
+
+        @classmethod
+        def process_args(cls, args: argparse.Namespace) -> dict:
+            return dict(block_size=args.block_size,
+                        compiled=None if args.compiled is None else args.compiled == 'on')
+
+        def serialize(self) -> str:
+            args = [self.name()]
+            if self.block_size is not None:
+                args.append(f'--block-size {self.block_size}')
+            if self.compiled is not None:
+                args.append(f'--compiled {"on" if self.compiled else "off"}')
+            return ' '.join(args)
+
+        def affect(self, controller: 'Controller') -> None:
+            if self.block_size is not None:
+                controller.map.set_block_size(self.block_size)
+            if self.compiled is not None:
+                controller.map.set_compiled(self.compiled)
+            print(f'block size {controller.map.block_size}{", compiled" if controller.map.compiled else ""}',
+                  file=controller.stdout)
+            for at, seconds in controller.map.latency().items():
+                print(f'{at} {seconds * 1e3:.1f} ms', file=controller.stdout)
+
+    @attr.s(auto_attribs=True, kw_only=True, frozen=True)
+    class Cost(LineCommand):
+        # What to do about connections predicted to overload playback
+        admission: str | None
+
+        @classmethod
+        def name(cls) -> str:
+            return 'cost'
+
+        @classmethod
+        @functools.lru_cache(1)
+        def parser(cls) -> argparse.ArgumentParser:
+            parser = super().parser()
+            parser.add_argument('--admission', choices=Controller.admissions, default=None)
+            return parser
+
+        def affect(self, controller: 'Controller') -> None:
+            if self.admission is not None:
+                controller.admission = self.admission
+            print(f'predicted load {controller.map.predict_load():.0%}, admission {controller.admission}',
+                  file=controller.stdout)
+            costs = controller.map.predict_costs()
+            for at in sorted(costs, key=costs.get, reverse=True):
+                print(f'{at} {costs[at] / 1e3:.1f} us', file=controller.stdout)
+
+    @attr.s(auto_attribs=True, kw_only=True, frozen=True)
+    class NoteOn(LineCommand, SerializingCommand):
+        bank: str
+        note: int
+        velocity: float
+
+        @classmethod
+        def name(cls) -> str:
+            return 'note'
+
+        @classmethod
+        @functools.lru_cache(1)
+        def parser(cls) -> argparse.ArgumentParser:
+            parser = super().parser()
+            parser.add_argument('bank')
+            parser.add_argument('note', type=int)
+            parser.add_argument('--velocity', type=float, default=1.)
+            return parser
+
+        def serialize(self) -> str:
+            return f'{self.name()} {self.bank} {self.note} --velocity {self.velocity!r}'
+
+        def affect(self, controller: 'Controller') -> None:
+            controller.map.note_on(self.bank, self.note, self.velocity)
+
+    @attr.s(auto_attribs=True, kw_only=True, frozen=True)
+    class NoteOff(LineCommand, SerializingCommand):
+        bank: str
+        note: int
+
+        @classmethod
+        def name(cls) -> str:
+            return 'release'
+
+        @classmethod
+        @functools.lru_cache(1)
+        def parser(cls) -> argparse.ArgumentParser:
+            parser = super().parser()
+            parser.add_argument('bank')
+            parser.add_argument('note', type=int)
+            return parser
+
+        def serialize(self) -> str:
+            return f'{self.name()} {self.bank} {self.note}'
+
+        def affect(self, controller: 'Controller') -> None:
+            controller.map.note_off(self.bank, self.note)
+
+    @attr.s(auto_attribs=True, kw_only=True, frozen=True)
+    class Freeze(FreezeCommand):
+        seconds: float
+        rate: int
 
-            @classmethod
-            def name(cls) -> str:
-                return 'seek'
+        @classmethod
+        def name(cls) -> str:
+            return 'freeze'
+
+        @classmethod
+        @functools.lru_cache(1)
+        def parser(cls) -> argparse.ArgumentParser:
+            parser = super().parser()
+            parser.add_argument('seconds', type=float)
+            parser.add_argument('--rate', type=int, default=44100)
+            return parser
+
+        def affect(self, controller: 'Controller') -> None:
+            controller.map.freeze(self.at, frames=round(self.seconds * self.rate), rate=self.rate)
+
+    class Unfreeze(FreezeCommand):
+
+        @classmethod
+        def name(cls) -> str:
+            return 'unfreeze'
 
-            @classmethod
-            def parser(cls) -> argparse.ArgumentParser:
-                parser = super().parser()
-                parser.add_argument('position', type=int)
-                return parser
+        def affect(self, controller: 'Controller') -> None:
+            controller.map.unfreeze(self.at)
 
-            def target_state(self) -> PlaybackState:
-                return PlaybackState(position=self.position, active=None)
+    @attr.s(auto_attribs=True, kw_only=True, frozen=True)
+    class Fork(LineCommand):
+        variant: str
+
+        @classmethod
+        def name(cls) -> str:
+            return 'fork'
+
+        @classmethod
+        @functools.lru_cache(1)
+        def parser(cls) -> argparse.ArgumentParser:
+            parser = super().parser()
+            parser.add_argument('variant')
+            return parser
+
+        def affect(self, controller: 'Controller') -> None:
+            controller.fork(self.variant)
+
+    @attr.s(auto_attribs=True, kw_only=True, frozen=True)
+    class Switch(LineCommand):
+        variant: str
+
+        @classmethod
+        def name(cls) -> str:
+            return 'switch'
+
+        @classmethod
+        @functools.lru_cache(1)
+        def parser(cls) -> argparse.ArgumentParser:
+            parser = super().parser()
+            parser.add_argument('variant')
+            return parser
+
+        def affect(self, controller: 'Controller') -> None:
+            controller.switch(self.variant)
+
+    @attr.s(auto_attribs=True, kw_only=True, frozen=True)
+    class Sweep(LineCommand):
+        at: Coordinates
+        param_at: Coordinates
+        seconds: float
+        path: str
+        candidates: list[float]
+        rate: int
+
+        @classmethod
+        def name(cls) -> str:
+            return 'sweep'
+
+        @classmethod
+        @functools.lru_cache(1)
+        def parser(cls) -> argparse.ArgumentParser:
+            parser = super().parser()
+            parser.add_argument('at', type=Coordinates.parse)
+            parser.add_argument('param_at', type=Coordinates.parse)
+            parser.add_argument('seconds', type=float)
+            # Formatted with the index of each candidate, e.g. `out-{}.wav`
+            parser.add_argument('path')
+            parser.add_argument('candidates', type=float, nargs='+')
+            parser.add_argument('--rate', type=int, default=44100)
+            return parser
+
+        def affect(self, controller: 'Controller') -> None:
+            renders = controller.map.sweep(self.at,
+                                           self.param_at,
+                                           self.candidates,
+                                           frames=round(self.seconds * self.rate),
+                                           rate=self.rate)
+            for i, render in enumerate(renders.T):
+                sf.write(self.path.format(i), render, samplerate=self.rate)
+
+    @attr.s(auto_attribs=True, kw_only=True, frozen=True)
+    class Render(LineCommand):
+        at: Coordinates
+        seconds: float
+        path: pathlib.Path
+        rate: int
+        segment: float | None
+        processes: int | None
+
+        @classmethod
+        def name(cls) -> str:
+            return 'render'
+
+        @classmethod
+        @functools.lru_cache(1)
+        def parser(cls) -> argparse.ArgumentParser:
+            parser = super().parser()
+            parser.add_argument('at', type=Coordinates.parse)
+            parser.add_argument('seconds', type=float)
+            parser.add_argument('path', type=pathlib.Path)
+            parser.add_argument('--rate', type=int, default=44100)
+            parser.add_argument('--segment', type=float, default=None)
+            parser.add_argument('--processes', type=int, default=None)
+            return parser
+
+        def affect(self, controller: 'Controller') -> None:
+            signals.map.render.render(controller.map,
+                                      self.at,
+                                      self.path,
+                                      frames=round(self.seconds * self.rate),
+                                      rate=self.rate,
+                                      segment_frames=None if self.segment is None else int(self.segment * self.rate),
+                                      processes=self.processes)
 
 
 class Controller(cmd.Cmd):
+    # Whether connections predicted to overload playback are allowed, with
+    # a warning, or refused
+    admissions = ('off', 'warn', 'refuse')
+    # The predicted load, as a fraction of the time each block is due in,
+    # above which a connection overloads playback
+    max_load = 1.
 
     def __init__(self,
                  *,
@@ -724,6 +1043,13 @@ class Controller(cmd.Cmd):
         self.rack.scan()
         self.history = collections.deque[StackCommand](maxlen=100)
         self.history_index = None
+        # Copy-on-write variants of the map by name, `map` being the one
+        # edited and played
+        self.variant = 'main'
+        self.variants = {self.variant: self.map}
+        # The history of each variant but the current one
+        self._histories: dict[str, tuple[collections.deque[StackCommand], int | None, int]] = {}
+        self.admission = 'warn'
         self.exit = False
 
     @property
@@ -799,6 +1125,47 @@ class Controller(cmd.Cmd):
             self.modcount += 1
             self.history_index = target_index
 
+    def admit(self, connection: ConnectionInfo) -> None:
+        if self.admission == 'off':
+            return
+        load = self.map.predict_load(connection)
+        # Connections that bring an overloaded patch's load down are fine
+        if load > self.max_load and load > self.map.predict_load():
+            if self.admission == 'refuse':
+                raise Overload(load)
+            else:
+                print(f'Warning: playback is predicted to take {load:.0%} of the time it has', file=self.stdout)
+
+    def fork(self, variant: str) -> None:
+        if variant in self.variants:
+            raise VariantExists(variant)
+        self.variants[variant] = self.map.fork()
+        history = collections.deque((self._fork_command(cmd_) for cmd_ in self.history), maxlen=self.history.maxlen)
+        self._histories[variant] = history, self.history_index, self.modcount
+
+    @classmethod
+    def _fork_command(cls, cmd_: StackCommand) -> StackCommand:
+        # Each variant undoes and redoes what came before the fork on its
+        # own, so each needs its own stashes
+        if isinstance(cmd_, BatchStackCommand):
+            return attr.evolve(cmd_, cmds=[cls._fork_command(cmd) for cmd in cmd_.cmds])
+        elif isinstance(cmd_, LossyCommand):
+            return attr.evolve(cmd_, stash=list(cmd_._stash))
+        else:
+            return cmd_
+
+    def switch(self, variant: str) -> None:
+        try:
+            target = self.variants[variant]
+        except KeyError:
+            raise BadVariant(variant, self.variants)
+        if target is not self.map:
+            self._histories[self.variant] = self.history, self.history_index, self.modcount
+            self.history, self.history_index, self.modcount = self._histories.pop(variant)
+            self.map.switch(target)
+            self.map = target
+            self.variant = variant
+
     def reset_history(self):
         self.history.clear()
         self.history_index = None
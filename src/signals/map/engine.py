@@ -0,0 +1,319 @@
+import multiprocessing
+import multiprocessing.connection
+import pathlib
+import traceback
+import typing
+
+import numpy as np
+
+from signals.chain import (
+    CacheUsage,
+    Emitter,
+)
+import signals.chain.cache
+import signals.chain.dev
+from signals.chain.ring import (
+    SharedRing,
+)
+from signals.map import (
+    BadEmitter,
+    ConnectionInfo,
+    Coordinates,
+    LinkedSigInfo,
+    Map,
+    MapLayerError,
+    MappedDevInfo,
+    MappedSigInfo,
+    PlaybackState,
+    PortInfo,
+    SigState,
+)
+import signals.map.control
+
+
+class EngineError(MapLayerError):
+    pass
+
+
+class EngineDied(EngineError):
+
+    def __init__(self):
+        super().__init__('The engine process is not running')
+
+
+class NoEngineVariants(EngineError):
+
+    def __init__(self):
+        super().__init__('Variants of a map cannot be played by an engine')
+
+
+class Engine:
+    """
+    Runs a `Controller` and its signals in a child process, so that audio
+    callbacks never wait on the GUI for the GIL.
+    Commands are sent as the lines they serialize to, and every message is
+    answered before the next one is sent.
+    """
+
+    def __init__(self,
+                 *,
+                 cache_path: pathlib.Path | None = None,
+                 cache_bytes: int = 0):
+        context = multiprocessing.get_context('spawn')
+        self._conn, child_conn = context.Pipe()
+        self._process = context.Process(target=_serve,
+                                        args=(child_conn, cache_path, cache_bytes),
+                                        name='signals-engine',
+                                        daemon=True)
+        self._process.start()
+        child_conn.close()
+
+    @property
+    def is_alive(self) -> bool:
+        return self._process.is_alive()
+
+    def _call(self, *message: typing.Any) -> typing.Any:
+        try:
+            self._conn.send(message)
+            status, payload = self._conn.recv()
+        except (EOFError, OSError):
+            raise EngineDied
+        if status == 'ok':
+            return payload
+        else:
+            raise EngineError(payload)
+
+    def send(self, line: str) -> None:
+        self._call('line', line)
+
+    def vis_ring(self, at: Coordinates) -> str | None:
+        return self._call('vis_ring', str(at))
+
+    def latency(self) -> dict[str, float]:
+        return self._call('latency')
+
+    def cache_usage(self) -> dict[str, CacheUsage]:
+        return self._call('cache_usage')
+
+    def close(self) -> None:
+        if self.is_alive:
+            try:
+                self._call('exit')
+            except EngineDied:
+                pass
+            self._process.join()
+        self._conn.close()
+
+
+def _serve(conn: multiprocessing.connection.Connection,
+           cache_path: pathlib.Path | None,
+           cache_bytes: int
+           ) -> None:
+    disk_cache = None if cache_path is None else signals.chain.cache.DiskCache(cache_path, cache_bytes)
+    controller = signals.map.control.Controller(interactive=False, map=Map(disk_cache=disk_cache))
+    while True:
+        try:
+            kind, *args = conn.recv()
+        except EOFError:
+            kind, args = 'exit', ()
+        try:
+            if kind == 'line':
+                line, = args
+                controller.onecmd(line)
+                result = None
+            elif kind == 'cache_usage':
+                result = {str(at): usage for at, usage in controller.map.cache_usage().items()}
+            elif kind == 'latency':
+                result = {str(at): seconds for at, seconds in controller.map.latency().items()}
+            elif kind == 'vis_ring':
+                at, = args
+                result = controller.map.vis_ring(Coordinates.parse(at))
+            elif kind == 'exit':
+                controller.onecmd('init')
+                result = None
+            else:
+                raise ValueError(kind)
+        except Exception as e:
+            reply = ('err', str(e) if isinstance(e, MapLayerError) else traceback.format_exc())
+        else:
+            reply = ('ok', result)
+        try:
+            conn.send(reply)
+        except (BrokenPipeError, OSError):
+            break
+        if kind == 'exit':
+            break
+    conn.close()
+
+
+class EngineMap(Map):
+    """
+    A map that can mirror an engine process.
+    The signals created here are never evaluated; they only validate commands
+    and answer queries about the graph. Every change that succeeds locally is
+    then forwarded to the engine, which owns the signals that actually play.
+    Without an engine this behaves exactly like `Map`.
+    """
+
+    def __init__(self,
+                 engine: Engine | None = None,
+                 disk_cache: signals.chain.cache.DiskCache | None = None):
+        super().__init__(disk_cache=disk_cache)
+        self.engine = engine
+        self.command_set = signals.map.control.CommandSet()
+        self._rings: dict[Coordinates, SharedRing] = {}
+
+    def _forward(self, cmd: signals.map.control.SerializingCommand) -> None:
+        if self.engine is not None:
+            self.engine.send(cmd.serialize())
+
+    def add(self, info: MappedSigInfo) -> None:
+        super().add(info)
+        if isinstance(info, MappedDevInfo):
+            if info.cls_name == MappedDevInfo._sink_cls_name:
+                cmd_cls = self.command_set.Sink
+            else:
+                cmd_cls = self.command_set.Source
+            self._forward(cmd_cls(at=info.at, device_name=info.device.name))
+            if info.state:
+                self._forward(self.command_set.Edit(at=info.at, state=info.state))
+        else:
+            self._forward(self.command_set.Add(signal=info))
+
+    def rm(self, at: Coordinates) -> LinkedSigInfo:
+        result = super().rm(at)
+        self._forward(self.command_set.Remove(at=at))
+        self._detach_ring(at)
+        return result
+
+    def edit(self, at: Coordinates, state: SigState) -> SigState:
+        result = super().edit(at, state)
+        self._forward(self.command_set.Edit(at=at, state=state))
+        return result
+
+    def mv(self, at1: Coordinates, at2: Coordinates) -> None:
+        super().mv(at1, at2)
+        self._forward(self.command_set.Move(at1=at1, at2=at2))
+        self._detach_ring(at1)
+        self._detach_ring(at2)
+
+    def connect(self, info: ConnectionInfo) -> Coordinates | None:
+        result = super().connect(info)
+        self._forward(self.command_set.Connect(connection=info))
+        return result
+
+    def disconnect(self, info: PortInfo) -> Coordinates:
+        result = super().disconnect(info)
+        self._forward(self.command_set.Disconnect(port=info))
+        return result
+
+    def fork(self) -> Map:
+        if self.engine is None:
+            return super().fork()
+        else:
+            # The engine has one map, and the fork would never reach it
+            raise NoEngineVariants
+
+    def playback(self, state: PlaybackState) -> None:
+        if self.engine is None:
+            super().playback(state)
+        else:
+            # The mirrored sinks never play; only the engine's transport does
+            if state.position is not None:
+                self._forward(self.command_set.SeekCommand(position=state.position))
+            if state.active is not None:
+                if state.active:
+                    self._forward(self.command_set.PlayCommand())
+                else:
+                    self._forward(self.command_set.PauseCommand())
+
+    def _plays(self) -> bool:
+        # The mirrored sinks are never attached, so nothing here is evaluated
+        return self.engine is None
+
+    def set_block_size(self, block_size: int) -> None:
+        # Only what the engine accepts is mirrored
+        self._forward(self.command_set.Latency(block_size=block_size, compiled=None))
+        super().set_block_size(block_size)
+
+    def set_compiled(self, compiled: bool) -> None:
+        self._forward(self.command_set.Latency(block_size=None, compiled=compiled))
+        super().set_compiled(compiled)
+
+    def latency(self) -> dict[Coordinates, float]:
+        if self.engine is None:
+            return super().latency()
+        else:
+            return {Coordinates.parse(at): seconds for at, seconds in self.engine.latency().items()}
+
+    def cache_usage(self) -> dict[Coordinates, CacheUsage]:
+        if self.engine is None:
+            return super().cache_usage()
+        else:
+            # Only the engine's signals are ever evaluated
+            return {Coordinates.parse(at): usage for at, usage in self.engine.cache_usage().items()}
+
+    def note_on(self, bank: str, note: int, velocity: float) -> int | None:
+        if self.engine is None:
+            return super().note_on(bank, note, velocity)
+        else:
+            # Voices are allocated by the bank that actually plays
+            self._forward(self.command_set.NoteOn(bank=bank, note=note, velocity=velocity))
+            return None
+
+    def note_off(self, bank: str, note: int) -> int | None:
+        if self.engine is None:
+            return super().note_off(bank, note)
+        else:
+            self._forward(self.command_set.NoteOff(bank=bank, note=note))
+            return None
+
+    def freeze(self, at: Coordinates, frames: int, rate: int) -> None:
+        if self.engine is None:
+            super().freeze(at, frames, rate)
+        else:
+            self._check_emitter(at)
+            self.engine.send(f'freeze {at} {frames / rate!r} --rate {rate}')
+
+    def unfreeze(self, at: Coordinates) -> None:
+        if self.engine is None:
+            super().unfreeze(at)
+        else:
+            self._check_emitter(at)
+            self.engine.send(f'unfreeze {at}')
+
+    def collect(self, at: Coordinates, frames: int) -> np.ndarray | None:
+        if self.engine is None:
+            return super().collect(at, frames)
+        else:
+            ring = self._attach_ring(at)
+            return None if ring is None else ring.read(frames)
+
+    def vis_ring(self, at: Coordinates) -> str | None:
+        if self.engine is None:
+            return super().vis_ring(at)
+        else:
+            self._find_vis(at)
+            return self.engine.vis_ring(at)
+
+    def _attach_ring(self, at: Coordinates) -> SharedRing | None:
+        # The engine replaces a ring when its channels change, so the name is
+        # checked on every read; only the name crosses the pipe.
+        name = self.vis_ring(at)
+        ring = self._rings.get(at)
+        if ring is not None and ring.name != name:
+            self._detach_ring(at)
+            ring = None
+        if ring is None and name is not None:
+            ring = self._rings[at] = SharedRing.attach(name)
+        return ring
+
+    def _detach_ring(self, at: Coordinates) -> None:
+        ring = self._rings.pop(at, None)
+        if ring is not None:
+            ring.close()
+
+    def _check_emitter(self, at: Coordinates) -> None:
+        sig = self._find(at)
+        if not isinstance(sig, Emitter):
+            raise BadEmitter(at, sig)
@@ -0,0 +1,138 @@
+import concurrent.futures
+import math
+import multiprocessing
+import os
+import pathlib
+import tempfile
+import typing
+
+import attr
+import numpy as np
+import soundfile as sf
+
+from signals import (
+    SignalFlags,
+)
+from signals.chain import (
+    Emitter,
+    Receiver,
+)
+import signals.chain.dev
+import signals.chain.render
+from signals.map import (
+    BadEmitter,
+    ConnectionInfo,
+    Coordinates,
+    Map,
+    MapError,
+    MappedSigInfo,
+    SigState,
+)
+
+
+class NotRenderable(MapError):
+
+    def __init__(self, at: Coordinates):
+        super().__init__(at, 'Signals fed by input devices cannot be rendered offline')
+
+
+@attr.s(auto_attribs=True, kw_only=True, frozen=True)
+class _Segment:
+    infos: typing.Sequence[MappedSigInfo]
+    connections: typing.Sequence[ConnectionInfo]
+    at: Coordinates
+    rate: int
+    block_size: int
+    start: int
+    frames: int
+    preroll: int
+    out_path: str
+
+    def render(self) -> None:
+        sig_map = Map()
+        for info in self.infos:
+            if info.flags & (SignalFlags.RECORDER | SignalFlags.VIS):
+                # Side effects would be repeated, or raced, by every worker
+                info = attr.evolve(info, state=SigState({**info.state, 'enabled': False}))
+            sig_map.add(info)
+        for connection in self.connections:
+            sig_map.connect(connection)
+        bounce = signals.chain.render.Bounce(sig_map._find(self.at),
+                                             rate=self.rate,
+                                             block_size=self.block_size)
+        start = self.start - self.preroll
+        block = bounce.render(self.start + self.frames - start, start=start)
+        out = np.load(self.out_path, mmap_mode='r+')
+        out[self.start:self.start + self.frames] = block[self.start - start:]
+        out.flush()
+
+
+def render(sig_map: Map,
+           at: Coordinates,
+           path: pathlib.Path,
+           *,
+           frames: int,
+           rate: int,
+           block_size: int = 1024,
+           segment_frames: int | None = None,
+           processes: int | None = None
+           ) -> None:
+    """
+    Render `frames` frames of the signal at `at` into the sound file at
+    `path`, splitting the timeline into segments that are rendered in
+    separate processes.
+    Segments start on block boundaries and begin rendering early enough to
+    cover the warm-up of every signal upstream, so that the result matches a
+    serial render with the same block size.
+    """
+    sig = sig_map._find(at)
+    if not isinstance(sig, Emitter):
+        raise BadEmitter(at, sig)
+    upstream = sig.upstream() if isinstance(sig, Receiver) else (sig,)
+    if any(isinstance(input_, signals.chain.dev.SourceDevice) for input_ in upstream):
+        raise NotRenderable(at)
+
+    if processes is None:
+        processes = os.cpu_count()
+    if segment_frames is None:
+        segment_frames = math.ceil(frames / (processes * 4))
+    segment_frames = max(1, math.ceil(segment_frames / block_size)) * block_size
+    preroll = math.ceil(signals.chain.render.preroll(sig) / block_size) * block_size
+
+    devices = {device.at for device in (*sig_map.iter_sinks(), *sig_map.iter_sources())}
+    infos = tuple(sig_map.iter_signals())
+    connections = tuple(
+        connection
+        for connection in sig_map.iter_connections()
+        if connection.input_at not in devices and connection.output.at not in devices
+    )
+
+    fd, out_path = tempfile.mkstemp(prefix='signals-render-', suffix='.npy')
+    os.close(fd)
+    try:
+        out = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float64, shape=(frames, sig.channels))
+        del out
+        segments = [
+            _Segment(infos=infos,
+                     connections=connections,
+                     at=at,
+                     rate=rate,
+                     block_size=block_size,
+                     start=start,
+                     frames=min(segment_frames, frames - start),
+                     preroll=min(preroll, start),
+                     out_path=out_path)
+            for start in range(0, frames, segment_frames)
+        ]
+        # Forking would copy the state of running threads, and of Qt
+        with concurrent.futures.ProcessPoolExecutor(max_workers=processes,
+                                                    mp_context=multiprocessing.get_context('spawn')) as executor:
+            for _ in executor.map(_Segment.render, segments):
+                pass
+        out = np.load(out_path, mmap_mode='r')
+        with sf.SoundFile(path, mode='w', samplerate=rate, channels=out.shape[1]) as f:
+            for start in range(0, frames, segment_frames):
+                f.write(out[start:start + segment_frames])
+        del out
+    finally:
+        os.unlink(out_path)
@@ -11,6 +11,7 @@ import attr
 from signals import (
     SignalFlags,
 )
+import signals.chain
 import signals.map
 import signals.ui
 import signals.ui.geometry
@@ -75,6 +76,11 @@ class NodePartText(QtWidgets.QGraphicsSimpleTextItem):
     pass
 
 
+@palette_client(brush='mid')
+class NodePartFill(QtWidgets.QGraphicsRectItem):
+    pass
+
+
 @palette_client(pen='mid', pen_off='dark')
 class NodePartEllipse(QtWidgets.QGraphicsEllipseItem):
     pass
@@ -225,6 +231,7 @@ class NodeContainer(QtWidgets.QGraphicsWidget):
 
         port_layout = hlayout()
         port_layout.setSpacing(self.spacing)
+        self.cache_control: BufferCacheControl | None = None
         if signal.flags & SignalFlags.SINK_DEVICE:
             self.node = SinkNode(self)
             # FIXME add play button
@@ -240,6 +247,9 @@ class NodeContainer(QtWidgets.QGraphicsWidget):
         core_layout.setSpacing(self.spacing)
         core_layout.addItem(port_layout)
         core_layout.addItem(self.node)
+        if 'cache' in signal.state:
+            self.cache_control = BufferCacheControl(self)
+            core_layout.addItem(self.cache_control)
 
         self.setLayout(core_layout)
         self.setZValue(-1)
@@ -289,8 +299,39 @@ class RateIndicator(QtWidgets.QGraphicsRectItem):
             pass
 
 
-class BufferCacheControl(QtWidgets.QGraphicsRectItem):
-    pass
+class BufferCacheControl(NodePartWidget):
+    """
+    A bar showing how full the signal's block cache is, given its policy.
+    The policy itself is edited with the rest of the signal's state.
+    """
+    width = Node.radius
+    height = 4
+
+    def __init__(self, parent: NodeContainer):
+        self.fill = NodePartFill(0, 0, 0, self.height)
+        super().__init__(
+            NodePartRect(0, 0, self.width, self.height),
+            self.fill,
+            parent=parent
+        )
+        self.set_usage(None)
+
+    def set_usage(self, usage: signals.chain.CacheUsage | None) -> None:
+        policy = signals.chain.CachePolicy.parse(self.container.signal.state['cache'])
+        if usage is None:
+            fullness = 0
+        elif policy.bytes is not None:
+            fullness = usage.bytes / policy.bytes if policy.bytes else 1
+        elif policy.blocks:
+            fullness = usage.blocks / policy.blocks
+        else:
+            # Pinned caches are as full as the range they pin
+            fullness = 1 if usage.blocks else 0
+        self.fill.setRect(0, 0, self.width * min(fullness, 1), self.height)
+        if usage is None:
+            self.setToolTip(f'Cache {policy}')
+        else:
+            self.setToolTip(f'Cache {policy}: {usage.blocks} blocks, {usage.bytes / 1e6:.1f} MB')
 
 
 class Visualizer(QtWidgets.QGraphicsRectItem):
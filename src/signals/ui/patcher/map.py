@@ -1,6 +1,8 @@
 import matplotlib.pyplot as plt
 
+import signals.chain.cache
 import signals.map
+import signals.map.engine
 from signals.ui.graph import (
     NodeContainer,
     PlacedCable,
@@ -10,10 +12,13 @@ from signals.ui.patcher import (
 )
 
 
-class PatcherMap(signals.map.Map):
+class PatcherMap(signals.map.engine.EngineMap):
 
-    def __init__(self, patcher: Patcher):
-        super().__init__()
+    def __init__(self,
+                 patcher: Patcher,
+                 engine: signals.map.engine.Engine | None = None,
+                 disk_cache: signals.chain.cache.DiskCache | None = None):
+        super().__init__(engine=engine, disk_cache=disk_cache)
         self.patcher = patcher
 
     def add(self, info: signals.map.MappedSigInfo) -> None:
@@ -68,6 +73,12 @@ class PatcherMap(signals.map.Map):
 
         return result
 
+    def show_cache_usage(self) -> None:
+        for at, usage in self.cache_usage().items():
+            container = self.patcher.get_square(at).content
+            if container is not None and container.cache_control is not None:
+                container.cache_control.set_usage(usage)
+
     def disconnect(self, info: signals.map.PortInfo) -> signals.map.Coordinates:
         result = super().disconnect(info)
 
@@ -11,7 +11,9 @@ import PyQtCmd
 import attr
 
 from signals import SignalFlags
+import signals.chain.cache
 import signals.map.control
+import signals.map.engine
 import signals.ui.patcher
 import signals.ui.patcher.map
 import signals.ui.patcher.dialog
@@ -22,16 +24,22 @@ import signals.ui.vis
 
 
 class Window(QtWidgets.QMainWindow):
+    # How often nodes show their cache usage
+    cache_interval_ms = 500
+    # Less often when that is a round trip to the engine process
+    engine_cache_interval_ms = 2000
 
     def __init__(self, path: pathlib.Path | None = None, parent=None):
         super().__init__(parent=parent)
         self.path = path
         self.saved_hash = None
         self.patcher = signals.ui.patcher.Patcher()
-        self.controller = signals.map.control.Controller(
-            interactive=True,
-            map=signals.ui.patcher.map.PatcherMap(self.patcher)
-        )
+        self.engine = self._create_engine()
+        if self.engine is None:
+            sig_map = signals.ui.patcher.map.PatcherMap(self.patcher, disk_cache=self._create_disk_cache())
+        else:
+            sig_map = signals.ui.patcher.map.PatcherMap(self.patcher, engine=self.engine)
+        self.controller = signals.map.control.Controller(interactive=True, map=sig_map)
 
         self._set_title()
         self.patcher.new_container.connect(self._on_new_container)
@@ -90,6 +98,10 @@ class Window(QtWidgets.QMainWindow):
         self.addDockWidget(QtCore.Qt.BottomDockWidgetArea, vis_dock)
         self.setStatusBar(QtWidgets.QStatusBar())
 
+        self.cache_timer = QtCore.QTimer(self)
+        self.cache_timer.timeout.connect(sig_map.show_cache_usage)
+        self.cache_timer.start(self.cache_interval_ms if self.engine is None else self.engine_cache_interval_ms)
+
         signals.ui.theme.register(self.menuBar())
         if False:
             # FIXME the menus and status bars always appear as white/light gray even
@@ -98,10 +110,29 @@ class Window(QtWidgets.QMainWindow):
 
     def closeEvent(self, event: QtGui.QCloseEvent) -> None:
         if self._discard_prompt():
+            if self.engine is not None:
+                self.engine.close()
             super().closeEvent(event)
         else:
             event.ignore()
 
+    def _create_disk_cache(self) -> signals.chain.cache.DiskCache | None:
+        project = signals.app().project
+        max_bytes = project.config.render_cache_bytes
+        if max_bytes > 0:
+            return signals.chain.cache.DiskCache(project.render_cache_path, max_bytes)
+        else:
+            return None
+
+    def _create_engine(self) -> signals.map.engine.Engine | None:
+        project = signals.app().project
+        if project.config.engine_process:
+            max_bytes = project.config.render_cache_bytes
+            return signals.map.engine.Engine(cache_path=project.render_cache_path if max_bytes > 0 else None,
+                                             cache_bytes=max_bytes)
+        else:
+            return None
+
     def _create_action(self,
                        text: str,
                        shortcut: str,
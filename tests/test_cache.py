@@ -0,0 +1,191 @@
+import io
+
+import numpy as np
+import pytest
+
+from signals.chain import (
+    BadStateValue,
+    BlockLoc,
+    Denormals,
+    NotCached,
+    Recursive,
+    Request,
+    Shape,
+)
+from signals.chain.cache import (
+    DiskCache,
+)
+from signals.chain.fixed import (
+    Fixed,
+)
+from signals.chain.fx import (
+    LowPass,
+)
+from signals.chain.osc import (
+    Sine,
+)
+import signals.map.control
+from signals.map import (
+    Coordinates,
+)
+
+rate = 44100
+
+
+def fixed(value: float) -> Fixed:
+    sig = Fixed()
+    sig.set_state(Fixed.State(value=np.array([[value]])))
+    return sig
+
+
+def sine(hertz: float) -> Sine:
+    sig = Sine()
+    sig.hertz = fixed(hertz)
+    sig.phase = fixed(0.)
+    return sig
+
+
+def request(position: int = 0, frames: int = 256) -> Request:
+    return Request(requestor=None,
+                   port='test',
+                   loc=BlockLoc(position=position, rate=rate, shape=Shape(frames=frames, channels=1)))
+
+
+def test_upstream_change_discards_cached_blocks():
+    sig = sine(440.)
+    before = sig.respond(request())
+    assert sig.cache_usage.blocks == 1
+    sig.hertz.sig.set_state(Fixed.State(value=np.array([[880.]])))
+    after = sig.respond(request())
+    assert not np.array_equal(before, after)
+    np.testing.assert_array_equal(after, sine(880.).respond(request()))
+
+
+def test_digest_follows_output():
+    assert sine(440.).digest == sine(440.).digest
+    assert sine(440.).digest != sine(880.).digest
+    sig = sine(440.)
+    digest = sig.digest
+    sig.set_state(Sine.State(cache='off'))
+    assert sig.digest == digest
+
+
+def test_digest_includes_denormals_policy(monkeypatch):
+    def digest() -> str:
+        sig = LowPass()
+        sig.input = sine(440.)
+        sig.cutoff = fixed(1000.)
+        return sig.digest
+
+    flushed = digest()
+    monkeypatch.setattr(Recursive, 'denormals', Denormals.OFFSET)
+    assert digest() != flushed
+
+
+def low_pass(cutoff: float) -> LowPass:
+    sig = LowPass()
+    sig.input = sine(440.)
+    sig.cutoff = fixed(cutoff)
+    return sig
+
+
+def test_disk_cache_serves_same_digest_only(tmp_path):
+    disk_cache = DiskCache(tmp_path, max_bytes=1 << 20)
+    sig = low_pass(1000.)
+    sig.disk_cache = disk_cache
+    expected = sig.respond(request())
+    disk_cache.flush()
+    assert disk_cache.bytes > 0
+
+    same = low_pass(1000.)
+    same.disk_cache = disk_cache
+    same._get_result = pytest.fail
+    np.testing.assert_array_equal(same.respond(request()), expected)
+
+    other = low_pass(2000.)
+    other.disk_cache = disk_cache
+    assert not np.array_equal(other.respond(request()), expected)
+
+
+def test_disk_cache_only_for_signals_that_opt_in(tmp_path):
+    disk_cache = DiskCache(tmp_path, max_bytes=1 << 20)
+    sig = sine(440.)
+    sig.disk_cache = disk_cache
+    for position in range(0, 4096, 256):
+        sig.respond(request(position))
+    disk_cache.flush()
+    assert disk_cache.bytes == 0
+
+
+def test_disk_cache_entry_removed_while_read_is_a_miss(tmp_path, monkeypatch):
+    disk_cache = DiskCache(tmp_path, max_bytes=1 << 20)
+    loc = request().loc
+    disk_cache.write('digest', loc, np.ones((256, 1)))
+    disk_cache.flush()
+    load = np.load
+
+    def load_then_remove(path, *args, **kwargs):
+        # As if evicted by another process just after being opened
+        block = load(path, *args, **kwargs)
+        path.unlink()
+        return block
+
+    monkeypatch.setattr(np, 'load', load_then_remove)
+    with pytest.raises(NotCached):
+        disk_cache.read('digest', loc)
+    assert disk_cache.bytes == 0
+
+
+def test_disk_cache_evicts_to_budget(tmp_path):
+    disk_cache = DiskCache(tmp_path, max_bytes=5000)
+    block = np.zeros((256, 1))
+    for position in range(0, 2560, 256):
+        disk_cache.write('digest', request(position).loc, block)
+    disk_cache.flush()
+    assert 0 < disk_cache.bytes <= 5000
+    assert sum(path.stat().st_size for path in tmp_path.glob('*.npy')) == disk_cache.bytes
+
+
+@pytest.fixture
+def controller():
+    controller = signals.map.control.Controller(interactive=False, stdout=io.StringIO())
+    for line in [
+        'add 2a signals.chain.osc.Sine cache=blocks:2',
+        'add 3a signals.chain.fixed.Fixed value=[[440.0]]',
+        'con 3a 2a.hertz',
+    ]:
+        controller.onecmd(line)
+    yield controller
+    controller.onecmd('init')
+
+
+def play(controller, at: str, blocks: int) -> None:
+    sig = controller.map._find(Coordinates.parse(at))
+    for position in range(0, blocks * 256, 256):
+        sig.respond(request(position))
+
+
+@pytest.mark.parametrize('policy, blocks', [
+    ('off', 0),
+    ('blocks:2', 2),
+    ('bytes:4096', 2),
+    # 256 frames at 44.1 kHz last about 5.8 ms
+    ('pin:0.01:0.02', 3),
+])
+def test_cache_policy_bounds_cached_blocks(controller, policy, blocks):
+    controller.onecmd(f'ed 2a cache={policy}')
+    play(controller, '2a', 8)
+    assert controller.map.cache_usage()[Coordinates.parse('2a')].blocks == blocks
+
+
+@pytest.mark.parametrize('policy', ['blocks:0', 'bytes:-1', 'pin:1', 'sometimes'])
+def test_bad_cache_policy_rejected(controller, policy):
+    with pytest.raises(BadStateValue):
+        controller.onecmd(f'ed 2a cache={policy}')
+    assert controller.map._find(Coordinates.parse('2a')).cache_policy.blocks == 2
+
+
+def test_caches_command_reports_usage(controller):
+    play(controller, '2a', 4)
+    controller.onecmd('caches')
+    assert controller.stdout.getvalue().splitlines()[-1] == '2a blocks:2: 2 blocks, 4096 bytes'
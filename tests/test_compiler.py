@@ -0,0 +1,81 @@
+import numpy as np
+
+from signals.chain import (
+    BlockLoc,
+    Request,
+    Shape,
+)
+from signals.chain.compiler import (
+    Program,
+)
+from signals.chain.fixed import (
+    Fixed,
+)
+from signals.chain.fx import (
+    Gain,
+)
+from signals.chain.osc import (
+    Sine,
+)
+
+rate = 44100
+
+
+def fixed(value: float) -> Fixed:
+    sig = Fixed()
+    sig.set_state(Fixed.State(value=np.array([[value]])))
+    return sig
+
+
+def sine(hertz: float) -> Sine:
+    sig = Sine()
+    sig.hertz = fixed(hertz)
+    sig.phase = fixed(0.)
+    return sig
+
+
+def gain(hertz: float) -> Gain:
+    sig = Gain()
+    sig.left = sine(hertz)
+    sig.right = fixed(0.5)
+    return sig
+
+
+def loc(position: int = 0) -> BlockLoc:
+    return BlockLoc(position=position, rate=rate, shape=Shape(frames=256, channels=1))
+
+
+def expected(hertz: float, position: int = 0) -> np.ndarray:
+    return gain(hertz).respond(Request(requestor=None, port='test', loc=loc(position)))
+
+
+def test_program_matches_pulling():
+    program = Program(gain(440.))
+    for position in (0, 256, 512):
+        np.testing.assert_array_equal(program(loc(position)), expected(440., position))
+
+
+def test_recompiled_program_ignores_blocks_fed_before():
+    sig = gain(440.)
+    program = Program(sig)
+    program(loc(0))
+    program(loc(256))
+    # Rewinding to what was last fed, after an upstream change, probes
+    # the graph again through the ports fed last
+    sig.left.sig.hertz.sig.set_state(Fixed.State(value=np.array([[880.]])))
+    np.testing.assert_array_equal(program(loc(256)), expected(880., 256))
+
+
+def test_recompiled_program_forgets_ports_no_longer_fed():
+    sig = Gain()
+    sig.left = gain(440.)
+    sig.right = fixed(2.)
+    program = Program(sig)
+    program(loc(0))
+    program(loc(256))
+    old = sig.left.sig
+    sig.left = gain(880.)
+    np.testing.assert_array_equal(program(loc(256)), 2 * expected(880., 256))
+    # Pulled on its own, the detached gain reads its input again
+    old.left.sig.hertz.sig.set_state(Fixed.State(value=np.array([[880.]])))
+    np.testing.assert_array_equal(old.respond(Request(requestor=None, port='test', loc=loc(256))), expected(880., 256))
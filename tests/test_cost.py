@@ -0,0 +1,77 @@
+import io
+import json
+
+import pytest
+
+import signals.map.control
+from signals.chain.cost import (
+    Cost,
+    CostModel,
+)
+from signals.map import (
+    ConnectionInfo,
+    Coordinates,
+    PortInfo,
+)
+
+# The time one block of the default size is due in, in nanoseconds
+block_ns = 1024 / 44100 * 1e9
+
+
+@pytest.fixture
+def controller():
+    controller = signals.map.control.Controller(interactive=False, stdout=io.StringIO())
+    controller.map.cost_model = CostModel({
+        'signals.chain.fixed.Fixed': Cost(),
+        'signals.chain.osc.Sine': Cost(per_block=0.6 * block_ns),
+        'signals.chain.fx.Gain': Cost(per_block=0.6 * block_ns),
+    })
+    for line in [
+        'add 1a signals.chain.fx.Gain',
+        'add 2a signals.chain.osc.Sine',
+        'add 3a signals.chain.fixed.Fixed value=[[440.0]]',
+    ]:
+        controller.onecmd(line)
+    yield controller
+    controller.onecmd('init')
+
+
+def connection(input_at: str, output: str) -> ConnectionInfo:
+    at, port = output.split('.')
+    return ConnectionInfo(input_at=Coordinates.parse(input_at), output=PortInfo(at=Coordinates.parse(at), port=port))
+
+
+def test_load_counts_connection_without_sink(controller):
+    assert controller.map.predict_load() == 0
+    assert controller.map.predict_load(connection('3a', '2a.hertz')) == pytest.approx(0.6)
+    assert controller.map.predict_load(connection('2a', '1a.left')) == pytest.approx(1.2)
+
+
+def test_refuse_overloading_connection(controller):
+    controller.onecmd('cost --admission refuse')
+    controller.onecmd('con 3a 2a.hertz')
+    with pytest.raises(signals.map.control.Overload):
+        controller.onecmd('con 2a 1a.left')
+    assert not controller.map._find(Coordinates.parse('1a')).left
+
+
+def test_warn_about_overloading_connection(controller):
+    controller.onecmd('con 2a 1a.left')
+    assert 'playback is predicted to take 120%' in controller.stdout.getvalue()
+    assert controller.map._find(Coordinates.parse('1a')).left
+
+
+def test_connection_from_unreadable_file_predicted(controller, tmp_path):
+    controller.onecmd(f'add 3b signals.chain.files.FileReader path={tmp_path / "missing.wav"}')
+    controller.onecmd('con 3b 1a.left')
+    assert controller.map._find(Coordinates.parse('1a')).left
+
+
+def test_save_round_trips(tmp_path):
+    path = tmp_path / 'costs.json'
+    model = CostModel({'signals.chain.osc.Sine': Cost(per_block=1., per_sample=2.)})
+    model.save(path)
+    text = path.read_text()
+    assert text.endswith('}\n')
+    assert json.loads(text) == {'signals.chain.osc.Sine': {'per_block': 1., 'per_sample': 2.}}
+    assert CostModel.load(path).costs == model.costs
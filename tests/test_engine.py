@@ -0,0 +1,123 @@
+import pytest
+
+from signals.chain.dev import (
+    DeviceInfo,
+)
+from signals.map import (
+    Coordinates,
+    Map,
+    MappedDevInfo,
+)
+import signals.map.control
+from signals.map.engine import (
+    Engine,
+    EngineError,
+    EngineMap,
+)
+
+device = DeviceInfo(name='test',
+                    index=0,
+                    hostapi=0,
+                    max_input_channels=2,
+                    max_output_channels=2,
+                    default_low_input_latency=0.01,
+                    default_low_output_latency=0.01,
+                    default_high_input_latency=0.1,
+                    default_high_output_latency=0.1,
+                    default_samplerate=44100.)
+
+
+class FakeEngine:
+    """
+    Records the lines an `EngineMap` forwards, rejecting those that start
+    with any of `rejects`.
+    """
+
+    def __init__(self, *rejects: str):
+        self.lines = []
+        self.rejects = rejects
+
+    def send(self, line: str) -> None:
+        if line.startswith(self.rejects):
+            raise EngineError(line)
+        self.lines.append(line)
+
+    def latency(self) -> dict[str, float]:
+        return {}
+
+
+@pytest.fixture
+def sig_map():
+    sig_map = EngineMap(engine=FakeEngine('latency --block-size 3'))
+    sig_map.add(MappedDevInfo.for_sink(device=device, at=Coordinates.parse('1a')))
+    yield sig_map
+    sig_map.rm(Coordinates.parse('1a'))
+
+
+def test_mirrored_sinks_not_attached(sig_map):
+    assert sig_map.transport.sinks == []
+    assert sig_map._find(Coordinates.parse('1a')).fifo is None
+
+
+def test_block_size_forwarded_without_seeking(sig_map):
+    generation = sig_map.transport._generation
+    sig_map.set_block_size(256)
+    assert sig_map.block_size == 256
+    assert sig_map.engine.lines[-1].startswith('latency')
+    assert sig_map.transport._generation == generation
+
+
+def test_block_size_rejected_by_engine_unchanged(sig_map):
+    block_size = sig_map.block_size
+    lines = list(sig_map.engine.lines)
+    with pytest.raises(EngineError):
+        sig_map.set_block_size(3)
+    assert sig_map.block_size == block_size
+    assert sig_map.engine.lines == lines
+
+
+def graph(sig_map: Map) -> tuple[list, list]:
+    return (sorted((str(info.at), info.cls_name, str(info.state)) for info in sig_map.iter_signals()),
+            sorted(str(connection) for connection in sig_map.iter_connections()))
+
+
+def test_forwarded_commands_rebuild_the_graph():
+    controller = signals.map.control.Controller(interactive=False, map=EngineMap(engine=FakeEngine()))
+    for line in [
+        'add 1a signals.chain.fx.Gain',
+        'add 2a signals.chain.osc.Sine',
+        'add 2b signals.chain.osc.Sawtooth',
+        'add 3a signals.chain.fixed.Fixed value=[[440.0]]',
+        'con 3a 2a.hertz',
+        'con 3a 2b.hertz',
+        'con 2a 1a.left',
+        'con 2b 1a.right',
+        'ed 3a value=[[220.0]]',
+        'mv 2b 2c',
+        'discon 1a.left',
+        'rm 2a',
+        'latency --block-size 512',
+    ]:
+        controller.onecmd(line)
+    controller.undo()
+    controller.undo()
+    engine = signals.map.control.Controller(interactive=False)
+    for line in controller.map.engine.lines:
+        engine.onecmd(line)
+    assert graph(engine.map) == graph(controller.map)
+    assert engine.map.block_size == controller.map.block_size == 512
+    controller.onecmd('init')
+    engine.onecmd('init')
+
+
+def test_engine_process_runs_commands():
+    engine = Engine()
+    try:
+        engine.send('add 2a signals.chain.osc.Sine')
+        with pytest.raises(EngineError):
+            engine.send('add 2a signals.chain.osc.Sine')
+        assert engine.latency() == {}
+        assert engine.cache_usage()['2a'].blocks == 0
+    finally:
+        engine.close()
+    assert not engine.is_alive
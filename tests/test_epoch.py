@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from signals.chain import (
+    BadStateValue,
+    BlockLoc,
+    Request,
+    Shape,
+)
+from signals.chain.epoch import (
+    Envelope,
+    Sample,
+)
+
+rate = 44100
+
+
+def request(position: int, frames: int, channels: int = 1, rate: int = rate) -> Request:
+    return Request(requestor=None,
+                   port='test',
+                   loc=BlockLoc(position=position, rate=rate, shape=Shape(frames=frames, channels=channels)))
+
+
+def envelope(loop: bool) -> Envelope:
+    sig = Envelope()
+    sig.set_state(Envelope.State(attack=0.001, decay=0.001, hold=0.001, release=0.001, loop=loop))
+    return sig
+
+
+def sample(path, loop: bool = False) -> Sample:
+    sig = Sample()
+    sig.set_state(Sample.State(path=str(path), loop=loop))
+    return sig
+
+
+@pytest.fixture
+def wav(tmp_path):
+    path = tmp_path / 'sample.wav'
+    data = np.stack([np.linspace(-1, 1, 1000), np.linspace(1, -1, 1000)], axis=1)
+    sf.write(path, data, rate, subtype='FLOAT')
+    return path, data
+
+
+@pytest.mark.parametrize('start', [0, 100, 150])
+def test_epoch_silent_past_the_end(start):
+    sig = envelope(loop=False)
+    length = sig.length(rate)
+    rendered = sig.respond(request(0, length))
+    block = sig.respond(request(length - start, 200))
+    np.testing.assert_array_equal(block[:start], rendered[length - start:])
+    assert not block[start:].any()
+
+
+@pytest.mark.parametrize('position', [0, 100, 176, 176 * 3 - 50])
+def test_epoch_loop_wraps_around(position):
+    sig = envelope(loop=True)
+    length = sig.length(rate)
+    rendered = sig.respond(request(0, length))
+    block = sig.respond(request(position, 300))
+    np.testing.assert_array_equal(block, rendered[np.arange(position, position + 300) % length])
+
+
+def test_sample_without_file_silent():
+    sig = Sample()
+    assert sig.channels == 1
+    assert not sig.respond(request(0, 256)).any()
+
+
+def test_sample_missing_file_rejected(tmp_path):
+    with pytest.raises(BadStateValue):
+        Sample.State(path=str(tmp_path / 'missing.wav'))
+
+
+def test_sample_reads_header_once(wav, monkeypatch):
+    path, data = wav
+    sig = sample(path)
+    monkeypatch.setattr(sf, 'info', lambda *args: pytest.fail('read the header again'))
+    assert sig.channels == 2
+    assert sig.length(rate) == len(data)
+
+
+def test_sample_loop_wraps_around(wav):
+    path, data = wav
+    sig = sample(path, loop=True)
+    block = sig.respond(request(900, 300, channels=2))
+    np.testing.assert_allclose(block, data[np.arange(900, 1200) % len(data)])
+
+
+def test_sample_resampled_to_rate_requested(wav):
+    path, data = wav
+    sig = sample(path)
+    assert sig.length(rate * 2) == len(data) * 2
+    block = sig.respond(request(0, len(data) * 2, channels=2, rate=rate * 2))
+    # Away from the edges, a ramp resamples to a finer ramp
+    np.testing.assert_allclose(block[200:-200:2], data[100:-100], atol=1e-3)
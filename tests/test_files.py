@@ -0,0 +1,114 @@
+import time
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from signals.chain import (
+    BlockLoc,
+    Request,
+    Shape,
+)
+from signals.chain.dev import (
+    DeviceInfo,
+)
+from signals.chain.files import (
+    FileReader,
+)
+import signals.map.control
+from signals.map import (
+    Coordinates,
+    MappedDevInfo,
+)
+
+rate = 44100
+
+device = DeviceInfo(name='test',
+                    index=0,
+                    hostapi=0,
+                    max_input_channels=2,
+                    max_output_channels=2,
+                    default_low_input_latency=0.01,
+                    default_low_output_latency=0.01,
+                    default_high_input_latency=0.1,
+                    default_high_output_latency=0.1,
+                    default_samplerate=44100.)
+
+
+class SmallReader(FileReader):
+    read_ahead = 1000
+
+    def __init__(self):
+        super().__init__()
+        self.reads = []
+
+    def _read_ahead(self, position: int, frames: int) -> None:
+        self.reads.append(position)
+        super()._read_ahead(position, frames)
+
+
+def loc(position: int, frames: int = 256) -> BlockLoc:
+    return BlockLoc(position=position, rate=rate, shape=Shape(frames=frames, channels=1))
+
+
+def request(position: int, frames: int = 256) -> Request:
+    return Request(requestor=None, port='test', loc=loc(position, frames))
+
+
+@pytest.fixture
+def wav(tmp_path):
+    path = tmp_path / 'in.wav'
+    data = np.linspace(-1, 1, 5000).reshape(-1, 1)
+    sf.write(path, data, rate, subtype='DOUBLE')
+    return path, data
+
+
+@pytest.fixture
+def reader(wav):
+    path, _ = wav
+    sig = SmallReader()
+    sig.set_state(FileReader.State(path=str(path)))
+    yield sig
+    sig.destroy()
+
+
+def test_reads_ahead_in_chunks(reader, wav):
+    _, data = wav
+    played = np.concatenate([reader.respond(request(position)) for position in range(0, 5120, 256)])
+    np.testing.assert_array_equal(played[:5000], data)
+    # Past the end of the file is silence
+    assert not played[5000:].any()
+    # Each block that runs past what was read ahead reads a chunk from its
+    # start, and none past the end of the file
+    assert reader.reads == list(range(0, 5000, 768))
+
+
+def test_prefetched_blocks_served_from_memory(reader, wav):
+    _, data = wav
+    reader.prefetch(loc(3000))
+    reader.reads.clear()
+    np.testing.assert_array_equal(reader.respond(request(3000)), data[3000:3256])
+    assert not reader.reads
+
+
+def test_seek_prefetches_for_sinks(wav):
+    path, data = wav
+    controller = signals.map.control.Controller(interactive=False)
+    controller.onecmd(f'add 2a signals.chain.files.FileReader path={path}')
+    controller.map.add(MappedDevInfo.for_sink(device=device, at=Coordinates.parse('1a')))
+    controller.onecmd('con 2a 1a.input')
+    transport = controller.map.transport
+    reads = []
+    sig = controller.map._find(Coordinates.parse('2a'))
+    read_ahead = sig._read_ahead
+    sig._read_ahead = lambda position, frames: reads.append(position) or read_ahead(position, frames)
+    transport.seek(2000)
+    deadline = time.monotonic() + 5
+    while transport._warming:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+    assert reads[0] == 2000
+    out = np.empty((256, 1))
+    controller.map._find(Coordinates.parse('1a'))._callback(out, len(out), None, None)
+    np.testing.assert_array_equal(out, data[2000:2256])
+    controller.onecmd('init')
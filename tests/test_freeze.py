@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+import signals.map.control
+from signals.chain import (
+    BlockLoc,
+    Request,
+    Shape,
+)
+from signals.chain.render import (
+    Bounce,
+)
+from signals.map import (
+    Coordinates,
+)
+
+rate = 44100
+
+
+@pytest.fixture
+def controller():
+    controller = signals.map.control.Controller(interactive=False)
+    for line in [
+        'add 1a signals.chain.fx.LowPass',
+        'add 2a signals.chain.osc.Sawtooth',
+        'add 2b signals.chain.fixed.Fixed value=[[1000.0]]',
+        'add 3a signals.chain.fixed.Fixed value=[[220.0]]',
+        'con 3a 2a.hertz',
+        'con 2a 1a.input',
+        'con 2b 1a.cutoff',
+    ]:
+        controller.onecmd(line)
+    yield controller
+    controller.onecmd('init')
+
+
+def find(controller, at: str):
+    return controller.map._find(Coordinates.parse(at))
+
+
+def render(controller, at: str = '1a', frames: int = 4410) -> np.ndarray:
+    return Bounce(find(controller, at), rate=rate).render(frames)
+
+
+def test_freeze_round_trip(controller):
+    expected = render(controller)
+    controller.onecmd('freeze 1a 0.1')
+    assert find(controller, '1a').is_frozen
+    np.testing.assert_array_equal(render(controller), expected)
+
+    # Served from the rendering, whatever happens upstream
+    controller.onecmd('ed 3a value=[[440.0]]')
+    np.testing.assert_array_equal(render(controller), expected)
+
+    controller.onecmd('unfreeze 1a')
+    assert not find(controller, '1a').is_frozen
+    assert not np.allclose(render(controller), expected)
+    controller.onecmd('ed 3a value=[[220.0]]')
+    np.testing.assert_allclose(render(controller), expected)
+
+
+def test_refreeze_replaces_rendering(controller):
+    controller.onecmd('freeze 1a 0.1')
+    controller.onecmd('ed 3a value=[[440.0]]')
+    controller.onecmd('freeze 1a 0.1')
+    controller.onecmd('unfreeze 1a')
+    expected = render(controller)
+    controller.onecmd('freeze 1a 0.1')
+    np.testing.assert_array_equal(render(controller), expected)
+
+
+def test_freeze_renders_a_private_copy(controller):
+    live = [find(controller, at) for at in ('1a', '2a')]
+    controller.onecmd('freeze 1a 0.1')
+    # Nothing that plays was pulled, or had its state touched
+    assert [sig.cache_usage.blocks for sig in live] == [0, 0]
+    assert live[0]._carried is None
+    assert [find(controller, at) for at in ('1a', '2a')] == live
+
+
+def test_freeze_past_the_rendering_evaluates(controller):
+    expected = render(controller, frames=8820)
+    controller.onecmd('freeze 1a 0.1')
+    loc = BlockLoc(position=4410, rate=rate, shape=Shape(frames=1024, channels=1))
+    block = find(controller, '1a').respond(Request(requestor=None, port='test', loc=loc))
+    np.testing.assert_allclose(block, expected[4410:5434], atol=1e-9)
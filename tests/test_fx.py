@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from signals import (
+    SignalFlags,
+)
+from signals.chain import (
+    BlockLoc,
+    Denormals,
+    Emitter,
+    Recursive,
+    Request,
+    Shape,
+)
+from signals.chain.fixed import (
+    Fixed,
+)
+from signals.chain.fx import (
+    LowPass,
+)
+
+rate = 44100
+
+
+class Impulse(Emitter):
+    channels = 1
+
+    @classmethod
+    def flags(cls) -> SignalFlags:
+        return super().flags()
+
+    def _eval(self, request: Request) -> np.ndarray:
+        block = np.zeros(request.loc.shape)
+        if request.loc.position == 0:
+            block[0] = 1.
+        return block
+
+
+def low_pass() -> LowPass:
+    sig = LowPass()
+    sig.input = Impulse()
+    sig.cutoff = Fixed()
+    sig.cutoff.sig.set_state(Fixed.State(value=np.array([[1000.]])))
+    return sig
+
+
+def carried_states(sig: LowPass, blocks: int) -> list[np.ndarray]:
+    states = []
+    for position in range(0, blocks * 256, 256):
+        sig.respond(Request(requestor=None,
+                            port='test',
+                            loc=BlockLoc(position=position, rate=rate, shape=Shape(frames=256, channels=1))))
+        states.append(sig._carried[1])
+    return states
+
+
+def is_subnormal(block: np.ndarray) -> np.ndarray:
+    return (block != 0) & (np.abs(block) < np.finfo(float).tiny)
+
+
+@pytest.mark.parametrize('denormals', [Denormals.FLUSH, Denormals.OFFSET])
+def test_carried_state_never_subnormal(monkeypatch, denormals):
+    monkeypatch.setattr(Recursive, 'denormals', denormals)
+    states = carried_states(low_pass(), 40)
+    assert not any(is_subnormal(state).any() for state in states)
+
+
+def test_carried_state_flushed_to_zero(monkeypatch):
+    monkeypatch.setattr(Recursive, 'denormals', Denormals.FLUSH)
+    assert not carried_states(low_pass(), 40)[-1].any()
+
+
+def test_carried_state_decays_through_subnormals_if_allowed(monkeypatch):
+    monkeypatch.setattr(Recursive, 'denormals', Denormals.ALLOW)
+    assert any(is_subnormal(state).any() for state in carried_states(low_pass(), 40))
+
+
+def test_blocks_handed_out_read_only_without_freezing_state():
+    sig = Fixed()
+    sig.set_state(Fixed.State(value=np.array([[1000.]])))
+    block = sig.respond(Request(requestor=None,
+                                port='test',
+                                loc=BlockLoc(position=0, rate=rate, shape=Shape(frames=1, channels=1))))
+    with pytest.raises(ValueError):
+        block[0] = 0.
+    assert sig.get_state().value.flags.writeable
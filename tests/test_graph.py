@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+QtWidgets = pytest.importorskip('PyQt5.QtWidgets')
+
+import signals.chain
+import signals.map.control
+import signals.ui.graph
+import signals.ui.theme
+
+
+@pytest.fixture(scope='module', autouse=True)
+def app():
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    signals.ui.theme.controller.set_theme(signals.ui.theme.RED)
+    yield app
+
+
+def container(policy: str) -> signals.ui.graph.NodeContainer:
+    controller = signals.map.control.Controller(interactive=False)
+    controller.onecmd(f'add 2a signals.chain.osc.Sine cache={policy}')
+    info, = controller.map.iter_signals()
+    controller.onecmd('init')
+    return signals.ui.graph.NodeContainer(info)
+
+
+@pytest.mark.parametrize('policy, blocks, bytes_, fullness', [
+    ('blocks:4', 2, 4096, 0.5),
+    ('blocks:4', 8, 16384, 1),
+    ('bytes:8192', 1, 2048, 0.25),
+    ('pin:0:1', 3, 6144, 1),
+    ('pin:0:1', 0, 0, 0),
+    ('off', 0, 0, 0),
+])
+def test_cache_control_shows_fullness(policy, blocks, bytes_, fullness):
+    node = container(policy)
+    control = node.cache_control
+    control.set_usage(signals.chain.CacheUsage(blocks=blocks, bytes=bytes_, policy=policy))
+    assert control.fill.rect().width() == pytest.approx(control.width * fullness)
+    assert control.toolTip().startswith(f'Cache {policy}: {blocks} blocks')
+
+
+def test_cache_control_without_usage_empty():
+    node = container('blocks:4')
+    control = node.cache_control
+    control.set_usage(None)
+    assert control.fill.rect().width() == 0
+    assert control.toolTip() == 'Cache blocks:4'
@@ -0,0 +1,145 @@
+import threading
+import time
+
+import numpy as np
+import soundfile as sf
+
+from signals import (
+    SignalFlags,
+)
+from signals.chain import (
+    BlockLoc,
+    Request,
+    Shape,
+)
+from signals.chain.dev import (
+    DeviceInfo,
+    SinkDevice,
+    Transport,
+)
+from signals.chain.files import (
+    FileWriter,
+)
+from signals.chain.fixed import (
+    Fixed,
+)
+from signals.chain.handoff import (
+    SideEffect,
+)
+from signals.chain.osc import (
+    Sine,
+)
+from signals.chain.render import (
+    Bounce,
+)
+
+rate = 44100
+
+device = DeviceInfo(name='test',
+                    index=0,
+                    hostapi=0,
+                    max_input_channels=2,
+                    max_output_channels=2,
+                    default_low_input_latency=0.01,
+                    default_low_output_latency=0.01,
+                    default_high_input_latency=0.1,
+                    default_high_output_latency=0.1,
+                    default_samplerate=44100.)
+
+
+def fixed(value: float) -> Fixed:
+    sig = Fixed()
+    sig.set_state(Fixed.State(value=np.array([[value]])))
+    return sig
+
+
+def sine(hertz: float) -> Sine:
+    sig = Sine()
+    sig.hertz = fixed(hertz)
+    sig.phase = fixed(0.)
+    return sig
+
+
+class SlowWriter(FileWriter):
+    # Much less than is rendered, so that the worker falls behind
+    handoff_samples = 1000
+
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def _apply(self, loc: BlockLoc, block: np.ndarray) -> None:
+        self.threads.add(threading.current_thread())
+        time.sleep(0.002)
+        super()._apply(loc, block)
+
+
+class SlowVis(SideEffect):
+    handoff_samples = 1000
+
+    def __init__(self):
+        super().__init__()
+        self.frames = 0
+
+    @classmethod
+    def flags(cls) -> SignalFlags:
+        return super().flags() | SignalFlags.VIS
+
+    def _apply(self, loc: BlockLoc, block: np.ndarray) -> None:
+        time.sleep(0.002)
+        self.frames += len(block)
+
+
+def test_recorder_writes_every_block_under_load(tmp_path):
+    path = tmp_path / 'out.wav'
+    writer = SlowWriter()
+    writer.set_state(FileWriter.State(path=str(path)))
+    writer.input = sine(440.)
+    # Blocks larger than the whole ring are written as well
+    for block_size in (256, 2048):
+        out = Bounce(writer, rate=rate, block_size=block_size).render(8192, start=0 if block_size == 256 else 8192)
+    assert writer.handoff.dropped == 0
+    writer.destroy()
+    written, written_rate = sf.read(path, always_2d=True)
+    assert written_rate == rate
+    assert len(written) == 16384
+    np.testing.assert_allclose(written[8192:], out, atol=2 ** -15)
+
+
+def test_visualization_drops_blocks_under_load():
+    vis = SlowVis()
+    vis.input = sine(440.)
+    Bounce(vis, rate=rate, block_size=256).render(8192)
+    assert vis.handoff.dropped > 0
+    assert vis.frames == 8192 - 256 * vis.handoff.dropped
+    vis.destroy()
+
+
+def test_live_recorder_drops_and_reports_blocks_under_load(tmp_path, capsys):
+    writer = SlowWriter()
+    writer.set_state(FileWriter.State(path=str(tmp_path / 'out.wav')))
+    writer.input = sine(440.)
+    for position in range(0, 8192, 256):
+        writer.respond(Request(requestor=None,
+                               port='test',
+                               loc=BlockLoc(position=position, rate=rate, shape=Shape(frames=256, channels=1))))
+    assert writer.handoff.dropped > 0
+    dropped = writer.handoff.dropped
+    writer.destroy()
+    assert threading.current_thread() not in writer.threads
+    reported = [line.split() for line in capsys.readouterr().err.splitlines() if 'fell behind' in line]
+    assert sum(int(words[-2]) for words in reported) == dropped
+
+
+def test_transport_reserves_handoff_for_its_blocks():
+    vis = SlowVis()
+    vis.input = sine(440.)
+    sink = SinkDevice(device)
+    sink.input = vis
+    transport = Transport()
+    transport.attach(sink)
+    assert vis.handoff.capacity == SlowVis.handoff_blocks * transport.block_size
+    transport.set_block_size(transport.block_size * 2)
+    assert vis.handoff.capacity == SlowVis.handoff_blocks * transport.block_size
+    transport.release(sink)
+    vis.destroy()
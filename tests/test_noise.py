@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from signals.chain import (
+    BlockLoc,
+    Request,
+    Shape,
+)
+from signals.chain.fixed import (
+    Fixed,
+)
+from signals.chain.fx import (
+    BandPass,
+)
+from signals.chain.noise import (
+    White,
+)
+from signals.chain.render import (
+    Bounce,
+)
+
+rate = 44100
+
+
+def white(seed: int = 7, channels: int = 2) -> White:
+    sig = White()
+    sig.set_state(White.State(seed=seed, channels=channels, cache='off'))
+    return sig
+
+
+def fixed(value: float) -> Fixed:
+    sig = Fixed()
+    sig.set_state(Fixed.State(value=np.array([[value]])))
+    return sig
+
+
+def noise_band() -> BandPass:
+    sig = BandPass()
+    sig.input = white()
+    sig.low = fixed(300.)
+    sig.high = fixed(3000.)
+    return sig
+
+
+# Filters started late are primed with input until their transient is
+# negligible, not exactly
+makers = [(white, 0), (noise_band, 1e-9)]
+
+
+@pytest.mark.parametrize('make, atol', makers)
+def test_block_sizes_agree(make, atol):
+    expected = Bounce(make(), rate=rate, block_size=1024).render(10000)
+    for block_size in (256, 512):
+        np.testing.assert_allclose(Bounce(make(), rate=rate, block_size=block_size).render(10000), expected, rtol=0)
+
+
+@pytest.mark.parametrize('make, atol', makers)
+@pytest.mark.parametrize('start', [1, 300, 4096])
+def test_offset_starts_agree(make, atol, start):
+    expected = Bounce(make(), rate=rate, block_size=512).render(8192)
+    result = Bounce(make(), rate=rate, block_size=512).render(8192 - start, start=start)
+    np.testing.assert_allclose(result, expected[start:], rtol=0, atol=atol)
+
+
+def test_channels_drawn_alone_agree():
+    loc = BlockLoc(position=1000, rate=rate, shape=Shape(frames=64, channels=3))
+    request = Request(requestor=None, port='test', loc=loc)
+    expected = white(channels=3).respond(request)
+    masked = white(channels=3).respond(Request(requestor=None, port='test', loc=loc.masked((0, 2))))
+    np.testing.assert_array_equal(masked, expected[:, [0, 2]])
+
+
+def test_seeds_differ():
+    loc = BlockLoc(position=0, rate=rate, shape=Shape(frames=64, channels=1))
+    request = Request(requestor=None, port='test', loc=loc)
+    assert not np.array_equal(white(seed=1).respond(request), white(seed=2).respond(request))
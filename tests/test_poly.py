@@ -0,0 +1,57 @@
+import numpy as np
+
+import signals.map.control
+from signals.chain import (
+    BlockLoc,
+    Request,
+    Shape,
+)
+from signals.chain.poly import (
+    VoiceBank,
+)
+from signals.map import (
+    Coordinates,
+)
+
+
+def test_banks_forgotten_with_their_last_reader():
+    controller = signals.map.control.Controller(interactive=False)
+    controller.onecmd('add 1a signals.chain.poly.VoiceHertz bank=test-lead voices=4')
+    controller.onecmd('add 1b signals.chain.poly.VoiceGate bank=test-lead voices=4')
+    assert VoiceBank._banks['test-lead'].readers == 2
+    controller.onecmd('rm 1a')
+    assert 'test-lead' in VoiceBank._banks
+    controller.onecmd('ed 1b bank=test-pad')
+    assert 'test-lead' not in VoiceBank._banks
+    controller.onecmd('init')
+    assert 'test-pad' not in VoiceBank._banks
+
+
+def test_notes_survive_editing_voices():
+    controller = signals.map.control.Controller(interactive=False)
+    controller.onecmd('add 1a signals.chain.poly.VoiceHertz bank=test-keys voices=4')
+    voice = controller.map.note_on('test-keys', 69, 1.)
+    controller.onecmd('ed 1a voices=6')
+    assert controller.map._find_bank('test-keys').hertz(0)[0, voice] == 440.
+    controller.onecmd('init')
+
+
+def test_notes_after_seeking_back_sound():
+    controller = signals.map.control.Controller(interactive=False)
+    controller.onecmd('add 1a signals.chain.poly.VoiceGate bank=test-seek voices=2')
+    gate = controller.map._find(Coordinates.parse('1a'))
+
+    def play(position: int) -> np.ndarray:
+        loc = BlockLoc(position=position, rate=44100, shape=Shape(frames=1024, channels=2))
+        return gate.respond(Request(requestor=None, port='test', loc=loc))
+
+    for position in range(0, 1 << 16, 1024):
+        play(position)
+    controller.map.note_on('test-seek', 60, 1.)
+    controller.map.note_off('test-seek', 60)
+    # Seek back to the start, as the transport would, and play a note there
+    play(0)
+    voice = controller.map.note_on('test-seek', 64, 1.)
+    assert play(1024)[:, voice].all()
+    assert not play(0)[:, voice].any()
+    controller.onecmd('init')
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+import signals.map.control
+import signals.map.render
+from signals.map import (
+    Coordinates,
+)
+
+rate = 44100
+
+patches = {
+    'noise_band': [
+        '+ 1a signals.chain.fx.BandPass',
+        '+ 2a signals.chain.noise.White channels=2 seed=7',
+        '+ 2b signals.chain.fixed.Fixed value=[[300.0]]',
+        '+ 2c signals.chain.fixed.Fixed value=[[3000.0]]',
+        '> 2a 1a.input',
+        '> 2b 1a.low',
+        '> 2c 1a.high',
+    ],
+    'filtered_saw': [
+        '+ 1a signals.chain.fx.LowPass',
+        '+ 2a signals.chain.osc.Sawtooth',
+        '+ 3a signals.chain.fixed.Fixed value=[[110.0]]',
+        '+ 3b signals.chain.fixed.Fixed value=[[800.0]]',
+        '> 2a 1a.input',
+        '> 3a 2a.hertz',
+        '> 3b 1a.cutoff',
+    ],
+}
+
+
+def load(lines: list[str]) -> signals.map.Map:
+    controller = signals.map.control.Controller(interactive=False)
+    for line in lines:
+        controller.onecmd(line)
+    return controller.map
+
+
+@pytest.mark.parametrize('name', patches)
+def test_parallel_render_matches_serial(name, tmp_path):
+    frames = 20000
+    paths = {}
+    for kind, segment_frames, processes in (('serial', frames, 1), ('parallel', 3000, 2)):
+        paths[kind] = tmp_path / f'{kind}.wav'
+        signals.map.render.render(load(patches[name]),
+                                  Coordinates.parse('1a'),
+                                  paths[kind],
+                                  frames=frames,
+                                  rate=rate,
+                                  block_size=512,
+                                  segment_frames=segment_frames,
+                                  processes=processes)
+    serial, _ = sf.read(paths['serial'], always_2d=True)
+    parallel, _ = sf.read(paths['parallel'], always_2d=True)
+    assert serial.shape == parallel.shape == (frames, serial.shape[1])
+    # Both are quantized the same way, so only rounding may tell them apart
+    np.testing.assert_allclose(parallel, serial, rtol=0, atol=2 ** -15)
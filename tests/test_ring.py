@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from signals.chain import (
+    Shape,
+)
+from signals.chain.ring import (
+    SharedRing,
+)
+import signals.chain.render
+import signals.map.control
+from signals.map import (
+    Coordinates,
+)
+
+
+@pytest.fixture
+def ring():
+    ring = SharedRing.create(Shape(frames=100, channels=2))
+    yield ring
+    ring.close()
+
+
+def frames(start: int, stop: int) -> np.ndarray:
+    return np.stack([np.arange(start, stop), -np.arange(start, stop)], axis=1).astype(float)
+
+
+def test_read_most_recent_frames(ring):
+    assert len(ring.read(10)) == 0
+    ring.write(frames(0, 30))
+    np.testing.assert_array_equal(ring.read(10), frames(20, 30))
+    np.testing.assert_array_equal(ring.read(50), frames(0, 30))
+
+
+def test_write_wraps_around(ring):
+    for start in range(0, 250, 30):
+        ring.write(frames(start, start + 30))
+    assert ring.written == 270
+    np.testing.assert_array_equal(ring.read(100), frames(170, 270))
+    np.testing.assert_array_equal(ring.read(1000), frames(170, 270))
+
+
+def test_blocks_larger_than_ring_keep_their_end(ring):
+    ring.write(frames(0, 250))
+    assert ring.written == 100
+    np.testing.assert_array_equal(ring.read(100), frames(150, 250))
+
+
+def test_single_channel_shared_by_all(ring):
+    ring.write(np.ones((10, 1)))
+    np.testing.assert_array_equal(ring.read(10), np.ones((10, 2)))
+
+
+def test_readers_attach_by_name(ring):
+    reader = SharedRing.attach(ring.name)
+    try:
+        assert reader.shape == ring.shape
+        ring.write(frames(0, 130))
+        np.testing.assert_array_equal(reader.read(40), frames(90, 130))
+    finally:
+        reader.close()
+    # Only the writer unlinks it
+    ring.write(frames(130, 140))
+    np.testing.assert_array_equal(ring.read(10), frames(130, 140))
+
+
+def test_reads_overtaken_by_writer_drop_torn_frames(ring):
+    ring.write(frames(0, 100))
+    # As if the writer had claimed frames it is still writing
+    ring._header_view[1] += 30
+    np.testing.assert_array_equal(ring.read(100), frames(30, 100))
+
+
+def test_map_collects_visualization_through_ring():
+    controller = signals.map.control.Controller(interactive=False)
+    for line in [
+        'add 1a signals.chain.vis.Wave',
+        'add 2a signals.chain.osc.Sine',
+        'add 3a signals.chain.fixed.Fixed value=[[440.0]]',
+        'con 3a 2a.hertz',
+        'con 2a 1a.input',
+    ]:
+        controller.onecmd(line)
+    at = Coordinates.parse('1a')
+    assert controller.map.vis_ring(at) is None
+    assert controller.map.collect(at, 10) is None
+    played = signals.chain.render.Bounce(controller.map._find(at), rate=44100, block_size=64).render(256)
+    reader = SharedRing.attach(controller.map.vis_ring(at))
+    try:
+        np.testing.assert_array_equal(reader.read(100), played[-100:])
+        np.testing.assert_array_equal(controller.map.collect(at, 100), played[-100:])
+    finally:
+        reader.close()
+    controller.onecmd('init')
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import signals.map.control
+from signals.chain import (
+    BlockLoc,
+    Request,
+    Shape,
+)
+from signals.map import (
+    Coordinates,
+)
+
+
+@pytest.fixture
+def controller():
+    controller = signals.map.control.Controller(interactive=False)
+    for line in [
+        'add 1a signals.chain.fx.Mix',
+        'add 2a signals.chain.osc.Sine',
+        'add 2b signals.chain.osc.Sine',
+        'add 3a signals.chain.fixed.Fixed value=[[440.0]]',
+        'con 3a 2a.hertz',
+        'con 3a 2b.hertz',
+        'con 2a 1a.left',
+        'con 2b 1a.right',
+    ]:
+        controller.onecmd(line)
+    yield controller
+    controller.onecmd('init')
+
+
+def find(controller, at: str):
+    return controller.map._find(Coordinates.parse(at))
+
+
+def sources(controller) -> tuple:
+    mix = find(controller, '1a')
+    return mix.left.source, mix.right.source
+
+
+def test_identical_signals_are_shared(controller):
+    assert sources(controller) == (find(controller, '2a'), find(controller, '2a'))
+
+
+@pytest.mark.parametrize('at', ['2a', '2b'])
+def test_frozen_signals_are_not_shared(controller, at):
+    controller.onecmd(f'freeze {at} 0.1')
+    assert find(controller, at).is_frozen
+    assert sources(controller) == (find(controller, '2a'), find(controller, '2b'))
+    loc = BlockLoc(position=0, rate=44100, shape=Shape(frames=256, channels=1))
+    mix = find(controller, '1a').respond(Request(requestor=None, port='test', loc=loc))
+    np.testing.assert_allclose(mix, find(controller, '2a').respond(Request(requestor=None, port='test', loc=loc)))
+
+    controller.onecmd(f'unfreeze {at}')
+    assert sources(controller) == (find(controller, '2a'), find(controller, '2a'))
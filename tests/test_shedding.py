@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from signals.chain import (
+    BlockLoc,
+    Emitter,
+    Request,
+    Shape,
+    Shedding,
+)
+from signals.chain.compiler import (
+    Program,
+)
+from signals.chain.fixed import (
+    Fixed,
+)
+from signals.chain.fx import (
+    LowPass,
+)
+from signals.chain.osc import (
+    Sine,
+)
+
+rate = 44100
+
+
+def fixed(value: float) -> Fixed:
+    sig = Fixed()
+    sig.set_state(Fixed.State(value=np.array([[value]])))
+    return sig
+
+
+def sine(hertz: float) -> Sine:
+    sig = Sine()
+    sig.hertz = fixed(hertz)
+    sig.phase = fixed(0.)
+    return sig
+
+
+def low_pass() -> LowPass:
+    sig = LowPass()
+    sig.input = sine(3000.)
+    sig.cutoff = fixed(500.)
+    return sig
+
+
+def loc(position: int = 0, frames: int = 256) -> BlockLoc:
+    return BlockLoc(position=position, rate=rate, shape=Shape(frames=frames, channels=1))
+
+
+def request(position: int = 0, frames: int = 256) -> Request:
+    return Request(requestor=None, port='test', loc=loc(position, frames))
+
+
+@pytest.mark.parametrize('compiled', [False, True])
+def test_shed_blocks_dropped_once_shedding_ends(monkeypatch, compiled):
+    sig = low_pass()
+    evaluate = Program(sig) if compiled else (lambda loc: sig.respond(Request(requestor=None, port='test', loc=loc)))
+    monkeypatch.setattr(Emitter, 'shedding', Shedding.FILTERS)
+    shed = np.array(evaluate(loc()))
+    assert sig.cache_usage.blocks == 1
+
+    monkeypatch.setattr(Emitter, 'shedding', Shedding.NONE)
+    full = evaluate(loc())
+    assert not np.allclose(shed, full)
+    np.testing.assert_array_equal(full, low_pass().respond(request()))
+    assert sig.cache_usage.blocks == 1
+    np.testing.assert_array_equal(sig.respond(request()), full)
+
+
+def test_shed_blocks_shared_by_every_reader(monkeypatch):
+    source = sine(3000.)
+    filters = [LowPass() for _ in range(2)]
+    for sig in filters:
+        sig.input = source
+        sig.cutoff = fixed(500.)
+    calls = []
+    get_result = source._get_result
+    monkeypatch.setattr(source, '_get_result', lambda request: calls.append(request) or get_result(request))
+    monkeypatch.setattr(Emitter, 'shedding', Shedding.FILTERS)
+    for position in range(0, 8 * 256, 256):
+        for sig in filters:
+            sig.respond(request(position))
+    assert len(calls) == 8
+
+
+def test_filter_order_change_not_continued_from_carried_state(monkeypatch):
+    sig = low_pass()
+    sig.respond(request(0))
+    monkeypatch.setattr(Emitter, 'shedding', Shedding.FILTERS)
+    shed = sig.respond(request(256))
+    reference = low_pass()
+    reference.respond(request(0))
+    reference._carried = None
+    np.testing.assert_allclose(shed, reference.respond(request(256)))
+
+
+def test_shed_control_rate_follows_changed_source(monkeypatch):
+    monkeypatch.setattr(Emitter, 'shedding', Shedding.CONTROL_RATE)
+    sig = sine(440.)
+    sig.respond(request(0))
+    # Within `shed_control_frames` of the last evaluation, but of an
+    # input that has changed since
+    sig.hertz.sig.set_state(Fixed.State(value=np.array([[880.]])))
+    np.testing.assert_array_equal(sig.respond(request(256)), sine(880.).respond(request(256)))
+
+
+def test_shed_control_rate_reuses_unchanged_source(monkeypatch):
+    monkeypatch.setattr(Emitter, 'shedding', Shedding.CONTROL_RATE)
+    sig = sine(440.)
+    sig.respond(request(0))
+    calls = []
+    respond = sig.hertz.source.respond
+    monkeypatch.setattr(sig.hertz.source, 'respond', lambda request: calls.append(request) or respond(request))
+    sig.respond(request(256))
+    assert not calls
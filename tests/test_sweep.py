@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+import signals.map.control
+from signals.chain.render import (
+    Bounce,
+)
+from signals.map import (
+    BadSweepChannels,
+    Coordinates,
+)
+
+rate = 44100
+
+
+@pytest.fixture
+def controller():
+    controller = signals.map.control.Controller(interactive=False)
+    for line in [
+        'add 1a signals.chain.fx.LowPass',
+        'add 2a signals.chain.osc.Sawtooth',
+        'add 2b signals.chain.fixed.Fixed value=[[1000.0]]',
+        'add 3a signals.chain.fixed.Fixed value=[[220.0]]',
+        'con 3a 2a.hertz',
+        'con 2a 1a.input',
+        'con 2b 1a.cutoff',
+    ]:
+        controller.onecmd(line)
+    yield controller
+    controller.onecmd('init')
+
+
+def find(controller, at: str):
+    return controller.map._find(Coordinates.parse(at))
+
+
+def test_sweep_renders_each_candidate(controller):
+    candidates = [500., 1000., 2000.]
+    renders = controller.map.sweep(Coordinates.parse('1a'), Coordinates.parse('2b'), candidates, frames=2048, rate=rate)
+    assert renders.shape == (2048, 3)
+    for i, cutoff in enumerate(candidates):
+        controller.onecmd(f'ed 2b value=[[{cutoff}]]')
+        np.testing.assert_allclose(renders[:, i], Bounce(find(controller, '1a'), rate=rate).render(2048)[:, 0])
+
+
+def test_sweep_leaves_the_map_alone(controller):
+    live = {at: find(controller, at) for at in ('1a', '2a', '2b', '3a')}
+    controller.map.sweep(Coordinates.parse('1a'), Coordinates.parse('2b'), [500., 2000.], frames=2048, rate=rate)
+    assert {at: find(controller, at) for at in live} == live
+    np.testing.assert_array_equal(live['2b'].get_state().value, [[1000.]])
+    assert live['1a'].cache_usage.blocks == 0
+    assert live['1a'].channels == 1
+
+
+def test_sweep_of_parameter_not_upstream(controller):
+    controller.onecmd('add 4a signals.chain.fixed.Fixed value=[[1.0]]')
+    with pytest.raises(BadSweepChannels):
+        controller.map.sweep(Coordinates.parse('1a'), Coordinates.parse('4a'), [1., 2.], frames=2048, rate=rate)
@@ -0,0 +1,127 @@
+import time
+
+import numpy as np
+import pytest
+
+import signals.map.control
+from signals.chain.dev import (
+    DeviceInfo,
+)
+from signals.chain.render import (
+    Bounce,
+)
+from signals.map import (
+    Coordinates,
+    MappedDevInfo,
+)
+
+device = DeviceInfo(name='test',
+                    index=0,
+                    hostapi=0,
+                    max_input_channels=2,
+                    max_output_channels=2,
+                    default_low_input_latency=0.01,
+                    default_low_output_latency=0.01,
+                    default_high_input_latency=0.1,
+                    default_high_output_latency=0.1,
+                    default_samplerate=44100.)
+
+
+@pytest.fixture
+def controller():
+    controller = signals.map.control.Controller(interactive=False)
+    for line in [
+        'add 2a signals.chain.osc.Sine',
+        'add 2b signals.chain.osc.Sawtooth',
+        'add 3a signals.chain.fixed.Fixed value=[[440.0]]',
+        'add 3b signals.chain.fixed.Fixed value=[[110.0]]',
+        'con 3a 2a.hertz',
+        'con 3b 2b.hertz',
+    ]:
+        controller.onecmd(line)
+    for at, input_at in (('1a', '2a'), ('1b', '2b')):
+        controller.map.add(MappedDevInfo.for_sink(device=device, at=Coordinates.parse(at)))
+        controller.onecmd(f'con {input_at} {at}.input')
+    yield controller
+    controller.onecmd('init')
+
+
+def play(sinks: dict, frames: int) -> list[np.ndarray]:
+    """
+    What each sink plays over `frames` frames, with callbacks for as many
+    frames as `sinks` maps it to, taking turns as if both played at once.
+    """
+    outs = [np.empty((frames, 1)) for _ in sinks]
+    played = [0 for _ in sinks]
+    while min(played) < frames:
+        i = played.index(min(played))
+        sink, chunk = list(sinks.items())[i]
+        out = outs[i][played[i]:played[i] + chunk]
+        sink._callback(out, len(out), None, None)
+        played[i] += len(out)
+    return outs
+
+
+def expected(controller, at: str, start: int, frames: int) -> np.ndarray:
+    sig = controller.map._find(Coordinates.parse(at))
+    return Bounce(sig, rate=controller.map.transport.rate).render(frames, start=start)
+
+
+def wait_for_warm_up(transport) -> None:
+    deadline = time.monotonic() + 5
+    while transport._warming:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_sinks_share_the_map_transport(controller):
+    sinks = controller.map._sinks()
+    assert len(sinks) == 2
+    assert all(sink.transport is controller.map.transport for sink in sinks)
+    assert controller.map.transport.sinks == sinks
+
+
+def test_sinks_play_in_step(controller):
+    sink_a, sink_b = (controller.map._find(Coordinates.parse(at)) for at in ('1a', '1b'))
+    played_a, played_b = play({sink_a: 300, sink_b: 700}, 9000)
+    np.testing.assert_allclose(played_a, expected(controller, '2a', 0, 9000))
+    np.testing.assert_allclose(played_b, expected(controller, '2b', 0, 9000))
+
+    # Whatever was queued but not played is replayed at the new size
+    controller.map.set_block_size(256)
+    wait_for_warm_up(controller.map.transport)
+    played_a, played_b = play({sink_a: 128, sink_b: 500}, 3000)
+    np.testing.assert_allclose(played_a, expected(controller, '2a', 9000, 3000))
+    np.testing.assert_allclose(played_b, expected(controller, '2b', 9000, 3000))
+
+
+def test_seek_continues_at_new_position(controller):
+    sink_a, sink_b = (controller.map._find(Coordinates.parse(at)) for at in ('1a', '1b'))
+    controller.map.transport.seek(20000)
+    wait_for_warm_up(controller.map.transport)
+    played_a, played_b = play({sink_a: 441, sink_b: 441}, 5000)
+    np.testing.assert_allclose(played_a, expected(controller, '2a', 20000, 5000))
+    np.testing.assert_allclose(played_b, expected(controller, '2b', 20000, 5000))
+
+
+def test_callbacks_stop_waiting_for_warm_up(controller):
+    sink_a, sink_b = (controller.map._find(Coordinates.parse(at)) for at in ('1a', '1b'))
+    transport = controller.map.transport
+    transport.max_warmup = 0
+    transport.seek(50000)
+    played_a, _ = play({sink_a: 512, sink_b: 512}, 2048)
+    np.testing.assert_allclose(played_a, expected(controller, '2a', 50000, 2048))
+
+
+def test_late_callbacks_of_detached_sinks_play_silence(controller):
+    sink_a, _ = (controller.map._find(Coordinates.parse(at)) for at in ('1a', '1b'))
+    transport = controller.map.transport
+    wait_for_warm_up(transport)
+    transport.detach(sink_a)
+    out = np.ones((transport.buffer_frames * 4, 1))
+    sink_a._callback(out, len(out), None, None)
+    assert not out.any()
+    transport.release(sink_a)
+    out = np.ones((512, 1))
+    sink_a._callback(out, len(out), None, None)
+    assert not out.any()
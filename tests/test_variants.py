@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+
+import signals.map.control
+from signals.chain.dev import (
+    DeviceInfo,
+)
+from signals.map import (
+    Coordinates,
+    MappedDevInfo,
+)
+
+device = DeviceInfo(name='test',
+                    index=0,
+                    hostapi=0,
+                    max_input_channels=2,
+                    max_output_channels=2,
+                    default_low_input_latency=0.01,
+                    default_low_output_latency=0.01,
+                    default_high_input_latency=0.1,
+                    default_high_output_latency=0.1,
+                    default_samplerate=44100.)
+
+
+@pytest.fixture
+def controller():
+    controller = signals.map.control.Controller(interactive=False)
+    for line in [
+        'add 2a signals.chain.fx.Gain',
+        'add 3a signals.chain.osc.Sine',
+        'add 3b signals.chain.fixed.Fixed value=[[0.5]]',
+        'add 4a signals.chain.fixed.Fixed value=[[440.0]]',
+        'con 4a 3a.hertz',
+        'con 3a 2a.left',
+        'con 3b 2a.right',
+    ]:
+        controller.onecmd(line)
+    controller.map.add(MappedDevInfo.for_sink(device=device, at=Coordinates.parse('1a')))
+    controller.map.connect(signals.map.ConnectionInfo(input_at=Coordinates.parse('2a'),
+                                                      output=signals.map.PortInfo(at=Coordinates.parse('1a'),
+                                                                                  port='input')))
+    yield controller
+    controller.onecmd('init')
+
+
+def find(controller, at: str, variant: str | None = None):
+    sig_map = controller.map if variant is None else controller.variants[variant]
+    return sig_map._find(Coordinates.parse(at))
+
+
+def hertz(controller, variant: str | None = None) -> float:
+    return float(find(controller, '4a', variant).get_state().value[0, 0])
+
+
+def test_fork_shares_signals_until_changed(controller):
+    controller.onecmd('fork b')
+    for at in ('2a', '3a', '4a'):
+        assert find(controller, at, 'b') is find(controller, at, 'main')
+
+    controller.onecmd('switch b')
+    controller.onecmd('ed 4a value=[[880.0]]')
+    assert hertz(controller, 'b') == 880.
+    assert hertz(controller, 'main') == 440.
+    # Everything downstream of the change is copied, the rest still shared
+    for at in ('2a', '3a', '4a'):
+        assert find(controller, at, 'b') is not find(controller, at, 'main')
+    assert find(controller, '3b', 'b') is find(controller, '3b', 'main')
+
+
+def test_switch_plays_the_variant(controller):
+    sink = find(controller, '1a')
+    controller.onecmd('fork b')
+    controller.onecmd('switch b')
+    controller.onecmd('ed 4a value=[[880.0]]')
+    assert sink.input.sig is find(controller, '2a', 'b')
+    controller.onecmd('switch main')
+    assert sink.input.sig is find(controller, '2a', 'main')
+    assert controller.map.live and not controller.variants['b'].live
+
+
+def test_switch_to_missing_variant_fails(controller):
+    with pytest.raises(signals.map.control.BadVariant):
+        controller.switch('c')
+    with pytest.raises(signals.map.control.VariantExists):
+        controller.fork('main')
+
+
+def test_undo_is_per_variant(controller):
+    controller.onecmd('ed 4a value=[[220.0]]')
+    controller.onecmd('fork b')
+    controller.onecmd('switch b')
+    controller.onecmd('ed 4a value=[[880.0]]')
+    controller.undo()
+    assert hertz(controller) == 220.
+    controller.redo()
+    assert hertz(controller) == 880.
+
+    controller.onecmd('switch main')
+    assert hertz(controller) == 220.
+    # Both variants can undo what was done before the fork
+    controller.undo()
+    assert hertz(controller) == 440.
+    controller.onecmd('switch b')
+    controller.undo()
+    controller.undo()
+    assert hertz(controller) == 440.
+    assert hertz(controller, 'main') == 440.
+    controller.onecmd('switch main')
+    controller.redo()
+    assert hertz(controller) == 220.
+    assert hertz(controller, 'b') == 440.
+
+
+def test_variant_history_stays_bounded(controller):
+    controller.onecmd('fork b')
+    controller.onecmd('switch b')
+    for hertz_ in range(controller.history.maxlen + 10):
+        controller.onecmd(f'ed 4a value=[[{hertz_ + 1}.0]]')
+    assert len(controller.history) == controller.history.maxlen
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from signals.chain import (
+    BlockLoc,
+    Request,
+    Shape,
+)
+from signals.chain.fixed import (
+    Fixed,
+)
+from signals.chain.osc import (
+    Sawtooth,
+    Square,
+    TableSawtooth,
+    TableSquare,
+    TableTriangle,
+    Triangle,
+    Wavetable,
+)
+
+rate = 44100
+pairs = [(Square, TableSquare), (Sawtooth, TableSawtooth), (Triangle, TableTriangle)]
+
+
+def fixed(value: float) -> Fixed:
+    sig = Fixed()
+    sig.set_state(Fixed.State(value=np.array([[value]])))
+    return sig
+
+
+def render(cls: type, hertz: int, interpolation: str = 'linear') -> np.ndarray:
+    sig = cls()
+    if issubclass(cls, Wavetable):
+        sig.set_state(cls.State(interpolation=interpolation))
+    sig.hertz = fixed(hertz)
+    sig.phase = fixed(0.)
+    loc = BlockLoc(position=0, rate=rate, shape=Shape(frames=rate, channels=1))
+    return sig.respond(Request(requestor=None, port='test', loc=loc))[:, 0]
+
+
+def alias_db(wave: np.ndarray, hertz: int) -> float:
+    # Over one second, each harmonic of `hertz` is one bin of the spectrum
+    spectrum = np.abs(np.fft.rfft(wave)) ** 2
+    harmonics = np.zeros(len(spectrum), dtype=bool)
+    harmonics[::hertz] = True
+    return 10 * np.log10(spectrum[~harmonics].sum() / spectrum.sum())
+
+
+@pytest.mark.parametrize('cls', [table_cls for _, table_cls in pairs])
+def test_each_level_halves_harmonics(cls):
+    tables = cls.tables()
+    spectra = np.abs(np.fft.rfft(tables[:, 1:-2], axis=1))
+    for level, spectrum in enumerate(spectra):
+        highest = np.flatnonzero(spectrum > 1e-9 * spectrum.max()).max()
+        assert highest <= (cls.size // 2) >> level
+
+
+@pytest.mark.parametrize('cls', [table_cls for _, table_cls in pairs])
+@pytest.mark.parametrize('hertz', [20, 441, 3001, 11025, 19000])
+def test_level_stays_below_nyquist(monkeypatch, cls, hertz):
+    levels = []
+    read = cls._read
+    monkeypatch.setattr(cls, '_read', lambda self, t, level: levels.append(level) or read(self, t, level))
+    render(cls, hertz)
+    (level,) = np.unique(levels[0])
+    assert ((cls.size // 2) >> level) * hertz <= rate / 2
+    # and as high as it can be, unless every harmonic fits
+    assert level == 0 or ((cls.size // 2) >> (level - 1)) * hertz > rate / 2
+
+
+@pytest.mark.parametrize('naive_cls, table_cls', pairs)
+@pytest.mark.parametrize('interpolation', ['linear', 'cubic'])
+def test_less_aliasing_than_naive(naive_cls, table_cls, interpolation):
+    hertz = 3001
+    table = alias_db(render(table_cls, hertz, interpolation), hertz)
+    assert table < -100
+    assert table < alias_db(render(naive_cls, hertz), hertz) - 60
+
+
+@pytest.mark.parametrize('naive_cls, table_cls', pairs)
+def test_same_level_as_naive(naive_cls, table_cls):
+    hertz = 441
+    naive, table = render(naive_cls, hertz), render(table_cls, hertz)
+    # As loud as the harmonics of the ideal waveform its table holds: as
+    # many as fit below the Nyquist frequency, rounded down to a power of two
+    k = np.arange(1, 2 ** int(np.log2(rate / 2 / hertz)) + 1)
+    rms = np.sqrt(np.sum(table_cls._harmonics(k) ** 2) / 2)
+    assert np.sqrt(np.mean(table ** 2)) == pytest.approx(rms, rel=0.002)
+    # and in phase with the naive waveform
+    assert np.corrcoef(naive, table)[0, 1] > 0.98